@@ -0,0 +1,340 @@
+"""ASGI serving mode for the inventory API.
+
+    pip install uvicorn starlette aiomysql a2wsgi
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The high-concurrency read paths - dashboard stats, the live event stream,
+product lookups and low-stock lists - run on the event loop over pooled
+aiomysql connections, so thousands of open dashboard and POS connections
+don't each pin a thread. Every other route is served by the Flask app from
+main.py on a bounded worker pool, so the whole /api/* surface, caches,
+metrics and replica routing are shared with the sync mode.
+"""
+import asyncio
+import contextvars
+import json
+import queue
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+import main
+from dataanalysis.final import analytics_db
+
+ASGI_CONFIG = {
+    'DB_POOL_SIZE': int(main.env_config['ASGI_DB_POOL_SIZE']),
+    'WSGI_WORKERS': int(main.env_config['ASGI_WSGI_WORKERS'])
+}
+
+# Database time charged to the request running in the current task
+_db_seconds = contextvars.ContextVar('db_seconds', default=0.0)
+
+# =========================
+# ASYNC DATABASE
+# =========================
+
+def _aiomysql_config(db_config):
+    """mysql.connector keyword arguments -> aiomysql ones"""
+    config = dict(db_config)
+    config['db'] = config.pop('database')
+    return config
+
+class AsyncDatabase:
+    """aiomysql pools for the primary and every replica known to main.replica_router"""
+
+    def __init__(self, size):
+        self.size = size
+        self.primary = None
+        self.replicas = []
+
+    async def start(self):
+        # Autocommit so pooled connections never read from a stale snapshot
+        self.primary = await aiomysql.create_pool(
+            minsize=1, maxsize=self.size, autocommit=True, **_aiomysql_config(main.DB_CONFIG))
+        self.replicas = [
+            await aiomysql.create_pool(minsize=1, maxsize=self.size, autocommit=True,
+                                       **_aiomysql_config(pool.db_config))
+            for pool in main.replica_router.pools
+        ]
+
+    async def close(self):
+        for pool in [self.primary] + self.replicas:
+            if pool is not None:
+                pool.close()
+                await pool.wait_closed()
+
+    async def fetchall(self, sql, params=(), readonly=True):
+        """Run a SELECT, on a replica when allowed and healthy, else on the primary"""
+        router = main.replica_router
+        replica = None
+        if readonly and router.pools:
+            # Measure due lag readings here, so choose() never blocks the loop
+            for index in router.claim_lag_checks():
+                router.record_lag(index, await self._replica_lag(index))
+            replica = router.choose()
+
+        started = time.perf_counter()
+        try:
+            if replica is not None:
+                try:
+                    return await self._fetchall(self.replicas[router.pools.index(replica)], sql, params)
+                except aiomysql.OperationalError as e:
+                    router.mark_failed(replica, e)
+            return await self._fetchall(self.primary, sql, params)
+        finally:
+            _db_seconds.set(_db_seconds.get() + time.perf_counter() - started)
+
+    async def _replica_lag(self, index):
+        """Async twin of analytics_db.replica_lag() on a replica's aiomysql pool"""
+        try:
+            async with self.replicas[index].acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    try:
+                        await cursor.execute(analytics_db.REPLICA_STATUS_QUERY)
+                    except aiomysql.Error:
+                        await cursor.execute(analytics_db.REPLICA_STATUS_QUERY_LEGACY)
+                    return analytics_db.lag_from_status(await cursor.fetchone())
+        except Exception as e:
+            print(f"⚠️ Replica {index} lag check failed: {str(e)}")
+            return None
+
+    @staticmethod
+    async def _fetchall(pool, sql, params):
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchall()
+
+    def stats(self):
+        def pool_stats(pool):
+            if pool is None:
+                return None
+            return {'size': pool.size, 'free': pool.freesize, 'max': pool.maxsize}
+        return {'primary': pool_stats(self.primary), 'replicas': [pool_stats(p) for p in self.replicas]}
+
+db = AsyncDatabase(ASGI_CONFIG['DB_POOL_SIZE'])
+
+async def cached(key, loader, readonly):
+    """Async counterpart of main.cached_read(), sharing api_cache's entries"""
+    if not readonly:
+        return await loader()
+    hit, value, generation = main.api_cache.lookup(key)
+    if hit:
+        return value
+    value = await loader()
+    main.api_cache.store(key, value, generation)
+    return value
+
+def _json_body(payload):
+    # Byte-for-byte what flask.jsonify sends
+    return main.app.json.response(payload).get_data()
+
+def json_response(payload, status=200):
+    return Response(_json_body(payload), status_code=status, media_type='application/json')
+
+def _readonly(request):
+    """Reads stay on the primary right after this client wrote something"""
+    return main._primary_window_expired(request.cookies.get(main.PRIMARY_STICKY_COOKIE))
+
+def endpoint(name):
+    """Record request metrics under the Flask endpoint name and turn errors into JSON"""
+    def decorator(handler):
+        async def wrapper(request):
+            started = time.perf_counter()
+            token = _db_seconds.set(0.0)
+            try:
+                response = await handler(request)
+            except Exception as e:
+                response = json_response({'error': str(e)}, 500)
+            length = response.headers.get('content-length')
+            main.request_metrics.record(
+                name, request.method, response.status_code,
+                time.perf_counter() - started, _db_seconds.get(),
+                int(length) if length is not None else None
+            )
+            _db_seconds.reset(token)
+            return response
+        return wrapper
+    return decorator
+
+# =========================
+# NATIVE ROUTES
+# =========================
+
+@endpoint('get_stats')
+async def get_stats(request):
+    readonly = _readonly(request)
+    async def load():
+        rows = await db.fetchall(main.STATS_SQL, main._stats_params(), readonly)
+        return main._stats_from_row(rows[0])
+    return json_response(await cached('stats', load, readonly))
+
+@endpoint('products_api')
+async def list_products(request):
+    try:
+        query, params, fields, limit = main._build_products_query(request.query_params)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    products = await db.fetchall(query, params, _readonly(request))
+    payload = main._products_payload(products, fields, limit)
+    body = _json_body(payload)
+
+    etag = main.payload_etag(payload)
+    headers = {'ETag': f'"{etag}"'}
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+@endpoint('get_low_stock')
+async def get_low_stock(request):
+    readonly = _readonly(request)
+    if main._parse_flag(request.query_params.get('summary', '')):
+        async def load_summary():
+            rows = await db.fetchall(main.LOW_STOCK_SUMMARY_SQL, (), readonly)
+            for row in rows:
+                row['custom_message'] = ''
+            return rows
+        return json_response(await cached('low_stock_summary', load_summary, readonly))
+
+    async def load():
+        sql, params = main._low_stock_query()
+        return main._low_stock_suppliers(await db.fetchall(sql, params, readonly))
+    return json_response(await cached('low_stock', load, readonly))
+
+@endpoint('get_supplier_low_stock')
+async def get_supplier_low_stock(request):
+    sql, params = main._low_stock_query(request.path_params['supplier_id'])
+    suppliers = main._low_stock_suppliers(await db.fetchall(sql, params, _readonly(request)))
+    if not suppliers:
+        return json_response({'error': 'No low stock products for this supplier'}, 404)
+    return json_response(suppliers[0])
+
+class _LoopQueue:
+    """Bounded queue the broadcaster thread fills and one event-loop task drains"""
+
+    def __init__(self, loop, max_queued):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._max_queued = max_queued
+
+    def put_nowait(self, message):
+        if self._queue.qsize() >= self._max_queued:
+            raise queue.Full
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def drain(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+class _AsyncSubscriber:
+    def __init__(self, loop, max_queued=100):
+        self.events = _LoopQueue(loop, max_queued)
+        self.needs_snapshot = False
+
+@endpoint('dashboard_event_stream')
+async def dashboard_event_stream(request):
+    """Same protocol as the Flask /api/events, without a thread per open stream"""
+    broadcaster = main.dashboard_events
+    try:
+        last_id = int(request.headers.get('last-event-id', ''))
+    except ValueError:
+        last_id = None
+
+    subscriber = broadcaster.subscribe(_AsyncSubscriber(asyncio.get_running_loop()))
+    try:
+        missed = broadcaster.replay_since(last_id) if last_id is not None else None
+        # The first snapshot may have to load stats from MySQL
+        initial = None if missed is not None else await asyncio.to_thread(broadcaster.snapshot)
+    except Exception:
+        broadcaster.unsubscribe(subscriber)
+        raise
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            if initial is not None:
+                event_id, state = initial
+                yield main._sse_message(event_id, 'snapshot', json.dumps(state, default=main._json_default))
+                sent_up_to = event_id
+            else:
+                sent_up_to = last_id
+            for message in missed or []:
+                yield main._sse_message(*message)
+                sent_up_to = message[0]
+
+            while True:
+                if subscriber.needs_snapshot:
+                    subscriber.needs_snapshot = False
+                    subscriber.events.drain()
+                    event_id, state = await asyncio.to_thread(broadcaster.snapshot)
+                    yield main._sse_message(event_id, 'snapshot', json.dumps(state, default=main._json_default))
+                    sent_up_to = event_id
+                try:
+                    message = await subscriber.events.get(broadcaster.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message[0] > sent_up_to:
+                    yield main._sse_message(*message)
+                    sent_up_to = message[0]
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+async def get_asgi_stats(request):
+    """Async pool usage for this serving mode"""
+    return json_response({'db_pool': db.stats(), 'config': ASGI_CONFIG})
+
+# =========================
+# APP
+# =========================
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(main.init_db)
+    await db.start()
+    # Send whatever was left in the outbox before this process started
+    main.email_dispatcher.ensure_started()
+    print(f"⚡ ASGI mode: {ASGI_CONFIG['DB_POOL_SIZE']} async MySQL connections, "
+          f"{ASGI_CONFIG['WSGI_WORKERS']} Flask workers")
+    try:
+        yield
+    finally:
+        await db.close()
+
+app = Starlette(
+    routes=[
+        Route('/api/stats', get_stats, methods=['GET']),
+        Route('/api/products', list_products, methods=['GET']),
+        Route('/api/low-stock', get_low_stock, methods=['GET']),
+        Route('/api/low-stock/{supplier_id:int}', get_supplier_low_stock, methods=['GET']),
+        Route('/api/events', dashboard_event_stream, methods=['GET']),
+        Route('/api/asgi-stats', get_asgi_stats, methods=['GET']),
+        # Everything else, including writes to the routes above
+        Mount('/', app=WSGIMiddleware(main.app, workers=ASGI_CONFIG['WSGI_WORKERS']))
+    ],
+    # Native routes bypass flask_cors; the Flask mount keeps it as well
+    middleware=[Middleware(CORSMiddleware, allow_origins=main.CORS_ORIGINS,
+                           allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
@@ -0,0 +1,99 @@
+"""Benchmark TraditionalAnalyticsEngine on synthetic sales, no database needed.
+
+Run from the dataanalysis directory:
+
+    python analytics_benchmark.py --rows 5000000 --products 2000 --days 730 --low-memory
+
+The script generates --rows sales with final.hybrid_analytics_engine's
+vectorized generator, processes them like the MySQL connector does, then
+times every analysis phase and reports the frame's memory per column.
+It also times a warm start: the processed sales saved to a temporary
+SalesPartitionCache, then loaded back and joined to product attributes
+the way a restarted connector does.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from final.hybrid_analytics_engine import (
+    SalesPartitionCache, TraditionalAnalyticsEngine, TraditionalDataConnector, generate_sales_data,
+    memory_report, month_keys, peak_rss_mb, print_memory_report
+)
+
+SALES_COLUMNS = ['sale_id', 'product_id', 'product_name', 'quantity_sold', 'amount', 'sale_date']
+PRODUCT_COLUMNS = ['product_id', 'current_stock', 'minimum_stock', 'unit_price', 'expiry_date',
+                   'category', 'supplier_name']
+
+PHASES = [
+    ('descriptive', '_descriptive_analysis'),
+    ('diagnostic', '_diagnostic_analysis'),
+    ('predictive', '_predictive_analysis'),
+    ('prescriptive', '_prescriptive_analysis'),
+]
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def warm_start(connector, raw, seed):
+    """(save seconds, load seconds, rows loaded) through a temporary partition cache"""
+    sales = connector._process_sales(raw[SALES_COLUMNS].copy())
+    # Stand-in for the per-row checksums MySQL computes (analytics_db.SALE_ROW_CRC)
+    sales['row_crc'] = np.random.default_rng(seed).integers(0, 2 ** 32, len(sales), dtype='uint32')
+    products = raw[PRODUCT_COLUMNS].drop_duplicates('product_id')
+    months = set(month_keys(sales['sale_date']).unique().tolist())
+    
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SalesPartitionCache(directory, connector.low_memory)
+        _, save_seconds = timed(cache.save, sales, months, int(sales['sale_id'].max()))
+        del sales
+        
+        def load():
+            cached, _ = cache.load()
+            return connector._attach_products(cached, products)
+        data, load_seconds = timed(load)
+    return save_seconds, load_seconds, len(data)
+
+def run(rows, products, days, seed, low_memory):
+    connector = TraditionalDataConnector(low_memory=low_memory)
+    raw, generate_seconds = timed(generate_sales_data, rows, products, days, seed)
+    save_seconds, load_seconds, cached_rows = warm_start(connector, raw, seed)
+    data, process_seconds = timed(connector._process_data, raw)
+    del raw
+
+    engine = TraditionalAnalyticsEngine(data)
+    timings = [('generate', generate_seconds), ('process', process_seconds),
+               ('cache save', save_seconds), ('warm start', load_seconds)]
+    for name, method in PHASES:
+        _, seconds = timed(getattr(engine, method))
+        timings.append((name, seconds))
+    _, seconds = timed(engine.run_complete_analysis)
+    timings.append(('complete analysis', seconds))
+
+    print("📊 Analytics engine benchmark")
+    print("=" * 60)
+    print(f"Rows: {len(data)}  Products: {data['product_name'].nunique()}  Days: {days}  "
+          f"Seed: {seed}  Low memory: {low_memory}")
+    for name, seconds in timings:
+        print(f"{name:<20}{seconds:>10.2f}s")
+    print(f"Warm start loaded {cached_rows} sales (the cache keeps the last 12 months)")
+    print(f"Peak RSS: {peak_rss_mb()} MB")
+    print("=" * 60)
+    print_memory_report(memory_report(data))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365, help='Span of sale dates, ending today')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--low-memory', action='store_true', help='Compact dtypes (ANALYTICS_LOW_MEMORY)')
+    args = parser.parse_args()
+
+    run(args.rows, args.products, args.days, args.seed, args.low_memory)
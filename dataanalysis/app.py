@@ -23,6 +23,9 @@ print("🤖 Inventra AI Gene (Powered by Google Gemini) initialized successfully
 # Simple caching system
 analysis_cache = {}
 
+# One engine for the whole app so its connector loads sales incrementally
+analytics_engine = HybridAnalyticsEngine()
+
 def safe_get(data, key, default=None):
     """Safely get value from dict"""
     if data is None:
@@ -89,8 +92,7 @@ def run_analysis():
     """Run the analytics engine"""
     try:
         print("🔄 Starting Analytics Engine...")
-        engine = HybridAnalyticsEngine()
-        analysis_data = engine.run_analysis()
+        analysis_data = analytics_engine.run_analysis()
         
         # Store in cache
         serializable_data = serialize_analysis_data(analysis_data)
@@ -0,0 +1,161 @@
+"""SQL the analytics engine runs against the inventory database, and the
+.env settings and replica lag check both it and the inventory app use.
+
+Kept free of pandas and the ML stack so the inventory app (main.py) can
+import it and EXPLAIN the exact statements the engine executes.
+"""
+import os
+
+import mysql.connector
+
+# The project's .env, read by both the inventory app and the analytics engine
+ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.env')
+
+def load_env_config(path=ENV_PATH):
+    """KEY=value settings from a .env file; empty if it doesn't exist"""
+    config = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    config[key.strip()] = value.strip()
+    return config
+
+env_config = load_env_config()
+
+def env_setting(key, default=''):
+    """A .env setting, else the process environment, else the default"""
+    return env_config.get(key, os.environ.get(key, default))
+
+# One row per product per day from the rollup maintained by the inventory app
+SALES_ROLLUP_QUERY = """
+SELECT 
+    r.product_id,
+    p.name as product_name,
+    r.quantity as quantity_sold,
+    r.amount,
+    r.sale_day as sale_date,
+    r.transactions,
+    p.current_stock,
+    p.minimum_stock,
+    p.price as unit_price,
+    p.expiry_date,
+    c.name as category,
+    s.name as supplier_name
+FROM sales_daily_rollup r
+LEFT JOIN products p ON r.product_id = p.id
+LEFT JOIN categories c ON p.category_id = c.id
+LEFT JOIN suppliers s ON p.supplier_id = s.id
+WHERE r.sale_day >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
+ORDER BY r.sale_day DESC
+"""
+
+# Checksum of one sales_history row. Its BIT_XOR over a month fingerprints
+# the month, changing with any insert, delete or edit of its sales.
+SALE_ROW_CRC = "CRC32(CONCAT_WS('|', id, product_id, product_name, quantity_sold, amount, sale_date))"
+
+RAW_SALES_SELECT = f"""
+SELECT 
+    sh.id as sale_id,
+    sh.product_id,
+    sh.product_name,
+    sh.quantity_sold,
+    sh.amount,
+    sh.sale_date,
+    {SALE_ROW_CRC} as row_crc
+FROM sales_history sh
+"""
+
+# Raw sales above an id floor (see sales_delta_floor), streamed in primary key order
+SALES_DELTA_QUERY = RAW_SALES_SELECT + """
+WHERE sh.id > %s
+AND sh.sale_date >= %s
+ORDER BY sh.id
+"""
+
+# Ids below the watermark every delta reads again. An id is assigned at
+# INSERT but becomes visible at COMMIT, so a lower id can show up after a
+# higher one; re-reading the tail picks up such late commits.
+SALES_DELTA_REREAD_IDS = int(env_setting('ANALYTICS_REREAD_IDS', '10000'))
+
+def sales_delta_floor(watermark):
+    """Lowest id (exclusive) the next delta reads, for a sale_id watermark"""
+    return max(int(watermark) - SALES_DELTA_REREAD_IDS, 0)
+
+# One month's sales up to the watermark, to rebuild a stale cache partition
+SALES_MONTH_QUERY = RAW_SALES_SELECT + """
+WHERE sh.id <= %s
+AND sh.sale_date >= %s AND sh.sale_date < %s
+ORDER BY sh.id
+"""
+
+# Per-month row count and highest id, checked against the cache manifest.
+# Answered from idx_sales_history_sale_date alone (InnoDB secondary indexes
+# carry the id), so it reads no rows; it catches inserts and deletes.
+SALES_MONTHS_QUERY = """
+SELECT 
+    YEAR(sale_date) * 100 + MONTH(sale_date) as ym,
+    COUNT(*) as sales,
+    MAX(id) as max_sale_id
+FROM sales_history
+WHERE id <= %s AND sale_date >= %s
+GROUP BY ym
+"""
+
+# The same plus the XOR of every row's checksum, which also catches in-place
+# edits but reads and hashes every sale in the window
+SALES_MONTHS_CHECKSUM_QUERY = f"""
+SELECT 
+    YEAR(sale_date) * 100 + MONTH(sale_date) as ym,
+    COUNT(*) as sales,
+    MAX(id) as max_sale_id,
+    BIT_XOR({SALE_ROW_CRC}) as checksum
+FROM sales_history
+WHERE id <= %s AND sale_date >= %s
+GROUP BY ym
+"""
+
+PRODUCT_ATTRIBUTES_QUERY = """
+SELECT 
+    p.id as product_id,
+    p.current_stock,
+    p.minimum_stock,
+    p.price as unit_price,
+    p.expiry_date,
+    c.name as category,
+    s.name as supplier_name
+FROM products p
+LEFT JOIN categories c ON p.category_id = c.id
+LEFT JOIN suppliers s ON p.supplier_id = s.id
+"""
+
+# Changes whenever a product is edited, sold, added or deleted
+PRODUCTS_VERSION_QUERY = "SELECT MAX(last_updated) AS last_updated, COUNT(*) AS products FROM products"
+
+# Replica status; the second form is for MySQL before 8.0.22
+REPLICA_STATUS_QUERY = "SHOW REPLICA STATUS"
+REPLICA_STATUS_QUERY_LEGACY = "SHOW SLAVE STATUS"
+
+def lag_from_status(row):
+    """Seconds behind the source from a replica status row (as a dict)"""
+    if not row:
+        return None
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return float(lag) if lag is not None else None
+
+def replica_lag(conn):
+    """Seconds a replica is behind its source, or None if it is not replicating"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(REPLICA_STATUS_QUERY)
+    except mysql.connector.Error:
+        cursor.execute(REPLICA_STATUS_QUERY_LEGACY)
+    row = cursor.fetchone()
+    cursor.close()
+    return lag_from_status(row)
+
+def replica_usable(lag, max_lag):
+    """Whether a replica lag reading is within max_lag seconds (None: no limit)"""
+    return max_lag is None or (lag is not None and lag <= max_lag)
@@ -10,12 +10,35 @@ from datetime import datetime, timedelta
 import warnings
 import logging
 from typing import Dict, Any
+from pandas.api.types import union_categoricals
 import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
 from sklearn.ensemble import IsolationForest
 from sklearn.linear_model import LinearRegression
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import google.generativeai as genai
+from final.analytics_db import (
+    PRODUCT_ATTRIBUTES_QUERY, PRODUCTS_VERSION_QUERY, SALES_DELTA_QUERY, SALES_MONTH_QUERY,
+    SALES_MONTHS_CHECKSUM_QUERY, SALES_MONTHS_QUERY, SALES_ROLLUP_QUERY, env_setting,
+    replica_lag, replica_usable, sales_delta_floor
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
@@ -36,10 +59,362 @@ def format_rupees(amount):
     else:
         return f"₹{amount:.0f}"
 
+# Opt-in query timing, switched like the inventory app's SQL profiler
+SQL_PROFILER = env_setting('SQL_PROFILER', 'false').lower() == 'true'
+SQL_SLOW_QUERY_MS = float(env_setting('SQL_SLOW_QUERY_MS', '200'))
+
+# Rows fetched and compacted at a time, so loads run in bounded memory
+SALES_CHUNK_SIZE = 200000
+
+# Repeated labels stored once per distinct value
+CATEGORICAL_COLUMNS = ['product_name', 'category', 'supplier_name']
+
+INT32 = np.iinfo(np.int32)
+
+# Derive sale/inventory columns with compact dtypes (int8 month/quarter,
+# categorical weekday, float32 money); for very large sales histories
+ANALYTICS_LOW_MEMORY = env_setting('ANALYTICS_LOW_MEMORY', 'false').lower() == 'true'
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def compact_frame(df, columns=None, floats=False):
+    """Downcast integer columns and turn repeated labels into categoricals, in place.
+
+    Float columns (money) keep float64 unless floats=True, for low-memory mode.
+    """
+    for col in columns or df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif pd.api.types.is_bool_dtype(df[col]):
+            continue
+        elif pd.api.types.is_integer_dtype(df[col]):
+            # No narrower than int32, so stock and quantity arithmetic can't overflow
+            values = df[col]
+            if len(values) and INT32.min <= values.min() and values.max() <= INT32.max:
+                df[col] = values.astype('int32')
+        elif floats and pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+def concat_compact(frames):
+    """pd.concat that keeps categorical columns categorical across frames"""
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].columns:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = union_categoricals([f[col] for f in frames]).categories
+            for f in frames:
+                f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def memory_report(df):
+    """Deep memory use of every column, largest first"""
+    usage = df.memory_usage(deep=True, index=False).sort_values(ascending=False)
+    return {
+        'rows': len(df),
+        'total_mb': round(float(usage.sum()) / 1024 ** 2, 1),
+        'columns': {
+            col: {'dtype': str(df[col].dtype), 'mb': round(float(nbytes) / 1024 ** 2, 2)}
+            for col, nbytes in usage.items()
+        }
+    }
+
+def print_memory_report(report):
+    print(f"🧮 Analytics frame: {report['rows']} rows, {report['total_mb']} MB")
+    for col, info in report['columns'].items():
+        print(f"   {col:<20}{info['dtype']:<12}{info['mb']:>10.2f} MB")
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _read_sql(query, conn, params, chunksize):
+    if not chunksize:
+        return pd.read_sql(query, conn, params=params)
+    chunks = [compact_frame(chunk) for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize)]
+    return concat_compact(chunks)
+
+def read_sql_profiled(query, conn, source='TraditionalDataConnector.get_data', params=None, chunksize=None):
+    """pd.read_sql that logs duration and rows, plus EXPLAIN for slow queries.
+
+    With chunksize, rows are streamed and compacted chunk by chunk.
+    """
+    if not SQL_PROFILER:
+        return _read_sql(query, conn, params, chunksize)
+    
+    started = time.perf_counter()
+    df = _read_sql(query, conn, params, chunksize)
+    duration_ms = (time.perf_counter() - started) * 1000
+    logging.info(f"SQL {source}: {duration_ms:.1f}ms, {len(df)} rows")
+    
+    if duration_ms >= SQL_SLOW_QUERY_MS:
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("EXPLAIN " + query, params)
+            plan = cursor.fetchall()
+            cursor.close()
+            full_scans = [row.get('table') for row in plan if row.get('type') == 'ALL']
+            logging.warning(f"Slow SQL {source} ({duration_ms:.1f}ms), full scans: {full_scans or 'none'}, plan: {plan}")
+        except Exception as e:
+            logging.warning(f"EXPLAIN failed for slow SQL {source}: {e}")
+    return df
+
+# Read replicas for analytics pulls, configured like the inventory app:
+# DB_REPLICA_HOSTS=host[:port],..., DB_REPLICA_USER / DB_REPLICA_PASSWORD
+# and optionally DB_REPLICA_MAX_LAG seconds
+DB_REPLICA_HOSTS = [h.strip() for h in env_setting('DB_REPLICA_HOSTS').split(',') if h.strip()]
+DB_REPLICA_USER = env_setting('DB_REPLICA_USER', env_setting('DB_USER', 'root'))
+DB_REPLICA_PASSWORD = env_setting('DB_REPLICA_PASSWORD', env_setting('DB_PASSWORD', 'root'))
+DB_REPLICA_MAX_LAG = float(env_setting('DB_REPLICA_MAX_LAG')) if env_setting('DB_REPLICA_MAX_LAG') else None
+
+# Processed raw sales persisted per month (needs pyarrow); ANALYTICS_CACHE=false disables it
+ANALYTICS_CACHE = env_setting('ANALYTICS_CACHE', 'true').lower() == 'true'
+ANALYTICS_CACHE_DIR = env_setting('ANALYTICS_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'cache'
+)
+# How the first load checks cached months against MySQL: 'counts' compares
+# row count and highest id per month from the sale_date index (added or
+# deleted sales), 'checksum' also hashes every row (edited sales too),
+# 'false' trusts the cache as is
+ANALYTICS_CACHE_VERIFY = env_setting('ANALYTICS_CACHE_VERIFY', 'counts').lower()
+
+def window_start():
+    """First day of the month 12 months back; raw analysis covers whole months"""
+    return (pd.Timestamp.today().normalize() - pd.DateOffset(months=12)).replace(day=1)
+
+def month_keys(dates):
+    """Datetime series -> YYYYMM integers"""
+    return dates.dt.year * 100 + dates.dt.month
+
+class SalesPartitionCache:
+    """Processed raw sales as one uncompressed Feather file per month.
+
+    manifest.json holds the sale_id watermark and every month's
+    fingerprint: row count, highest sale_id and the XOR of the rows'
+    row_crc, matching SALES_MONTHS_QUERY and SALES_MONTHS_CHECKSUM_QUERY.
+    A month's file is only rewritten when that month's sales change. Files and the manifest are written to
+    unique temp files and renamed into place, so concurrent writers never
+    share a partial file.
+    """
+    
+    # Bump when the processed sales columns change
+    FORMAT = 2
+    
+    def __init__(self, directory, low_memory=False):
+        self.directory = directory
+        self.low_memory = low_memory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+    
+    def _path(self, ym):
+        return os.path.join(self.directory, f"sales-{ym}.feather")
+    
+    def manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format') != self.FORMAT or manifest.get('low_memory') != self.low_memory:
+            return None
+        return manifest
+    
+    def load(self):
+        """(sales, manifest) from disk, or (None, None) when there is no usable cache"""
+        manifest = self.manifest()
+        if not manifest:
+            return None, None
+        try:
+            tables = [feather.read_table(self._path(ym)) for ym in sorted(manifest['months'])]
+        except (OSError, pa.ArrowException) as e:
+            logging.warning(f"Analytics cache unreadable, reloading from MySQL: {e}")
+            return None, None
+        if not tables:
+            return None, None
+        
+        sales = pa.concat_tables(tables, promote_options='permissive').to_pandas(split_blocks=True)
+        # A concurrent writer may have replaced month files after this manifest
+        sales = sales[sales['sale_id'] <= manifest['watermark']]
+        return sales, manifest
+    
+    def save(self, sales, months, watermark):
+        """Rewrite the given YYYYMM partitions from sales and record the new watermark"""
+        os.makedirs(self.directory, exist_ok=True)
+        keys = month_keys(sales['sale_date'])
+        manifest = self.manifest() or {'format': self.FORMAT, 'low_memory': self.low_memory, 'months': {}}
+        
+        for ym in months:
+            partition = sales[keys == ym]
+            if partition.empty:
+                manifest['months'].pop(str(ym), None)
+                if os.path.exists(self._path(ym)):
+                    os.remove(self._path(ym))
+                continue
+            table = pa.Table.from_pandas(partition, preserve_index=False)
+            self._replace(self._path(ym), lambda path: feather.write_feather(table, path, compression='uncompressed'))
+            manifest['months'][str(ym)] = {
+                'sales': len(partition),
+                'max_sale_id': int(partition['sale_id'].max()),
+                'checksum': int(np.bitwise_xor.reduce(partition['row_crc'].to_numpy(dtype='uint64')))
+            }
+        
+        # Months that slid out of the window
+        first = int(window_start().strftime('%Y%m'))
+        for ym in [m for m in manifest['months'] if int(m) < first]:
+            manifest['months'].pop(ym)
+            if os.path.exists(self._path(ym)):
+                os.remove(self._path(ym))
+        
+        manifest['watermark'] = int(watermark)
+        
+        def write_manifest(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+        self._replace(self.manifest_path, write_manifest)
+    
+    def _replace(self, path, write):
+        """Write path through a temp file of its own, then rename it into place"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+# Sample catalog: (name, price, supplier, max_stock, min_stock, expiry) per category
+INDIAN_PRODUCTS = {
+    'Electronics': [
+        ('iPhone 15', 129900, 'Apple Store India', 15, 5, '2026-12-31'),
+        ('Samsung Galaxy S24', 79999, 'Samsung India', 25, 10, '2026-12-31'),
+        ('OnePlus 12', 64999, 'OnePlus India', 30, 12, '2026-12-31'),
+        ('Boat Airdopes', 2999, 'Boat Lifestyle', 80, 30, '2026-12-31')
+    ],
+    'Fashion & Lifestyle': [
+        ('Nike Air Force 1', 7995, 'Nike India', 60, 25, '2026-12-31'),
+        ('Adidas Ultraboost', 16999, 'Adidas', 45, 18, '2026-12-31'),
+        ('Levi\'s 511 Jeans', 3999, 'Levi\'s', 70, 30, '2026-12-31')
+    ],
+    'Home & Kitchen': [
+        ('Prestige Pressure Cooker', 2999, 'Prestige', 60, 25, '2030-12-31'),
+        ('Bajaj Mixer Grinder', 4999, 'Bajaj', 45, 20, '2030-12-31'),
+        ('Philips Air Fryer', 12999, 'Philips India', 25, 10, '2030-12-31')
+    ],
+    'Grocery & Food': [
+        ('Amul Butter 500g', 250, 'Amul', 300, 120, '2025-12-31'),
+        ('Tata Salt 1kg', 25, 'Tata Consumer', 500, 200, '2026-12-31'),
+        ('Maggi Noodles', 14, 'Nestle', 800, 300, '2025-11-30'),
+        ('Britannia Biscuits', 35, 'Britannia', 400, 150, '2025-10-31')
+    ],
+    'Personal Care': [
+        ('Himalaya Face Wash', 149, 'Himalaya', 100, 40, '2026-06-30'),
+        ('Lakme Lipstick', 599, 'Lakme', 80, 32, '2027-12-31'),
+        ('Dove Soap', 89, 'HUL', 200, 80, '2026-12-31')
+    ]
+}
+
+# Demand multiplier per calendar month, January first
+SEASONAL_FACTORS = np.array([
+    1.3, 1.3,        # Wedding season (Dec-Feb)
+    1.0,
+    1.1, 1.1,        # Summer sales
+    0.8, 0.8, 0.8,   # Monsoon
+    1.0,
+    1.6, 1.6,        # Diwali season
+    1.3
+])
+
+def generate_sales_data(rows=None, products=None, days=365, seed=42):
+    """Synthetic raw sales in the shape TraditionalDataConnector loads, vectorized.
+
+    Products beyond the catalog are priced variants of catalog items. rows
+    defaults to 200-500 sales per product, days is the span ending today.
+    """
+    rng = np.random.default_rng(seed)
+    catalog = [
+        (category,) + product
+        for category, product_list in INDIAN_PRODUCTS.items()
+        for product in product_list
+    ]
+    products = products or len(catalog)
+    
+    base = np.arange(products) % len(catalog)
+    variant = np.arange(products) // len(catalog)
+    names = [catalog[b][1] if v == 0 else f"{catalog[b][1]} #{v + 1}" for b, v in zip(base, variant)]
+    categories = list(INDIAN_PRODUCTS)
+    suppliers = sorted({item[3] for item in catalog})
+    category_codes = np.array([categories.index(item[0]) for item in catalog])[base]
+    supplier_codes = np.array([suppliers.index(item[3]) for item in catalog])[base]
+    
+    prices = np.array([item[2] for item in catalog], dtype='float64')[base]
+    prices = np.where(variant > 0, np.round(prices * rng.uniform(0.8, 1.2, products)), prices)
+    max_stock = np.array([item[4] for item in catalog])[base]
+    min_stock = np.array([item[5] for item in catalog])[base]
+    current_stock = rng.integers(min_stock, max_stock)
+    expiry = pd.to_datetime([item[6] for item in catalog]).values[base]
+    
+    # Sales per product
+    popularity = rng.integers(200, 500, products)
+    if rows is None:
+        rows = int(popularity.sum())
+        product_idx = np.repeat(np.arange(products), popularity)
+    else:
+        product_idx = rng.choice(products, size=rows, p=popularity / popularity.sum())
+    
+    # Anchored on midnight so a seed reproduces the same sales all day
+    start_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+    sale_date = start_date + pd.to_timedelta(rng.integers(0, days * 86400, rows), unit='s')
+    
+    # Seasonal patterns
+    seasonal_factor = SEASONAL_FACTORS[sale_date.month - 1]
+    quantity = np.maximum(1, (rng.poisson(2, rows) * seasonal_factor).astype('int64'))
+    amount = np.round(prices[product_idx] * quantity * rng.uniform(0.95, 1.05, rows), 2)
+    
+    return pd.DataFrame({
+        'sale_id': np.arange(1, rows + 1),
+        'product_id': product_idx + 1,
+        'product_name': pd.Categorical.from_codes(product_idx, names),
+        'quantity_sold': quantity,
+        'amount': amount,
+        'sale_date': sale_date,
+        'current_stock': current_stock[product_idx],
+        'minimum_stock': min_stock[product_idx],
+        'unit_price': prices[product_idx],
+        'expiry_date': expiry[product_idx],
+        'category': pd.Categorical.from_codes(category_codes[product_idx], categories),
+        'supplier_name': pd.Categorical.from_codes(supplier_codes[product_idx], suppliers)
+    })
+
 class TraditionalDataConnector:
-    """Traditional data connector with FIXED datetime handling"""
+    """Traditional data connector with FIXED datetime handling
+
+    source='raw' reads individual sales_history rows; source='rollup' reads
+    daily per-product totals from sales_daily_rollup, with the number of
+    sales behind each row in `transactions`.
+
+    Raw loads are incremental: the connector keeps the sales it already has
+    (processed, and persisted per month in SalesPartitionCache across
+    restarts) and only fetches rows past the highest sale_id seen, less a
+    trailing window of ANALYTICS_REREAD_IDS ids that catches sales
+    committing after a higher id, and re-reads product/category/supplier
+    attributes only when products.last_updated moves. Reuse one connector
+    to benefit.
+
+    low_memory (default ANALYTICS_LOW_MEMORY) derives columns in place with
+    compact dtypes; memory_report holds the per-column footprint of the last
+    frame returned.
+    """
     
-    def __init__(self):
+    def __init__(self, source='raw', low_memory=None):
+        if source not in ('raw', 'rollup'):
+            raise ValueError("source must be 'raw' or 'rollup'")
+        self.source = source
+        self.low_memory = ANALYTICS_LOW_MEMORY if low_memory is None else low_memory
         self.connection_params = {
             'user': 'root',
             'password': 'root',
@@ -47,54 +422,214 @@ class TraditionalDataConnector:
             'database': 'inventory_ai'
         }
         
+        self._lock = threading.Lock()
+        self._sales = None
+        self._watermark = 0
+        self._products = None
+        self._products_version = None
+        self.cache = (SalesPartitionCache(ANALYTICS_CACHE_DIR, self.low_memory)
+                      if ANALYTICS_CACHE and pa is not None else None)
+        self.last_load = {}
+        self.memory_report = {}
+        
+    def _connect(self):
+        """Connect to a usable read replica if configured, else to the primary"""
+        hosts = list(DB_REPLICA_HOSTS)
+        random.shuffle(hosts)
+        for host_port in hosts:
+            host, _, port = host_port.partition(':')
+            params = dict(self.connection_params, host=host,
+                          user=DB_REPLICA_USER, password=DB_REPLICA_PASSWORD)
+            if port:
+                params['port'] = int(port)
+            try:
+                conn = mysql.connector.connect(**params)
+                if DB_REPLICA_MAX_LAG is not None:
+                    lag = replica_lag(conn)
+                    if not replica_usable(lag, DB_REPLICA_MAX_LAG):
+                        logging.warning(f"Replica {host_port} lag {lag}s over limit, skipping")
+                        conn.close()
+                        continue
+                return conn
+            except mysql.connector.Error as e:
+                logging.warning(f"Replica {host_port} unavailable: {e}")
+        return mysql.connector.connect(**self.connection_params)
+        
     def get_data(self) -> pd.DataFrame:
         """Get retail data with proper datetime handling"""
+        df = self._get_data()
+        self.memory_report = memory_report(df)
+        if self.low_memory:
+            print_memory_report(self.memory_report)
+        return df
+    
+    def _get_data(self):
         try:
-            conn = mysql.connector.connect(**self.connection_params)
-            
-            query = """
-            SELECT 
-                sh.id as sale_id,
-                sh.product_id,
-                sh.product_name,
-                sh.quantity_sold,
-                sh.amount,
-                sh.sale_date,
-                p.current_stock,
-                p.minimum_stock,
-                p.price as unit_price,
-                p.expiry_date,
-                c.name as category,
-                s.name as supplier_name
-            FROM sales_history sh
-            LEFT JOIN products p ON sh.product_id = p.id
-            LEFT JOIN categories c ON p.category_id = c.id
-            LEFT JOIN suppliers s ON p.supplier_id = s.id
-            WHERE sh.sale_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-            ORDER BY sh.sale_date DESC
-            LIMIT 10000
-            """
-            
-            df = pd.read_sql(query, conn)
-            conn.close()
-            
-            # FIXED: Proper datetime conversion BEFORE processing
-            df['sale_date'] = pd.to_datetime(df['sale_date'], errors='coerce')
-            df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
+            conn = self._connect()
             
-            # Drop rows with invalid sale_date
-            df = df.dropna(subset=['sale_date'])
+            if self.source == 'rollup':
+                df = read_sql_profiled(SALES_ROLLUP_QUERY, conn, chunksize=SALES_CHUNK_SIZE)
+                conn.close()
+                
+                # FIXED: Proper datetime conversion BEFORE processing
+                df['sale_date'] = pd.to_datetime(df['sale_date'], errors='coerce')
+                df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
+                
+                # Drop rows with invalid sale_date
+                df = self._drop_missing_dates(df)
+                if not df.empty:
+                    df = self._process_data(df)
+            else:
+                with self._lock:
+                    df = self._load_raw_incremental(conn)
+                conn.close()
             
             if df.empty:
                 print("No valid data from database, creating sample data...")
                 return self._create_sample_data()
             
-            return self._process_data(df)
+            return df
             
         except Exception as e:
             print(f"Database error: {e}")
             return self._create_sample_data()
     
+    def _read_sales(self, conn, query, params, source):
+        """Fetch raw sales rows and process them, newest first"""
+        sales = read_sql_profiled(query, conn, source=source, params=params, chunksize=SALES_CHUNK_SIZE)
+        sales['sale_date'] = pd.to_datetime(sales['sale_date'], errors='coerce')
+        # Only kept to fingerprint cached months; see SalesPartitionCache
+        sales['row_crc'] = sales['row_crc'].astype('uint32')
+        sales = self._drop_missing_dates(sales)
+        sales = sales.sort_values('sale_date', ascending=False, kind='stable')
+        return self._process_sales(sales)
+    
+    def _load_from_cache(self, conn):
+        """Adopt the on-disk partitions, rebuilding any month that no longer matches MySQL"""
+        started = time.perf_counter()
+        sales, manifest = self.cache.load()
+        if sales is None:
+            return set()
+        watermark = manifest['watermark']
+        
+        stale = set()
+        if ANALYTICS_CACHE_VERIFY != 'false':
+            fields = ['sales', 'max_sale_id']
+            query = SALES_MONTHS_QUERY
+            if ANALYTICS_CACHE_VERIFY == 'checksum':
+                fields.append('checksum')
+                query = SALES_MONTHS_CHECKSUM_QUERY
+            cursor = conn.cursor()
+            cursor.execute(query, (watermark, window_start().to_pydatetime()))
+            current = {int(row[0]): tuple(int(v) for v in row[1:]) for row in cursor.fetchall()}
+            cursor.close()
+            cached = {int(ym): tuple(m[field] for field in fields)
+                      for ym, m in manifest['months'].items()}
+            stale = {ym for ym in set(current) | set(cached) if current.get(ym) != cached.get(ym)}
+        
+        if stale:
+            sales = sales[~month_keys(sales['sale_date']).isin(stale)]
+            rebuilt = []
+            for ym in sorted(stale):
+                month_start = pd.Timestamp(year=ym // 100, month=ym % 100, day=1)
+                params = (watermark, month_start.to_pydatetime(), (month_start + pd.DateOffset(months=1)).to_pydatetime())
+                rebuilt.append(self._read_sales(conn, SALES_MONTH_QUERY, params, 'TraditionalDataConnector.sales_month'))
+            sales = concat_compact(rebuilt + [sales])
+            sales = sales.sort_values('sale_date', ascending=False, kind='stable').reset_index(drop=True)
+            logging.info(f"Analytics cache: rebuilt stale months {sorted(stale)}")
+        
+        self._sales = sales
+        self._watermark = watermark
+        print(f"💾 Analytics cache: {len(sales)} sales from {len(manifest['months'])} months "
+              f"in {time.perf_counter() - started:.2f}s")
+        return stale
+    
+    def _load_raw_incremental(self, conn):
+        """Append sales past the watermark and attach current product attributes"""
+        started = time.perf_counter()
+        
+        changed_months = set()
+        from_cache = False
+        if self._sales is None and self.cache is not None:
+            changed_months |= self._load_from_cache(conn)
+            from_cache = self._sales is not None
+        
+        floor = sales_delta_floor(self._watermark)
+        new_sales = self._read_sales(
+            conn, SALES_DELTA_QUERY, (floor, window_start().to_pydatetime()),
+            'TraditionalDataConnector.sales_delta'
+        )
+        if self._sales is not None and not new_sales.empty:
+            # The re-read tail repeats sales already held; keep late commits and new ids
+            held = self._sales['sale_id']
+            new_sales = new_sales[~new_sales['sale_id'].isin(held[held > floor])]
+        late_sales = int((new_sales['sale_id'] <= self._watermark).sum())
+        changed_months |= set(month_keys(new_sales['sale_date']).unique().tolist())
+        
+        sales = new_sales if self._sales is None else concat_compact([new_sales, self._sales])
+        # Slide the window a month at a time
+        if (sales['sale_date'] < window_start()).any():
+            sales = sales[sales['sale_date'] >= window_start()].reset_index(drop=True)
+            for col in CATEGORICAL_COLUMNS:
+                if col in sales.columns:
+                    sales[col] = sales[col].cat.remove_unused_categories()
+        
+        cursor = conn.cursor()
+        cursor.execute(PRODUCTS_VERSION_QUERY)
+        products_version = cursor.fetchone()
+        cursor.close()
+        
+        products_reloaded = self._products is None or products_version != self._products_version
+        if products_reloaded:
+            products = compact_frame(read_sql_profiled(
+                PRODUCT_ATTRIBUTES_QUERY, conn, source='TraditionalDataConnector.product_attributes'
+            ))
+        else:
+            products = self._products
+        
+        if not new_sales.empty:
+            self._watermark = max(self._watermark, int(new_sales['sale_id'].max()))
+        if self.cache is not None and (changed_months or not from_cache):
+            self.cache.save(sales, changed_months, self._watermark)
+        
+        self._sales = sales
+        self._products = products
+        self._products_version = products_version
+        self.last_load = {
+            'new_sales': len(new_sales),
+            'late_sales': late_sales,
+            'total_sales': len(sales),
+            'from_cache': from_cache,
+            'months_rewritten': len(changed_months) if self.cache is not None else 0,
+            'products_reloaded': products_reloaded,
+            'watermark': self._watermark,
+            'seconds': round(time.perf_counter() - started, 3),
+            'sales_mb': round(float(sales.memory_usage(deep=True).sum()) / 1024 ** 2, 1),
+            'peak_rss_mb': peak_rss_mb()
+        }
+        print(f"🔄 Incremental load: {len(new_sales)} new sales, {len(sales)} total, "
+              f"product attributes {'reloaded' if products_reloaded else 'reused'} "
+              f"({self.last_load['seconds']}s, {self.last_load['sales_mb']} MB, "
+              f"peak RSS {self.last_load['peak_rss_mb']} MB)")
+        
+        return self._attach_products(sales, products)
+    
+    def _attach_products(self, sales, products):
+        """Look up each sale's product attributes; inventory metrics are computed per product"""
+        products = self._process_inventory(products.copy())
+        attributes = products.set_index('product_id').reindex(sales['product_id'].to_numpy())
+        attributes.index = sales.index
+        sales = sales.drop(columns='row_crc', errors='ignore')
+        # A fresh frame every time: the analytics engine mutates what it is given
+        return pd.concat([sales, attributes], axis=1)
+    
+    @staticmethod
+    def _drop_missing_dates(df):
+        # dropna copies the whole frame even when nothing is dropped
+        if df['sale_date'].isna().any():
+            df = df.dropna(subset=['sale_date'])
+        return df
+    
     def _process_data(self, df):
         """Process data with Indian pricing - FIXED datetime operations"""
         
@@ -102,29 +637,58 @@ class TraditionalDataConnector:
         if not pd.api.types.is_datetime64_any_dtype(df['sale_date']):
             df['sale_date'] = pd.to_datetime(df['sale_date'], errors='coerce')
         
-        if 'expiry_date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['expiry_date']):
-            df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
-        
         # Drop any remaining invalid dates
-        df = df.dropna(subset=['sale_date'])
+        df = self._drop_missing_dates(df)
+        if self.low_memory:
+            df = compact_frame(df, floats=True)
         
+        df = self._process_sales(df)
+        return self._process_inventory(df)
+    
+    def _money(self, values):
+        """Numeric column converted to Indian Rupees"""
+        values = pd.to_numeric(values, errors='coerce')
+        if self.low_memory:
+            return values.astype('float32') * np.float32(83)
+        return values * 83
+    
+    def _process_sales(self, df):
+        """Columns derived from the sale rows alone"""
         # Convert to Indian Rupees
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce') * 83
-        df['unit_price'] = pd.to_numeric(df['unit_price'], errors='coerce') * 83
+        df['amount'] = self._money(df['amount'])
         
         # Now safe to use .dt accessor
-        df['month'] = df['sale_date'].dt.month
-        df['quarter'] = df['sale_date'].dt.quarter
-        df['weekday'] = df['sale_date'].dt.day_name()
+        if self.low_memory:
+            df['month'] = df['sale_date'].dt.month.astype('int8')
+            df['quarter'] = df['sale_date'].dt.quarter.astype('int8')
+            # Straight from day numbers, without a name string per row
+            df['weekday'] = pd.Categorical.from_codes(df['sale_date'].dt.dayofweek.to_numpy(), WEEKDAYS)
+        else:
+            df['month'] = df['sale_date'].dt.month
+            df['quarter'] = df['sale_date'].dt.quarter
+            df['weekday'] = df['sale_date'].dt.day_name().astype('category')
         
         # Financial calculations
         df['cost'] = df['amount'] * 0.7
         df['profit'] = df['amount'] - df['cost']
         df['profit_margin'] = np.where(df['amount'] > 0, (df['profit'] / df['amount']) * 100, 0)
         
-        # Customer simulation
-        np.random.seed(42)
-        df['customer_id'] = np.random.choice(range(1, 1000), size=len(df))
+        # Customer simulation, stable per sale so incremental loads agree with full ones
+        if 'sale_id' in df.columns:
+            df['customer_id'] = (df['sale_id'].astype('int64') * 2654435761) % 999 + 1
+        else:
+            np.random.seed(42)
+            df['customer_id'] = np.random.choice(range(1, 1000), size=len(df))
+        
+        if self.low_memory:
+            df['profit_margin'] = df['profit_margin'].astype('float32')
+            df['customer_id'] = df['customer_id'].astype('int16')
+        
+        return df
+    
+    def _process_inventory(self, df):
+        """Columns derived from product attributes"""
+        df['unit_price'] = self._money(df['unit_price'])
         
         # Inventory processing
         df['current_stock'] = pd.to_numeric(df['current_stock'], errors='coerce').fillna(0)
@@ -134,6 +698,8 @@ class TraditionalDataConnector:
         
         # Days to expiry (only if expiry_date exists)
         if 'expiry_date' in df.columns:
+            if not pd.api.types.is_datetime64_any_dtype(df['expiry_date']):
+                df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
             current_time = pd.Timestamp.now()
             df['days_to_expiry'] = (df['expiry_date'] - current_time).dt.days
             df['is_expiring_soon'] = df['days_to_expiry'] < 30
@@ -141,92 +707,16 @@ class TraditionalDataConnector:
             df['days_to_expiry'] = np.nan
             df['is_expiring_soon'] = False
         
+        if self.low_memory:
+            df = compact_frame(df, ['current_stock', 'minimum_stock'])
+            for col in ('stock_ratio', 'days_to_expiry'):
+                df[col] = df[col].astype('float32')
+        
         return df
     
-    def _create_sample_data(self):
+    def _create_sample_data(self, rows=None, products=None, days=365, seed=42):
         """Create Indian retail sample data with PROPER datetime types"""
-        np.random.seed(42)
-        
-        indian_products = {
-            'Electronics': [
-                ('iPhone 15', 129900, 'Apple Store India', 15, 5, '2026-12-31'),
-                ('Samsung Galaxy S24', 79999, 'Samsung India', 25, 10, '2026-12-31'),
-                ('OnePlus 12', 64999, 'OnePlus India', 30, 12, '2026-12-31'),
-                ('Boat Airdopes', 2999, 'Boat Lifestyle', 80, 30, '2026-12-31')
-            ],
-            'Fashion & Lifestyle': [
-                ('Nike Air Force 1', 7995, 'Nike India', 60, 25, '2026-12-31'),
-                ('Adidas Ultraboost', 16999, 'Adidas', 45, 18, '2026-12-31'),
-                ('Levi\'s 511 Jeans', 3999, 'Levi\'s', 70, 30, '2026-12-31')
-            ],
-            'Home & Kitchen': [
-                ('Prestige Pressure Cooker', 2999, 'Prestige', 60, 25, '2030-12-31'),
-                ('Bajaj Mixer Grinder', 4999, 'Bajaj', 45, 20, '2030-12-31'),
-                ('Philips Air Fryer', 12999, 'Philips India', 25, 10, '2030-12-31')
-            ],
-            'Grocery & Food': [
-                ('Amul Butter 500g', 250, 'Amul', 300, 120, '2025-12-31'),
-                ('Tata Salt 1kg', 25, 'Tata Consumer', 500, 200, '2026-12-31'),
-                ('Maggi Noodles', 14, 'Nestle', 800, 300, '2025-11-30'),
-                ('Britannia Biscuits', 35, 'Britannia', 400, 150, '2025-10-31')
-            ],
-            'Personal Care': [
-                ('Himalaya Face Wash', 149, 'Himalaya', 100, 40, '2026-06-30'),
-                ('Lakme Lipstick', 599, 'Lakme', 80, 32, '2027-12-31'),
-                ('Dove Soap', 89, 'HUL', 200, 80, '2026-12-31')
-            ]
-        }
-        
-        sample_data = []
-        start_date = datetime.now() - timedelta(days=365)
-        
-        for category, product_list in indian_products.items():
-            for product_name, price, supplier, max_stock, min_stock, expiry in product_list:
-                
-                num_sales = np.random.randint(200, 500)
-                
-                for _ in range(num_sales):
-                    sale_date = start_date + timedelta(days=np.random.randint(0, 365))
-                    
-                    # Seasonal patterns
-                    month = sale_date.month
-                    seasonal_factor = 1.0
-                    
-                    if month in [10, 11]:  # Diwali season
-                        seasonal_factor = 1.6
-                    elif month in [12, 1, 2]:  # Wedding season
-                        seasonal_factor = 1.3
-                    elif month in [6, 7, 8]:  # Monsoon
-                        seasonal_factor = 0.8
-                    elif month in [4, 5]:  # Summer sales
-                        seasonal_factor = 1.1
-                    
-                    quantity = max(1, int(np.random.poisson(2) * seasonal_factor))
-                    final_price = price * quantity * np.random.uniform(0.95, 1.05)
-                    
-                    sample_data.append({
-                        'sale_id': len(sample_data) + 1,
-                        'product_id': hash(product_name) % 10000,
-                        'product_name': product_name,
-                        'quantity_sold': quantity,
-                        'amount': round(final_price, 2),
-                        'sale_date': sale_date,  # Already datetime object
-                        'current_stock': np.random.randint(min_stock, max_stock),
-                        'minimum_stock': min_stock,
-                        'unit_price': price,
-                        'expiry_date': expiry,  # Will be converted to datetime in _process_data
-                        'category': category,
-                        'supplier_name': supplier,
-                        'customer_id': np.random.randint(1, 1000)
-                    })
-        
-        df = pd.DataFrame(sample_data)
-        
-        # CRITICAL: Ensure proper datetime conversion for sample data
-        df['sale_date'] = pd.to_datetime(df['sale_date'])
-        df['expiry_date'] = pd.to_datetime(df['expiry_date'])
-        
-        return self._process_data(df)
+        return self._process_data(generate_sales_data(rows, products, days, seed))
 
 class TraditionalAnalyticsEngine:
     """Traditional ML/Statistical Analysis Engine - FIXED VERSION"""
@@ -276,6 +766,12 @@ class TraditionalAnalyticsEngine:
             self.logger.error(f"Analysis failed: {e}")
             return {'error': str(e)}
     
+    def _transaction_count(self) -> int:
+        """Number of sales; rollup rows carry their own count"""
+        if 'transactions' in self.data.columns:
+            return int(self.data['transactions'].sum())
+        return len(self.data)
+    
     def _descriptive_analysis(self) -> Dict[str, Any]:
         """Traditional descriptive statistics with FIXED datetime operations"""
         
@@ -283,10 +779,10 @@ class TraditionalAnalyticsEngine:
         basic_metrics = {
             'total_revenue': float(self.data['amount'].sum()),
             'total_profit': float(self.data['profit'].sum()),
-            'total_transactions': len(self.data),
+            'total_transactions': self._transaction_count(),
             'unique_products': self.data['product_name'].nunique(),
             'unique_customers': self.data['customer_id'].nunique(),
-            'avg_order_value': float(self.data['amount'].mean()),
+            'avg_order_value': float(self.data['amount'].sum() / max(self._transaction_count(), 1)),
             'profit_margin': float((self.data['profit'].sum() / self.data['amount'].sum()) * 100),
             'max_sale_date': self.data['sale_date'].max().strftime('%Y-%m-%d'),
             'min_sale_date': self.data['sale_date'].min().strftime('%Y-%m-%d'),
@@ -296,7 +792,7 @@ class TraditionalAnalyticsEngine:
         
         # Product analysis
         try:
-            product_summary = self.data.groupby('product_name').agg({
+            product_summary = self.data.groupby('product_name', observed=True).agg({
                 'amount': ['sum', 'mean', 'count'],
                 'quantity_sold': 'sum',
                 'current_stock': 'first',
@@ -317,7 +813,7 @@ class TraditionalAnalyticsEngine:
         
         # Category analysis
         try:
-            category_performance = self.data.groupby('category').agg({
+            category_performance = self.data.groupby('category', observed=True).agg({
                 'amount': 'sum',
                 'quantity_sold': 'sum',
                 'profit': 'sum'
@@ -367,7 +863,9 @@ class TraditionalAnalyticsEngine:
         # Products expiring soon
         try:
             if 'is_expiring_soon' in self.data.columns:
-                expiring_products = self.data[self.data['is_expiring_soon'] == True]['product_name'].value_counts().to_dict()
+                expiring_counts = self.data[self.data['is_expiring_soon'] == True]['product_name'].value_counts()
+                # Categorical counts include products with no expiring rows
+                expiring_products = expiring_counts[expiring_counts > 0].to_dict()
             else:
                 expiring_products = {}
         except Exception as e:
@@ -447,7 +945,7 @@ class TraditionalAnalyticsEngine:
         
         # Inventory issues
         try:
-            inventory_analysis = self.data.groupby('product_name').agg({
+            inventory_analysis = self.data.groupby('product_name', observed=True).agg({
                 'current_stock': 'first',
                 'minimum_stock': 'first',
                 'amount': 'sum'
@@ -774,8 +1272,8 @@ ANALYSIS PERIOD: {self.analysis_results.get('metadata', {}).get('analysis_period
 class HybridAnalyticsEngine:
     """Main engine combining traditional analytics + Gemini chatbot"""
     
-    def __init__(self):
-        self.data_connector = TraditionalDataConnector()
+    def __init__(self, data_source='raw'):
+        self.data_connector = TraditionalDataConnector(source=data_source)
         
     def run_analysis(self):
         """Run complete hybrid analysis"""
@@ -19,6 +19,11 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_engine():
+    """Shared by every session, so reruns only load new sales"""
+    return HybridAnalyticsEngine()
+
 # CSS styling
 st.markdown("""
 <style>
@@ -95,8 +100,7 @@ def main():
         if st.button("🚀 Run Analytics Engine", type="primary"):
             with st.spinner("🔄 Running hybrid analytics..."):
                 try:
-                    engine = HybridAnalyticsEngine()
-                    st.session_state.analysis_data = engine.run_analysis()
+                    st.session_state.analysis_data = get_engine().run_analysis()
                     st.success("✅ Analysis Complete!")
                 except Exception as e:
                     st.error(f"❌ Analysis failed: {e}")
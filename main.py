@@ -1,40 +1,85 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, jsonify, request, send_from_directory, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
 import mysql.connector
 import os
 import csv
 import io
 import json
+import base64
+import hashlib
+import uuid
+import re
+import zlib
+import collections
+import urllib.error
+import urllib.request
+import queue
+import threading
+import time
+from contextlib import contextmanager, ExitStack
 from flask_mail import Mail, Message
 from datetime import datetime, timedelta
+from decimal import Decimal
+from mysql.connector.constants import FieldType
+from werkzeug.http import generate_etag
+
+from dataanalysis.final import analytics_db
+
+# Optional: columnar (Parquet / Arrow IPC) exports
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 app = Flask(__name__)
-CORS(app)
+# Origins allowed to call the API from a browser; asgi.py applies the same list
+CORS_ORIGINS = ['*']
+CORS(app, origins=CORS_ORIGINS)
 
 # Load environment variables
 def load_env_config():
-    env_path = '.env'
-    config = {}
-    
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    config[key.strip()] = value.strip()
+    # Same .env parsing as the analytics engine, so both read one configuration
+    config = analytics_db.load_env_config()
     
     # Set defaults
     config.setdefault('DB_USER', 'root')
     config.setdefault('DB_PASSWORD', 'root')
     config.setdefault('DB_HOST', 'localhost')
     config.setdefault('DB_NAME', 'inventory_ai')
+    config.setdefault('DB_REPLICA_HOSTS', '')
+    config.setdefault('DB_REPLICA_USER', config['DB_USER'])
+    config.setdefault('DB_REPLICA_PASSWORD', config['DB_PASSWORD'])
+    config.setdefault('DB_REPLICA_MAX_LAG', '')
+    config.setdefault('DB_REPLICA_LAG_CHECK_INTERVAL', '5')
+    config.setdefault('DB_READ_AFTER_WRITE_SECONDS', '5')
+    config.setdefault('DB_POOL_SIZE', '10')
+    config.setdefault('DB_POOL_TIMEOUT', '30')
+    config.setdefault('DB_POOL_PING_INTERVAL', '30')
+    config.setdefault('API_CACHE_TTL', '30')
+    config.setdefault('TABLE_COUNT_MAX_AGE', '300')
+    config.setdefault('DASHBOARD_REFRESH_INTERVAL', '5')
+    config.setdefault('DASHBOARD_HEARTBEAT_INTERVAL', '15')
+    config.setdefault('ANALYTICS_ENGINE_URL', 'http://localhost:5001/')
+    config.setdefault('SQL_PROFILER', 'false')
+    config.setdefault('SQL_SLOW_QUERY_MS', '200')
+    config.setdefault('SQL_PROFILER_TOP_N', '20')
+    config.setdefault('ASGI_DB_POOL_SIZE', '50')
+    config.setdefault('ASGI_WSGI_WORKERS', '10')
     config.setdefault('MAIL_SERVER', 'smtp.gmail.com')
     config.setdefault('MAIL_PORT', '587')
     config.setdefault('MAIL_USERNAME', '')
     config.setdefault('MAIL_PASSWORD', '')
     config.setdefault('MAIL_USE_TLS', 'True')
     config.setdefault('MAIL_USE_SSL', 'False')
+    config.setdefault('EMAIL_WORKERS', '2')
+    config.setdefault('EMAIL_BATCH_SIZE', '50')
+    config.setdefault('EMAIL_MAX_ATTEMPTS', '3')
+    config.setdefault('EMAIL_RETRY_DELAY', '60')
+    config.setdefault('EMAIL_POLL_INTERVAL', '5')
+    config.setdefault('SALES_GROUP_COMMIT_MAX_LINES', '5000')
+    config.setdefault('SALES_GROUP_COMMIT_WAIT_MS', '5')
     config.setdefault('ADMIN_EMAIL', 'admin@example.com')
     config.setdefault('COMPANY_NAME', 'Your Company')
     
@@ -58,7 +103,9 @@ AI_CONFIG = {
     'LOW_STOCK_THRESHOLD': 10,
     'NON_MOVABLE_DAYS': 90,
     'EXPIRY_WARNING_DAYS': 30,
-    'REORDER_MULTIPLIER': 1.5
+    'REORDER_MULTIPLIER': 1.5,
+    'INSERT_BATCH_SIZE': 1000,
+    'INCREMENTAL_OVERLAP_SECONDS': 5
 }
 
 # Database configuration
@@ -69,6 +116,27 @@ DB_CONFIG = {
     'database': env_config['DB_NAME']
 }
 
+# Connection pool configuration
+POOL_CONFIG = {
+    'SIZE': int(env_config['DB_POOL_SIZE']),
+    'TIMEOUT': float(env_config['DB_POOL_TIMEOUT']),
+    'PING_INTERVAL': float(env_config['DB_POOL_PING_INTERVAL'])
+}
+
+# Read replica configuration (no DB_REPLICA_HOSTS: everything uses the primary)
+REPLICA_DB_CONFIG = {
+    'user': env_config['DB_REPLICA_USER'],
+    'password': env_config['DB_REPLICA_PASSWORD'],
+    'database': env_config['DB_NAME']
+}
+
+REPLICA_CONFIG = {
+    'HOSTS': [h.strip() for h in env_config['DB_REPLICA_HOSTS'].split(',') if h.strip()],
+    'MAX_LAG': float(env_config['DB_REPLICA_MAX_LAG']) if env_config['DB_REPLICA_MAX_LAG'] else None,
+    'LAG_CHECK_INTERVAL': float(env_config['DB_REPLICA_LAG_CHECK_INTERVAL']),
+    'READ_AFTER_WRITE_SECONDS': float(env_config['DB_READ_AFTER_WRITE_SECONDS'])
+}
+
 # Available tables for export
 AVAILABLE_TABLES = ["ai_recommendations", "categories", "order_history", "products", "sales_history", "suppliers"]
 
@@ -77,204 +145,1433 @@ COMPANY_INFO = {
     'COMPANY_NAME': env_config['COMPANY_NAME']
 }
 
-def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+class ConnectionPool:
+    """Bounded pool of MySQL connections shared by every request thread"""
+
+    def __init__(self, size, timeout, ping_interval, **db_config):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.db_config = db_config
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+        self._metrics = {
+            'checkouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'exhaustion_events': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'connections_opened': 0,
+            'connections_discarded': 0
+        }
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.db_config)
+        with self._lock:
+            self._metrics['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            if conn.unread_result:
+                # Drop the socket instead of draining pending rows
+                conn.shutdown()
+            else:
+                conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._metrics['connections_discarded'] += 1
+
+    def _is_healthy(self, conn, idle_since):
+        """Ping connections that sat idle longer than the ping interval"""
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._lock:
+                self._metrics['health_check_failures'] += 1
+            return False
+
+    def acquire(self):
+        """Check out a connection, opening a new one while below the size limit"""
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._created < self.size
+                    if can_open:
+                        self._created += 1
+                if can_open:
+                    try:
+                        conn = self._open()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    break
+
+                # Pool exhausted: wait for a connection to be returned
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self._metrics['exhaustion_events'] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                try:
+                    conn, idle_since = self._idle.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    with self._lock:
+                        self._metrics['timeouts'] += 1
+                    raise mysql.connector.errors.PoolError(
+                        f"No database connection available within {self.timeout}s (pool size {self.size})"
+                    )
+
+            if self._is_healthy(conn, idle_since):
+                break
+            self._discard(conn)
+
+        wait_time = time.monotonic() - started
+        with self._lock:
+            self._in_use += 1
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_time_total'] += wait_time
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+        return conn
+
+    def release(self, conn):
+        """Return a connection, ending any open transaction first"""
+        with self._lock:
+            self._in_use -= 1
+        if conn.unread_result:
+            # An abandoned unbuffered read, e.g. a cancelled export stream
+            self._discard(conn)
+            return
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        conn = self.acquire()
+        try:
+            yield _ProfiledConnection(conn, sql_profiler) if sql_profiler.enabled else conn
+        finally:
+            self.release(conn)
+            record_db_time(time.perf_counter() - started)
+
+    def stats(self):
+        """Snapshot of pool occupancy and checkout metrics"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            checkouts = metrics['checkouts']
+            return {
+                'size': self.size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'checkouts': checkouts,
+                'avg_wait_ms': round(metrics['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+                'max_wait_ms': round(metrics['wait_time_max'] * 1000, 3),
+                'exhaustion_events': metrics['exhaustion_events'],
+                'timeouts': metrics['timeouts'],
+                'health_check_failures': metrics['health_check_failures'],
+                'connections_opened': metrics['connections_opened'],
+                'connections_discarded': metrics['connections_discarded']
+            }
+
+db_pool = ConnectionPool(
+    POOL_CONFIG['SIZE'],
+    POOL_CONFIG['TIMEOUT'],
+    POOL_CONFIG['PING_INTERVAL'],
+    **DB_CONFIG
+)
+
+def _parse_db_host(value):
+    """'host' or 'host:port' -> connect() keyword arguments"""
+    host, _, port = value.partition(':')
+    params = {'host': host}
+    if port:
+        params['port'] = int(port)
+    return params
+
+class ReplicaRouter:
+    """Round-robins reads over replica pools, skipping lagging or failed ones"""
+
+    def __init__(self, pools, max_lag, check_interval):
+        self.pools = pools
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._next = 0
+        # Per replica: last measured lag, when it was measured, down-until time
+        self._lag = [None] * len(pools)
+        self._checked = [0.0] * len(pools)
+        self._down_until = [0.0] * len(pools)
+        self._checking = [False] * len(pools)
+        self._metrics = {'replica_reads': 0, 'primary_reads': 0, 'lag_fallbacks': 0,
+                         'down_fallbacks': 0, 'replica_failures': 0}
+
+    def choose(self):
+        """Pick a usable replica pool, or None to read from the primary"""
+        now = time.monotonic()
+        lagging = False
+        for _ in range(len(self.pools)):
+            with self._lock:
+                index = self._next % len(self.pools)
+                self._next += 1
+                if self._down_until[index] > now:
+                    continue
+            if self._lag_ok(index, now):
+                with self._lock:
+                    self._metrics['replica_reads'] += 1
+                return self.pools[index]
+            lagging = True
+        with self._lock:
+            self._metrics['primary_reads'] += 1
+            if lagging:
+                # At least one replica was up but too far behind
+                self._metrics['lag_fallbacks'] += 1
+            elif self.pools:
+                self._metrics['down_fallbacks'] += 1
+        return None
+
+    def mark_failed(self, pool, error):
+        """Take a replica out of rotation for one check interval"""
+        index = self.pools.index(pool)
+        print(f"⚠️ Replica {index} unavailable, reading from primary: {str(error)}")
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.check_interval
+            self._metrics['replica_failures'] += 1
+
+    def claim_lag_checks(self):
+        """Indexes of up replicas whose lag reading is due, now marked as being checked.
+
+        For callers that measure lag themselves (asgi.py, without blocking
+        the event loop); pass each reading to record_lag().
+        """
+        if self.max_lag is None:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            return [index for index in range(len(self.pools))
+                    if self._down_until[index] <= now and self._claim_lag_check(index, now)]
+
+    def record_lag(self, index, lag):
+        with self._lock:
+            self._lag[index] = lag
+            self._checked[index] = time.monotonic()
+            self._checking[index] = False
+
+    def _claim_lag_check(self, index, now):
+        # Caller holds self._lock
+        due = now - self._checked[index] >= self.check_interval and not self._checking[index]
+        if due:
+            self._checking[index] = True
+        return due
+
+    def _lag_ok(self, index, now):
+        if self.max_lag is None:
+            return True
+        with self._lock:
+            due = self._claim_lag_check(index, now)
+        if due:
+            # One request refreshes the lag; the rest use the last reading
+            try:
+                lag = self._measure_lag(self.pools[index])
+            except Exception as e:
+                print(f"⚠️ Replica {index} lag check failed: {str(e)}")
+                lag = None
+            self.record_lag(index, lag)
+        with self._lock:
+            lag = self._lag[index]
+        return analytics_db.replica_usable(lag, self.max_lag)
+
+    @staticmethod
+    def _measure_lag(pool):
+        """Seconds behind the source, or None when replication is not running"""
+        with pool.connection() as conn:
+            return analytics_db.replica_lag(conn)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            replicas = [{
+                'pool': pool.stats(),
+                'lag_seconds': self._lag[i],
+                'down': self._down_until[i] > now
+            } for i, pool in enumerate(self.pools)]
+            return dict(self._metrics, max_lag=self.max_lag, replicas=replicas)
+
+replica_router = ReplicaRouter(
+    [ConnectionPool(POOL_CONFIG['SIZE'], POOL_CONFIG['TIMEOUT'], POOL_CONFIG['PING_INTERVAL'],
+                    **dict(REPLICA_DB_CONFIG, **_parse_db_host(host)))
+     for host in REPLICA_CONFIG['HOSTS']],
+    REPLICA_CONFIG['MAX_LAG'],
+    REPLICA_CONFIG['LAG_CHECK_INTERVAL']
+)
+
+# Set on responses to writes; while valid, that client's reads stay on the primary
+PRIMARY_STICKY_COOKIE = 'db_primary_until'
+
+def primary_db(view):
+    """Mark a GET view that writes, so its queries go to the primary"""
+    view.primary_db = True
+    return view
+
+def _is_read_only_request():
+    if not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    view = app.view_functions.get(request.endpoint)
+    if getattr(view, 'primary_db', False):
+        return False
+    return _primary_window_expired(request.cookies.get(PRIMARY_STICKY_COOKIE))
+
+def _primary_window_expired(cookie_value):
+    """False while a client's recent write must still be read from the primary"""
+    try:
+        return float(cookie_value or 0) <= time.time()
+    except ValueError:
+        return True
+
+@contextmanager
+def get_db_connection(readonly=None):
+    """Check out a pooled connection: `with get_db_connection() as conn:`
+
+    Reads (GET requests, or readonly=True) go to a replica when one is
+    configured and within the lag limit; everything else uses the primary.
+    """
+    if readonly is None:
+        readonly = _is_read_only_request()
+    pool = replica_router.choose() if readonly and replica_router.pools else None
+
+    with ExitStack() as stack:
+        if pool is not None:
+            try:
+                conn = stack.enter_context(pool.connection())
+            except Exception as e:
+                replica_router.mark_failed(pool, e)
+                pool = None
+        if pool is None:
+            conn = stack.enter_context(db_pool.connection())
+        yield conn
+
+@app.after_request
+def stick_to_primary_after_write(response):
+    if (replica_router.pools and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400):
+        window = REPLICA_CONFIG['READ_AFTER_WRITE_SECONDS']
+        response.set_cookie(PRIMARY_STICKY_COOKIE, str(time.time() + window),
+                            max_age=int(window) or None, httponly=True, samesite='Lax')
+    return response
+
+class TTLCache:
+    """Thread-safe in-process cache for API responses with write-driven invalidation"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        hit, value, generation = self.lookup(key)
+        if hit:
+            return value
+        value = loader()
+        self.store(key, value, generation)
+        return value
+
+    def lookup(self, key):
+        """(hit, value, generation); pass generation to store() after loading a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._metrics['hits'] += 1
+                return True, entry[0], None
+            self._metrics['misses'] += 1
+            return False, None, self._generations.get(key, 0)
+
+    def store(self, key, value, generation):
+        with self._lock:
+            # Skip storing if a write invalidated the key while we were loading
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._metrics['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, entries=len(self._entries), ttl=self.ttl)
+
+api_cache = TTLCache(float(env_config['API_CACHE_TTL']))
+
+# Cached responses derived from products/suppliers/categories (and stock levels)
+STOCK_CACHE_KEYS = ('stats', 'low_stock', 'low_stock_summary')
+
+def cached_read(key, loader):
+    """api_cache.get_or_load(), bypassed while this client must read the primary.
+
+    Another client may have refilled the entry from a lagging replica since
+    this client's write invalidated it.
+    """
+    if has_request_context() and not _is_read_only_request():
+        return loader()
+    return api_cache.get_or_load(key, loader)
+
+def invalidate_cache(*keys):
+    """Drop cached API responses after a write to the tables behind them"""
+    api_cache.invalidate(*keys)
+    # Push the change to live dashboards without waiting for the next tick
+    dashboard_events.notify()
+
+class TableRowCounts:
+    """Exact per-table row counts, recounted in a background thread"""
+
+    def __init__(self, tables, max_age):
+        self.tables = tables
+        self.max_age = max_age
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, table):
+        """Return (count, counted_at) if counted within max_age, else None"""
+        with self._lock:
+            entry = self._counts.get(table)
+        if entry and time.monotonic() - entry[2] < self.max_age:
+            return entry[0], entry[1]
+        return None
+
+    def record(self, table, count):
+        with self._lock:
+            self._counts[table] = (count, datetime.now(), time.monotonic())
+
+    def count_now(self, cursor, table):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        count = cursor.fetchone()[0]
+        self.record(table, count)
+        return count
+
+    def refresh_async(self):
+        """Start a recount unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='table-counts', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with get_db_connection(readonly=True) as conn:
+                cursor = conn.cursor()
+                for table in self.tables:
+                    self.count_now(cursor, table)
+                cursor.close()
+        except Exception as e:
+            print(f"❌ Table count refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+table_row_counts = TableRowCounts(AVAILABLE_TABLES, float(env_config['TABLE_COUNT_MAX_AGE']))
+
+# =========================
+# REQUEST METRICS
+# =========================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation (None past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def prometheus_lines(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class RequestMetrics:
+    """Per-endpoint latency, DB time, response size and status counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._db_time = {}
+        self._size = {}
+        self._status = {}
+
+    def record(self, endpoint, method, status, seconds, db_seconds, size):
+        key = (endpoint, method)
+        with self._lock:
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._db_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(db_seconds)
+            if size is not None:
+                self._size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+            status_key = (endpoint, method, status)
+            self._status[status_key] = self._status.get(status_key, 0) + 1
+
+    def summary(self):
+        """Approximate latency percentiles per endpoint, slowest p99 first"""
+        with self._lock:
+            rows = []
+            for (endpoint, method), hist in self._latency.items():
+                db = self._db_time[(endpoint, method)]
+                rows.append({
+                    'endpoint': endpoint,
+                    'method': method,
+                    'requests': hist.count,
+                    'avg_ms': round(hist.total / hist.count * 1000, 3),
+                    'p50_le_s': hist.quantile(0.5),
+                    'p95_le_s': hist.quantile(0.95),
+                    'p99_le_s': hist.quantile(0.99),
+                    'avg_db_ms': round(db.total / db.count * 1000, 3)
+                })
+        return sorted(rows, key=lambda r: (r['p99_le_s'] is None, r['p99_le_s'] or 0), reverse=True)
+
+    def prometheus_lines(self):
+        lines = [
+            '# HELP inventory_http_request_duration_seconds Request latency until the response headers are ready',
+            '# TYPE inventory_http_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            for (endpoint, method), hist in sorted(self._latency.items()):
+                lines += hist.prometheus_lines('inventory_http_request_duration_seconds',
+                                               f'endpoint="{endpoint}",method="{method}"')
+            lines += [
+                '# HELP inventory_http_request_db_seconds Time a request held database connections',
+                '# TYPE inventory_http_request_db_seconds histogram'
+            ]
+            for (endpoint, method), hist in sorted(self._db_time.items()):
+                lines += hist.prometheus_lines('inventory_http_request_db_seconds',
+                                               f'endpoint="{endpoint}",method="{method}"')
+            lines += [
+                '# HELP inventory_http_response_size_bytes Response body size when known up front',
+                '# TYPE inventory_http_response_size_bytes histogram'
+            ]
+            for (endpoint, method), hist in sorted(self._size.items()):
+                lines += hist.prometheus_lines('inventory_http_response_size_bytes',
+                                               f'endpoint="{endpoint}",method="{method}"')
+            lines += [
+                '# HELP inventory_http_requests_total Requests by endpoint, method and status code',
+                '# TYPE inventory_http_requests_total counter'
+            ]
+            for (endpoint, method, status), count in sorted(self._status.items()):
+                lines.append(f'inventory_http_requests_total{{endpoint="{endpoint}",method="{method}",'
+                             f'status="{status}"}} {count}')
+        return lines
+
+request_metrics = RequestMetrics()
+
+def record_db_time(seconds):
+    """Charge database time to the current request, if there is one"""
+    if has_request_context() and 'db_seconds' in g:
+        g.db_seconds += seconds
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.db_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' in g:
+        # Streamed bodies (exports, SSE) have no length and are timed until
+        # their headers are ready
+        request_metrics.record(
+            request.endpoint or 'unmatched',
+            request.method,
+            response.status_code,
+            time.perf_counter() - g.request_started,
+            g.db_seconds,
+            response.content_length
+        )
+    return response
+
+# =========================
+# SQL PROFILER (opt-in)
+# =========================
+
+_SQL_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_SQL_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+def normalize_sql(sql):
+    """Fingerprint a statement: literals and placeholders become ?, IN lists collapse"""
+    text = _SQL_STRING_RE.sub('?', sql)
+    text = text.replace('%s', '?')
+    text = _SQL_NUMBER_RE.sub('?', text)
+    text = _SQL_LIST_RE.sub('(?+)', text)
+    return ' '.join(text.split())
+
+class SQLProfiler:
+    """Times every statement run through pooled connections while enabled.
+
+    Keeps per-fingerprint totals (bounded to max_statements), a rolling log
+    of slow statements and, for each slow fingerprint, EXPLAIN output
+    captured on a background thread with its own connection.
+    """
+
+    EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+    def __init__(self, enabled, slow_ms, top_n, max_statements=500):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.top_n = top_n
+        self.max_statements = max_statements
+
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._slow = collections.deque(maxlen=100)
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+
+    def record(self, sql, params, seconds, rows, many=False):
+        if threading.current_thread() is self._explain_thread:
+            # The profiler's own EXPLAINs
+            return
+        fingerprint = normalize_sql(sql)
+        duration_ms = seconds * 1000
+        if has_request_context():
+            route = request.endpoint or request.path
+        else:
+            route = threading.current_thread().name
+        now = datetime.now()
+
+        with self._lock:
+            entry = self._statements.get(fingerprint)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    # Forget the statement with the least total time
+                    cheapest = min(self._statements, key=lambda k: self._statements[k]['total_ms'])
+                    del self._statements[cheapest]
+                entry = self._statements[fingerprint] = {
+                    'statement': fingerprint, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'slow_calls': 0, 'routes': {}, 'explain': None, 'explained_at': None
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += max(rows, 0)
+            entry['routes'][route] = entry['routes'].get(route, 0) + 1
+            entry['last_seen'] = now
+
+            slow = duration_ms >= self.slow_ms
+            needs_explain = False
+            if slow:
+                entry['slow_calls'] += 1
+                self._slow.append({
+                    'statement': fingerprint, 'duration_ms': round(duration_ms, 3),
+                    'rows': rows, 'route': route, 'at': now
+                })
+                explained_at = entry['explained_at']
+                needs_explain = (not many and sql.lstrip().upper().startswith(self.EXPLAINABLE)
+                                 and (explained_at is None or now - explained_at > timedelta(minutes=10)))
+                if needs_explain:
+                    entry['explained_at'] = now
+
+        if needs_explain:
+            self._queue_explain(fingerprint, sql, params)
+
+    def _queue_explain(self, fingerprint, sql, params):
+        with self._lock:
+            if not self._explain_thread:
+                self._explain_thread = threading.Thread(target=self._run_explains, name='sql-explain', daemon=True)
+                self._explain_thread.start()
+        try:
+            self._explain_queue.put_nowait((fingerprint, sql, params))
+        except queue.Full:
+            pass
+
+    def _run_explains(self):
+        while True:
+            fingerprint, sql, params = self._explain_queue.get()
+            try:
+                with get_db_connection() as conn:
+                    cursor = conn.cursor(dictionary=True)
+                    cursor.execute("EXPLAIN " + sql, params)
+                    plan = cursor.fetchall()
+                    cursor.close()
+                explain = {
+                    'plan': plan,
+                    'full_scan_tables': [row.get('table') for row in plan if row.get('type') == 'ALL']
+                }
+            except Exception as e:
+                explain = {'error': str(e)}
+            with self._lock:
+                if fingerprint in self._statements:
+                    self._statements[fingerprint]['explain'] = explain
+
+    def report(self):
+        with self._lock:
+            statements = [dict(entry, avg_ms=round(entry['total_ms'] / entry['calls'], 3),
+                               total_ms=round(entry['total_ms'], 3), max_ms=round(entry['max_ms'], 3),
+                               routes=dict(entry['routes']))
+                          for entry in self._statements.values()]
+            slow = list(self._slow)
+        statements.sort(key=lambda e: e['total_ms'], reverse=True)
+        return {
+            'enabled': self.enabled,
+            'slow_query_ms': self.slow_ms,
+            'statements_tracked': len(statements),
+            'top_statements': statements[:self.top_n],
+            'recent_slow_queries': slow[::-1],
+            'full_scans': [
+                {'statement': e['statement'], 'tables': e['explain']['full_scan_tables']}
+                for e in statements
+                if e['explain'] and e['explain'].get('full_scan_tables')
+            ]
+        }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+
+class _ProfiledCursor:
+    """Cursor proxy that times a statement from execute() through its last fetch"""
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._pending = None
+
+    def _finish(self):
+        if self._pending:
+            sql, params, seconds, rows, many = self._pending
+            self._pending = None
+            if rows < 0:
+                rows = self._cursor.rowcount
+            self._profiler.record(sql, params, seconds, rows, many)
+
+    def _timed(self, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            if self._pending:
+                self._pending[2] += time.perf_counter() - started
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            # rows stays -1 until fetched; writes report rowcount instead
+            self._pending = [operation, params, time.perf_counter() - started, -1, False]
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._pending = [operation, None, time.perf_counter() - started, -1, True]
+            self._finish()
+
+    def _count(self, rows):
+        if self._pending:
+            self._pending[3] = max(self._pending[3], 0) + rows
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        self._count(1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(lambda: self._cursor.fetchmany(*args, **kwargs))
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class _ProfiledConnection:
+    """Connection proxy whose cursors report to the SQL profiler"""
+
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self._profiler = profiler
+
+    def cursor(self, *args, **kwargs):
+        return _ProfiledCursor(self._conn.cursor(*args, **kwargs), self._profiler)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+sql_profiler = SQLProfiler(
+    env_config['SQL_PROFILER'].lower() == 'true',
+    float(env_config['SQL_SLOW_QUERY_MS']),
+    int(env_config['SQL_PROFILER_TOP_N'])
+)
 
 def init_db():
     """Initialize database with comprehensive schema"""
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    # Suppliers table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS suppliers (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            supplier_id VARCHAR(255) UNIQUE NOT NULL,
-            name VARCHAR(255) NOT NULL,
-            phone VARCHAR(50),
-            email VARCHAR(255),
-            address TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Categories table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL UNIQUE,
-            description TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Products table with AI fields
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            product_id VARCHAR(255) UNIQUE NOT NULL,
-            name VARCHAR(255) NOT NULL,
-            category_id INT,
-            supplier_id INT,
-            price DOUBLE,
-            current_stock INT DEFAULT 0,
-            minimum_stock INT DEFAULT 5,
-            expiry_date DATE,
-            date_added DATE NOT NULL,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            total_sold INT DEFAULT 0,
-            FOREIGN KEY (category_id) REFERENCES categories(id),
-            FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
-        )
-    ''')
+    with get_db_connection() as conn:
+        c = conn.cursor()
+
+        # Suppliers table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS suppliers (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                supplier_id VARCHAR(255) UNIQUE NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                phone VARCHAR(50),
+                email VARCHAR(255),
+                address TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Categories table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS categories (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL UNIQUE,
+                description TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Products table with AI fields
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS products (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id VARCHAR(255) UNIQUE NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                category_id INT,
+                supplier_id INT,
+                price DOUBLE,
+                current_stock INT DEFAULT 0,
+                minimum_stock INT DEFAULT 5,
+                expiry_date DATE,
+                date_added DATE NOT NULL,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                total_sold INT DEFAULT 0,
+                FOREIGN KEY (category_id) REFERENCES categories(id),
+                FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+            )
+        ''')
 
-    # Sales history table
         # Sales history table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sales_history (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            product_id INT,
-            product_name VARCHAR(255),
-            quantity_sold INT,
-            sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            amount DOUBLE,
-            FOREIGN KEY (product_id) REFERENCES products(id)
-        )
-    ''')
+            # Sales history table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS sales_history (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id INT,
+                product_name VARCHAR(255),
+                quantity_sold INT,
+                sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                amount DOUBLE,
+                FOREIGN KEY (product_id) REFERENCES products(id)
+            )
+        ''')
+
+
+
+        # AI Recommendations table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS ai_recommendations (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                type VARCHAR(50) NOT NULL,
+                product_id INT,
+                message TEXT NOT NULL,
+                priority INT DEFAULT 1,
+                status VARCHAR(50) DEFAULT 'active',
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (product_id) REFERENCES products(id)
+            )
+        ''')
+
+        # Last-run state for incremental AI analysis
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS ai_analysis_state (
+                id INT PRIMARY KEY,
+                products_watermark TIMESTAMP NULL,
+                last_run_date DATE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+        c.execute("INSERT IGNORE INTO ai_analysis_state (id) VALUES (1)")
+
+        # Outbox drained by the background email dispatcher
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                job_id VARCHAR(36) NOT NULL,
+                idempotency_key CHAR(64) NOT NULL UNIQUE,
+                supplier_id INT,
+                supplier_name VARCHAR(255),
+                supplier_email VARCHAR(255) NOT NULL,
+                payload MEDIUMTEXT NOT NULL,
+                status VARCHAR(20) DEFAULT 'pending',
+                attempts INT DEFAULT 0,
+                last_error TEXT,
+                claim_token VARCHAR(36),
+                claimed_at TIMESTAMP NULL,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_date TIMESTAMP NULL,
+                INDEX idx_email_outbox_job (job_id),
+                INDEX idx_email_outbox_claim (status, next_attempt_at),
+                INDEX idx_email_outbox_token (claim_token)
+            )
+        """)
+
+        # Order history table
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS order_history (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                supplier_name VARCHAR(255),
+                supplier_email VARCHAR(255),
+                products_details TEXT,
+                total_products INT,
+                custom_message TEXT,
+                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status VARCHAR(50) DEFAULT 'sent'
+            )
+        """)
 
+        conn.commit()
+        c.close()
+
+    run_migrations()
+    print("✅ Database initialized successfully")
 
+# =========================
+# SCHEMA MIGRATIONS
+# =========================
 
-    # AI Recommendations table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS ai_recommendations (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            type VARCHAR(50) NOT NULL,
-            product_id INT,
-            message TEXT NOT NULL,
-            priority INT DEFAULT 1,
-            status VARCHAR(50) DEFAULT 'active',
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (product_id) REFERENCES products(id)
+# Ordered, append-only list of (version, name, statements). Never edit an
+# applied entry; add a new version instead.
+MIGRATIONS = [
+    (1, 'sales_history_sale_date_index', [
+        "CREATE INDEX idx_sales_history_sale_date ON sales_history (sale_date)",
+    ]),
+    (2, 'ai_recommendations_active_index', [
+        "CREATE INDEX idx_ai_recommendations_status ON ai_recommendations (status, priority, created_date)",
+    ]),
+    (3, 'order_history_order_date_index', [
+        "CREATE INDEX idx_order_history_order_date ON order_history (order_date)",
+    ]),
+    (4, 'products_is_low_stock_column', [
+        "ALTER TABLE products ADD COLUMN is_low_stock TINYINT(1) "
+        "AS (current_stock <= minimum_stock) STORED",
+        "CREATE INDEX idx_products_low_stock ON products (is_low_stock, supplier_id)",
+    ]),
+    (5, 'products_listing_indexes', [
+        "CREATE INDEX idx_products_listing ON products (date_added, name, id)",
+        "CREATE INDEX idx_products_last_updated ON products (last_updated)",
+        "CREATE INDEX idx_products_expiry_date ON products (expiry_date)",
+    ]),
+    (6, 'sales_history_idempotency_key', [
+        "ALTER TABLE sales_history ADD COLUMN idempotency_key VARCHAR(64) NULL",
+        "CREATE UNIQUE INDEX uq_sales_history_idempotency ON sales_history (idempotency_key)",
+    ]),
+    (7, 'sales_daily_rollup', [
+        """
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            sale_day DATE NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            amount DOUBLE NOT NULL DEFAULT 0,
+            transactions INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (sale_day, product_id),
+            INDEX idx_sales_daily_rollup_product (product_id, sale_day)
         )
-    ''')
-
-    # Order history table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS order_history (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            supplier_name VARCHAR(255),
-            supplier_email VARCHAR(255),
-            products_details TEXT,
-            total_products INT,
-            custom_message TEXT,
-            order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status VARCHAR(50) DEFAULT 'sent'
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_state (
+            id INT PRIMARY KEY,
+            last_sales_id BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
         )
-    """)
+        """,
+        "INSERT IGNORE INTO sales_rollup_state (id) VALUES (1)",
+    ]),
+    # Replaces the id watermark, which skipped ids that committed late.
+    # Rebuilds the rollup from every row present and marks them folded.
+    (8, 'sales_history_rolled_up', [
+        "ALTER TABLE sales_history ADD COLUMN rolled_up TINYINT(1) NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_sales_history_rolled_up ON sales_history (rolled_up)",
+        "UPDATE sales_history SET rolled_up = 1",
+        "DELETE FROM sales_daily_rollup",
+        """
+        INSERT INTO sales_daily_rollup (sale_day, product_id, quantity, amount, transactions)
+        SELECT DATE(sale_date), COALESCE(product_id, 0),
+               COALESCE(SUM(quantity_sold), 0), COALESCE(SUM(amount), 0), COUNT(*)
+        FROM sales_history
+        WHERE rolled_up = 1 AND sale_date IS NOT NULL
+        GROUP BY DATE(sale_date), COALESCE(product_id, 0)
+        """,
+        "DROP TABLE IF EXISTS sales_rollup_state",
+    ]),
+    # /api/products sorts date_added DESC, name, id; an all-ascending index
+    # can't serve that mixed-direction ORDER BY, so every page filesorted
+    (9, 'products_listing_index_date_desc', [
+        "CREATE INDEX idx_products_listing_date_desc ON products (date_added DESC, name, id)",
+        "DROP INDEX idx_products_listing ON products",
+    ]),
+]
+
+# MySQL errors meaning a statement's object already exists (or is already
+# dropped), e.g. when a previous run died between the DDL and recording the version
+MIGRATION_ALREADY_APPLIED_ERRNOS = {1060, 1061, 1091}  # duplicate column, duplicate key name, can't drop
+
+MIGRATION_LOCK_NAME = 'inventory_ai_schema_migrations'
+
+def run_migrations():
+    """Apply pending schema migrations in version order"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-    conn.commit()
-    c.close()
-    conn.close()
-    print("✅ Database initialized successfully")
+        # Serialize concurrent app starts so each migration runs once
+        c.execute("SELECT GET_LOCK(%s, 30)", (MIGRATION_LOCK_NAME,))
+        if c.fetchone()[0] != 1:
+            c.close()
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        try:
+            c.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in c.fetchall()}
+
+            for version, name, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                for statement in statements:
+                    try:
+                        c.execute(statement)
+                    except mysql.connector.Error as e:
+                        if e.errno not in MIGRATION_ALREADY_APPLIED_ERRNOS:
+                            raise
+                c.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                conn.commit()
+                print(f"✅ Applied migration {version}: {name}")
+        finally:
+            c.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+            c.fetchall()
+            c.close()
+
+def schema_version():
+    """Return the list of applied migrations"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT version, name, applied_at FROM schema_migrations ORDER BY version")
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def _analytics_delta_query(cursor):
+    """The analytics engine's incremental read, just past the newest sale"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) AS newest FROM sales_history")
+    newest = cursor.fetchone()['newest']
+    return analytics_db.SALES_DELTA_QUERY, (analytics_db.sales_delta_floor(newest),
+                                            datetime.now() - timedelta(days=366))
+
+def _analytics_months_query(cursor):
+    """The analytics engine's per-month cache check, up to the newest sale"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) AS newest FROM sales_history")
+    newest = cursor.fetchone()['newest']
+    return analytics_db.SALES_MONTHS_QUERY, (newest, datetime.now() - timedelta(days=366))
+
+# Hot queries and the index each one is expected to use. Each 'query'
+# returns the (sql, params) the code actually runs, so a change to a
+# statement is checked as written.
+QUERY_PLAN_CHECKS = [
+    {
+        'name': 'dashboard_stats',
+        'table': 'ai_recommendations',
+        'index': 'idx_ai_recommendations_status',
+        'query': lambda cursor: (STATS_SQL, _stats_params()),
+    },
+    {
+        'name': 'analytics_sales_delta',
+        'table': 'sh',
+        'index': 'PRIMARY',
+        'query': _analytics_delta_query,
+    },
+    {
+        'name': 'analytics_sales_months',
+        'table': 'sales_history',
+        'index': 'idx_sales_history_sale_date',
+        'query': _analytics_months_query,
+    },
+    {
+        'name': 'analytics_sales_rollup',
+        'table': 'r',
+        'index': 'PRIMARY',
+        'query': lambda cursor: (analytics_db.SALES_ROLLUP_QUERY, ()),
+    },
+    {
+        'name': 'active_recommendations',
+        'table': 'r',
+        'index': 'idx_ai_recommendations_status',
+        'query': lambda cursor: (ACTIVE_RECOMMENDATIONS_SQL, ()),
+    },
+    {
+        'name': 'order_history_recent',
+        'table': 'order_history',
+        'index': 'idx_order_history_order_date',
+        'query': lambda cursor: (ORDER_HISTORY_RECENT_SQL, ()),
+    },
+    {
+        'name': 'low_stock_products',
+        'table': 'p',
+        'index': 'idx_products_low_stock',
+        'query': lambda cursor: _low_stock_query(),
+    },
+    {
+        'name': 'products_first_page',
+        'table': 'p',
+        'index': 'idx_products_listing_date_desc',
+        'query': lambda cursor: _build_products_query({'limit': str(PRODUCTS_PAGE_SIZE['DEFAULT'])})[:2],
+    },
+    {
+        'name': 'products_watermark',
+        'table': 'products',
+        'index': 'idx_products_last_updated',
+        'query': lambda cursor: (PRODUCTS_WATERMARK_SQL, ()),
+    },
+]
+
+def check_query_plans():
+    """EXPLAIN each hot query and report whether it uses its expected index"""
+    results = []
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        for check in QUERY_PLAN_CHECKS:
+            sql, params = check['query'](cursor)
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = cursor.fetchall()
+            row = next((r for r in plan if r.get('table') == check['table']), None)
+            if row is None:
+                # Aggregates answered from the index report no table row
+                extra = ' '.join(str(r.get('Extra') or '') for r in plan)
+                results.append({
+                    'name': check['name'],
+                    'expected_index': check['index'],
+                    'access_type': None,
+                    'key': None,
+                    'possible_keys': [],
+                    'rows': None,
+                    'uses_index': 'Select tables optimized away' in extra,
+                })
+                continue
+            possible = (row.get('possible_keys') or '').split(',')
+            results.append({
+                'name': check['name'],
+                'expected_index': check['index'],
+                'access_type': row.get('type'),
+                'key': row.get('key'),
+                'possible_keys': [k for k in possible if k],
+                'rows': row.get('rows'),
+                'uses_index': row.get('key') == check['index'],
+            })
+        cursor.close()
+    return results
+
+# Newest product change; the incremental AI analysis watermark
+PRODUCTS_WATERMARK_SQL = "SELECT MAX(last_updated) FROM products"
 
 # AI Analytics Engine
 class InventoryAI:
+    # Output order of the rules, matching the original per-rule scans
+    RULE_ORDER = ['LOW_STOCK', 'NON_MOVABLE', 'EXPIRY_WARNING', 'REORDER_SUGGESTION']
+
     def __init__(self):
-        self.conn = get_db_connection()
-        self.conn.autocommit = False
+        self.conn = None
 
     def analyze_inventory(self):
-        recommendations = []
+        with get_db_connection() as conn:
+            self.conn = conn
+            cursor = self.conn.cursor()
+            self._lock_state(cursor)
+            watermark = self._products_watermark(cursor)
+            today = datetime.now().date()
+            products = self._scan_products()
+            recommendations = self._build_recommendations(products, today)
+
+            # Replace the active set in one transaction so readers never see it empty
+            cursor.execute("DELETE FROM ai_recommendations WHERE status = 'active'")
+            self._insert_recommendations(cursor, recommendations)
+            self._save_state(cursor, watermark, today)
+            self.conn.commit()
+            invalidate_cache('stats')
+            cursor.close()
+            self.conn = None
+        return recommendations
 
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute("DELETE FROM ai_recommendations WHERE status = 'active'")
-        self.conn.commit()
+    def analyze_incremental(self):
+        """Re-evaluate only products changed since the last run, plus date-driven ones.
+
+        Products whose last_updated moved (stock edits, sales) are always
+        re-checked. On the first run of a new day, products inside the expiry
+        window or old enough to be non-movable are re-checked too, since their
+        day counts and thresholds move with the calendar. Returns the
+        recommendations of the re-evaluated products and change counts.
+        """
+        with get_db_connection() as conn:
+            self.conn = conn
+            cursor = self.conn.cursor()
+            state = self._lock_state(cursor)
+
+            if state and state['products_watermark'] is not None:
+                watermark = self._products_watermark(cursor)
+                today = datetime.now().date()
+                scope, scope_params = self._incremental_scope(state, today)
+
+                products = self._scan_products(scope, scope_params)
+                recommendations = self._build_recommendations(products, today)
+                changes = self._apply_changes(cursor, scope, scope_params, recommendations)
+                changes['products_evaluated'] = len(products)
+
+                self._save_state(cursor, watermark, today)
+                self.conn.commit()
+                if changes['inserted'] or changes['updated'] or changes['retired']:
+                    invalidate_cache('stats')
 
-        recommendations.extend(self._analyze_low_stock())
-        recommendations.extend(self._analyze_non_movable_stock())
-        recommendations.extend(self._analyze_expiry_warnings())
-        recommendations.extend(self._analyze_reorder_suggestions())
+            cursor.close()
+            self.conn = None
 
-        for rec in recommendations:
-            cursor.execute("""
-                INSERT INTO ai_recommendations (type, product_id, message, priority)
-                VALUES (%s, %s, %s, %s)
-            """, (rec['type'], rec['product_id'], rec['message'], rec['priority']))
+        if not state or state['products_watermark'] is None:
+            # No previous run to diff against: fall back to a full analysis
+            recommendations = self.analyze_inventory()
+            return recommendations, {'mode': 'full', 'inserted': len(recommendations)}
 
-        self.conn.commit()
-        cursor.close()
-        self.conn.close()
-        return recommendations
+        changes['mode'] = 'incremental'
+        return recommendations, changes
 
-    def _analyze_low_stock(self):
-        cursor = self.conn.cursor(dictionary=True)
+    def _lock_state(self, cursor):
+        """Read the last-run state, serializing concurrent analysis runs"""
         cursor.execute("""
-            SELECT p.*, c.name as category_name 
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id 
-            WHERE p.current_stock <= p.minimum_stock AND p.current_stock > 0
+            SELECT products_watermark, last_run_date
+            FROM ai_analysis_state WHERE id = 1 FOR UPDATE
         """)
-        results = cursor.fetchall()
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {'products_watermark': row[0], 'last_run_date': row[1]}
+
+    def _products_watermark(self, cursor):
+        cursor.execute(PRODUCTS_WATERMARK_SQL)
+        return cursor.fetchone()[0]
+
+    def _save_state(self, cursor, watermark, today):
+        cursor.execute("""
+            INSERT INTO ai_analysis_state (id, products_watermark, last_run_date)
+            VALUES (1, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                products_watermark = VALUES(products_watermark),
+                last_run_date = VALUES(last_run_date)
+        """, (watermark, today))
+
+    def _incremental_scope(self, state, today):
+        """SQL predicate on products selecting the rows an incremental run must re-check"""
+        # Overlap the watermark so rows committed late with an older timestamp are not missed
+        scope = "products.last_updated >= %s - INTERVAL %s SECOND"
+        params = [state['products_watermark'], AI_CONFIG['INCREMENTAL_OVERLAP_SECONDS']]
+
+        if state['last_run_date'] != today:
+            non_movable_cutoff = (datetime.now() - timedelta(days=AI_CONFIG['NON_MOVABLE_DAYS'])).date()
+            expiry_cutoff = (datetime.now() + timedelta(days=AI_CONFIG['EXPIRY_WARNING_DAYS'])).date()
+            scope += """
+                OR (products.current_stock > 0 AND products.expiry_date <= %s)
+                OR (products.current_stock > 0 AND products.date_added <= %s AND products.total_sold = 0)
+            """
+            params.extend([expiry_cutoff, non_movable_cutoff])
+
+        return f"({scope})", params
+
+    def _apply_changes(self, cursor, scope, scope_params, recommendations):
+        """Upsert new recommendations and retire stale ones for the re-evaluated products"""
+        cursor.execute(f"""
+            SELECT r.id, r.product_id, r.type, r.message, r.priority
+            FROM ai_recommendations r
+            JOIN products ON products.id = r.product_id
+            WHERE r.status = 'active' AND {scope}
+        """, scope_params)
+        existing = {}
+        to_retire = []
+        for row in cursor.fetchall():
+            if (row[1], row[2]) in existing:
+                to_retire.append((row[0],))
+            else:
+                existing[(row[1], row[2])] = row
+
+        to_insert = []
+        to_update = []
+        for rec in recommendations:
+            current = existing.pop((rec['product_id'], rec['type']), None)
+            if current is None:
+                to_insert.append(rec)
+            elif (current[3], current[4]) != (rec['message'], rec['priority']):
+                to_update.append((rec['message'], rec['priority'], current[0]))
+        to_retire.extend((row[0],) for row in existing.values())
+
+        self._insert_recommendations(cursor, to_insert)
+        if to_update:
+            cursor.executemany("""
+                UPDATE ai_recommendations
+                SET message = %s, priority = %s, created_date = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, to_update)
+        if to_retire:
+            cursor.executemany("UPDATE ai_recommendations SET status = 'resolved' WHERE id = %s", to_retire)
+
+        return {'inserted': len(to_insert), 'updated': len(to_update), 'retired': len(to_retire)}
+
+    def _scan_products(self, scope=None, scope_params=()):
+        """Classify products against all rules in a single products scan.
+
+        Without a scope only rows matching at least one rule are read; with a
+        scope every row it selects is returned, so cleared products can be retired.
+        """
+        non_movable_cutoff = (datetime.now() - timedelta(days=AI_CONFIG['NON_MOVABLE_DAYS'])).date()
+        expiry_cutoff = (datetime.now() + timedelta(days=AI_CONFIG['EXPIRY_WARNING_DAYS'])).date()
+
+        if scope:
+            where, params = scope, list(scope_params)
+        else:
+            where = """(products.current_stock <= products.minimum_stock AND products.current_stock >= 0)
+               OR (products.current_stock > 0 AND products.date_added <= %s AND products.total_sold = 0)
+               OR (products.current_stock > 0 AND products.expiry_date <= %s)"""
+            params = [non_movable_cutoff, expiry_cutoff]
+
+        cursor = self.conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT
+                id, name, current_stock, minimum_stock, date_added, expiry_date,
+                (current_stock <= minimum_stock AND current_stock > 0) AS is_low_stock,
+                (current_stock > 0 AND date_added <= %s AND total_sold = 0) AS is_non_movable,
+                (expiry_date IS NOT NULL AND expiry_date <= %s AND current_stock > 0) AS is_expiring,
+                (current_stock <= minimum_stock AND current_stock >= 0) AS needs_reorder
+            FROM products
+            WHERE {where}
+            ORDER BY id
+        """, [non_movable_cutoff, expiry_cutoff] + params)
+        products = cursor.fetchall()
         cursor.close()
+        return products
+
+    def _build_recommendations(self, products, today):
+        by_type = {rule: [] for rule in self.RULE_ORDER}
+        for product in products:
+            for rec in self._recommendations_for(product, today):
+                by_type[rec['type']].append(rec)
+        return [rec for rule in self.RULE_ORDER for rec in by_type[rule]]
 
+    def _recommendations_for(self, product, today):
+        """Turn one classified product row into its recommendations"""
         recommendations = []
-        for product in results:
+
+        if product['is_low_stock']:
             recommendations.append({
                 'type': 'LOW_STOCK',
                 'product_id': product['id'],
                 'message': f"⚠️ {product['name']} is running low (Stock: {product['current_stock']}, Min: {product['minimum_stock']})",
                 'priority': 3
             })
-        return recommendations
-
-    def _analyze_non_movable_stock(self):
-        ninety_days_ago = (datetime.now() - timedelta(days=AI_CONFIG['NON_MOVABLE_DAYS'])).date()
-
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT p.*, c.name as category_name
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.current_stock > 0 
-            AND p.date_added <= %s
-            AND p.total_sold = 0
-        """, (ninety_days_ago,))
-        results = cursor.fetchall()
-        cursor.close()
-
-        recommendations = []
-        for product in results:
-            date_added = product['date_added']
-            if date_added:
-                days_in_stock = (datetime.now().date() - date_added).days
-                if days_in_stock >= AI_CONFIG['NON_MOVABLE_DAYS']:
-                    recommendations.append({
-                        'type': 'NON_MOVABLE',
-                        'product_id': product['id'],
-                        'message': f"📦 {product['name']} hasn't moved for {days_in_stock} days since {product['date_added']}. Consider promotion.",
-                        'priority': 2
-                    })
-        return recommendations
 
-    def _analyze_expiry_warnings(self):
-        warning_date = datetime.now() + timedelta(days=AI_CONFIG['EXPIRY_WARNING_DAYS'])
-
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT p.*, c.name as category_name 
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id 
-            WHERE p.expiry_date IS NOT NULL 
-            AND p.expiry_date <= %s 
-            AND p.current_stock > 0
-        """, (warning_date.date(),))
-        results = cursor.fetchall()
-        cursor.close()
+        if product['is_non_movable'] and product['date_added']:
+            days_in_stock = (today - product['date_added']).days
+            if days_in_stock >= AI_CONFIG['NON_MOVABLE_DAYS']:
+                recommendations.append({
+                    'type': 'NON_MOVABLE',
+                    'product_id': product['id'],
+                    'message': f"📦 {product['name']} hasn't moved for {days_in_stock} days since {product['date_added']}. Consider promotion.",
+                    'priority': 2
+                })
 
-        recommendations = []
-        for product in results:
-            expiry_date = product['expiry_date']
-            days_to_expiry = (expiry_date - datetime.now().date()).days
+        if product['is_expiring']:
+            days_to_expiry = (product['expiry_date'] - today).days
 
             if days_to_expiry <= 0:
                 priority = 5
@@ -293,22 +1590,7 @@ class InventoryAI:
                 'priority': priority
             })
 
-        return recommendations
-
-    def _analyze_reorder_suggestions(self):
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT p.*, c.name as category_name
-            FROM products p
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.current_stock <= p.minimum_stock
-            AND p.current_stock >= 0
-        """)
-        results = cursor.fetchall()
-        cursor.close()
-
-        recommendations = []
-        for product in results:
+        if product['needs_reorder']:
             recommended_order = max(product['minimum_stock'] * 2, 20)
             recommendations.append({
                 'type': 'REORDER_SUGGESTION',
@@ -319,6 +1601,16 @@ class InventoryAI:
 
         return recommendations
 
+    def _insert_recommendations(self, cursor, recommendations):
+        """Insert in multi-row batches (executemany rewrites INSERTs into one statement)"""
+        rows = [(rec['type'], rec['product_id'], rec['message'], rec['priority']) for rec in recommendations]
+        batch_size = AI_CONFIG['INSERT_BATCH_SIZE']
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany("""
+                INSERT INTO ai_recommendations (type, product_id, message, priority)
+                VALUES (%s, %s, %s, %s)
+            """, rows[start:start + batch_size])
+
 # =========================
 # HTML PAGE ROUTES
 # =========================
@@ -372,42 +1664,58 @@ def billing():
 @app.route('/api/stats')
 def get_stats():
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM suppliers")
-        suppliers_count = c.fetchone()[0]
-        
-        c.execute("SELECT COUNT(*) FROM categories")
-        categories_count = c.fetchone()
-        
-        c.execute("SELECT COUNT(*) FROM products")
-        products_count = c.fetchone()
-
-        c.execute("SELECT SUM(current_stock) FROM products")
-        total_stock = c.fetchone()
-        if total_stock is None:
-            total_stock = 0
-        
-        c.execute("SELECT COUNT(*) FROM products WHERE current_stock <= minimum_stock")
-        low_stock_count = c.fetchone()[0]
-        
-        c.execute("SELECT COUNT(*) FROM ai_recommendations WHERE status = 'active'")
-        active_recommendations = c.fetchone()[0]
-
-        c.close()
-        conn.close()
-        
-        return jsonify({
-            'suppliers': suppliers_count,
-            'categories': categories_count,
-            'products': products_count,
-            'total_stock': total_stock,
-            'low_stock_alerts': low_stock_count,
-            'ai_recommendations': active_recommendations
-        })
+        return jsonify(cached_read('stats', _load_stats))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
+
+STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM suppliers) AS suppliers,
+        (SELECT COUNT(*) FROM categories) AS categories,
+        p.products,
+        p.total_stock,
+        p.low_stock_alerts,
+        p.expiring_soon,
+        p.non_movable,
+        (SELECT COUNT(*) FROM ai_recommendations WHERE status = 'active') AS ai_recommendations
+    FROM (
+        SELECT
+            COUNT(*) AS products,
+            COALESCE(SUM(current_stock), 0) AS total_stock,
+            COALESCE(SUM(is_low_stock), 0) AS low_stock_alerts,
+            COALESCE(SUM(current_stock > 0 AND expiry_date IS NOT NULL
+                         AND expiry_date <= CURDATE() + INTERVAL %s DAY), 0) AS expiring_soon,
+            COALESCE(SUM(current_stock > 0 AND total_sold = 0
+                         AND date_added <= CURDATE() - INTERVAL %s DAY), 0) AS non_movable
+        FROM products
+    ) p
+"""
+
+def _stats_params():
+    return (AI_CONFIG['EXPIRY_WARNING_DAYS'], AI_CONFIG['NON_MOVABLE_DAYS'])
+
+def _stats_from_row(row):
+    return {
+        'suppliers': int(row['suppliers']),
+        'categories': int(row['categories']),
+        'products': int(row['products']),
+        'total_stock': int(row['total_stock']),
+        'low_stock_alerts': int(row['low_stock_alerts']),
+        'expiring_soon': int(row['expiring_soon']),
+        'non_movable': int(row['non_movable']),
+        'ai_recommendations': int(row['ai_recommendations'])
+    }
+
+def _load_stats():
+    """Compute every dashboard counter in a single round trip"""
+    with get_db_connection() as conn:
+        c = conn.cursor(dictionary=True)
+        c.execute(STATS_SQL, _stats_params())
+        row = c.fetchone()
+        c.close()
+
+    return _stats_from_row(row)
+
 @app.route('/billing/<path:filename>')
 def billing_files(filename):
     return send_from_directory('./billing', filename)
@@ -415,9 +1723,20 @@ def billing_files(filename):
 
 
 @app.route('/api/ai/analyze')
+@primary_db
 def run_ai_analysis():
+    """Run AI analysis (mode=incremental re-checks only changed products)"""
     try:
         ai_engine = InventoryAI()
+        if request.args.get('mode') == 'incremental':
+            recommendations, changes = ai_engine.analyze_incremental()
+            return jsonify({
+                'success': True,
+                'recommendations_generated': len(recommendations),
+                'recommendations': recommendations,
+                'changes': changes
+            })
+
         recommendations = ai_engine.analyze_inventory()
         return jsonify({
             'success': True,
@@ -427,97 +1746,344 @@ def run_ai_analysis():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/ai/recommendations')
-def get_recommendations():
-    try:
-        conn = get_db_connection()
+ACTIVE_RECOMMENDATIONS_SQL = """
+    SELECT r.*, p.name as product_name, p.current_stock, p.minimum_stock
+    FROM ai_recommendations r
+    LEFT JOIN products p ON r.product_id = p.id
+    WHERE r.status = 'active'
+    ORDER BY r.priority DESC, r.created_date DESC
+"""
+
+def _load_recommendations():
+    with get_db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT r.*, p.name as product_name, p.current_stock, p.minimum_stock
-            FROM ai_recommendations r
-            LEFT JOIN products p ON r.product_id = p.id
-            WHERE r.status = 'active'
-            ORDER BY r.priority DESC, r.created_date DESC
-        """)
+        cursor.execute(ACTIVE_RECOMMENDATIONS_SQL)
         recommendations = cursor.fetchall()
         cursor.close()
-        conn.close()
-        return jsonify(recommendations)
+    return recommendations
+
+@app.route('/api/ai/recommendations')
+def get_recommendations():
+    try:
+        return jsonify(_load_recommendations())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# =========================
+# LIVE DASHBOARD EVENTS (SSE)
+# =========================
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+class _Subscriber:
+    def __init__(self, max_queued):
+        self.events = queue.Queue(maxsize=max_queued)
+        # Set when the queue overflowed; the stream then resends a snapshot
+        self.needs_snapshot = False
+
+class DashboardBroadcaster:
+    """One shared refresher that pushes dashboard changes to every SSE subscriber.
+
+    Stats, active recommendations and the analytics engine status are
+    reloaded once per interval no matter how many tabs are open, and only
+    the differences are published.
+    """
+
+    def __init__(self, refresh_interval, heartbeat_interval, analytics_url, history=200):
+        self.refresh_interval = refresh_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.analytics_url = analytics_url
+        # The analytics engine is probed less often than the database
+        self.analytics_interval = max(refresh_interval, 30)
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._next_id = 0
+        # Recent events, replayed to clients reconnecting with Last-Event-ID
+        self._history = collections.deque(maxlen=history)
+
+        self._refresh_lock = threading.Lock()
+        self._stats = None
+        self._recommendations = None
+        self._recommendations_by_id = {}
+        self._analytics = None
+        self._analytics_checked = 0
+
+    def subscribe(self, subscriber=None):
+        """Register a subscriber; anything with events.put_nowait() and needs_snapshot works"""
+        subscriber = subscriber or _Subscriber(max_queued=100)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='dashboard-events', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def snapshot(self):
+        """Full current state, loading it now if the refresher has not run yet"""
+        with self._lock:
+            ready = self._stats is not None
+        if not ready:
+            self.refresh()
+        with self._lock:
+            return self._next_id, {
+                'stats': self._stats,
+                'recommendations': self._recommendations,
+                'analytics': self._analytics
+            }
+
+    def replay_since(self, last_id):
+        """Events after last_id, or None if they are no longer all buffered"""
+        with self._lock:
+            if last_id > self._next_id:
+                return None
+            if last_id == self._next_id:
+                return []
+            if not self._history or last_id < self._history[0][0] - 1:
+                return None
+            return [event for event in self._history if event[0] > last_id]
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'last_event_id': self._next_id}
+
+    def notify(self):
+        """Ask the refresher to run now, e.g. after a write"""
+        self._wakeup.set()
+
+    def _publish(self, event, data):
+        with self._lock:
+            self._next_id += 1
+            message = (self._next_id, event, json.dumps(data, default=_json_default))
+            self._history.append(message)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.events.put_nowait(message)
+            except queue.Full:
+                subscriber.needs_snapshot = True
+
+    def refresh(self):
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        stats = api_cache.get_or_load('stats', _load_stats)
+        recommendations = {r['id']: json.loads(json.dumps(r, default=_json_default))
+                           for r in _load_recommendations()}
+
+        analytics = self._analytics
+        if time.monotonic() - self._analytics_checked >= self.analytics_interval:
+            analytics = self._check_analytics()
+            self._analytics_checked = time.monotonic()
+
+        with self._lock:
+            previous_stats = self._stats
+            previous_recs = self._recommendations_by_id
+            previous_analytics = self._analytics
+            self._stats = stats
+            self._recommendations_by_id = recommendations
+            self._recommendations = list(recommendations.values())
+            self._analytics = analytics
+
+        if previous_stats is None:
+            return
+
+        changed = {k: v for k, v in stats.items() if previous_stats.get(k) != v}
+        if changed:
+            self._publish('stats', changed)
+
+        added = [r for rid, r in recommendations.items() if rid not in previous_recs]
+        updated = [r for rid, r in recommendations.items()
+                   if rid in previous_recs and previous_recs[rid] != r]
+        removed = [rid for rid in previous_recs if rid not in recommendations]
+        if added or updated or removed:
+            self._publish('recommendations', {'added': added, 'updated': updated, 'removed': removed})
+
+        if analytics != previous_analytics:
+            self._publish('analytics', analytics)
+
+    def _check_analytics(self):
+        try:
+            probe = urllib.request.Request(self.analytics_url, method='HEAD')
+            with urllib.request.urlopen(probe, timeout=3):
+                pass
+            online = True
+        except urllib.error.HTTPError:
+            # The engine answered, just not with 2xx
+            online = True
+        except Exception:
+            online = False
+        return {'online': online, 'url': self.analytics_url}
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = bool(self._subscribers)
+            if active:
+                started = time.monotonic()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"❌ Dashboard refresh failed: {str(e)}")
+                self._wakeup.wait(self.refresh_interval)
+                self._wakeup.clear()
+                # Bursts of writes trigger at most one refresh per second
+                time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+            else:
+                # Idle until someone subscribes
+                self._wakeup.wait()
+                self._wakeup.clear()
+
+dashboard_events = DashboardBroadcaster(
+    float(env_config['DASHBOARD_REFRESH_INTERVAL']),
+    float(env_config['DASHBOARD_HEARTBEAT_INTERVAL']),
+    env_config['ANALYTICS_ENGINE_URL']
+)
+
+def _sse_message(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+@app.route('/api/events')
+def dashboard_event_stream():
+    """Server-Sent Events: a snapshot, then stats / recommendations / analytics deltas.
+
+    Clients reconnecting with Last-Event-ID get the missed events replayed
+    when still buffered, otherwise a fresh snapshot.
+    """
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_id = None
+
+    subscriber = dashboard_events.subscribe()
+    try:
+        missed = dashboard_events.replay_since(last_id) if last_id is not None else None
+        initial = None if missed is not None else dashboard_events.snapshot()
     except Exception as e:
+        dashboard_events.unsubscribe(subscriber)
         return jsonify({'error': str(e)}), 500
 
+    def generate():
+        try:
+            # Reconnect delay for EventSource, in milliseconds
+            yield "retry: 3000\n\n"
+            replayed = missed or []
+            if initial is not None:
+                event_id, state = initial
+                yield _sse_message(event_id, 'snapshot', json.dumps(state, default=_json_default))
+                # Anything queued meanwhile is already part of the snapshot
+                sent_up_to = event_id
+            else:
+                sent_up_to = last_id
+            for message in replayed:
+                yield _sse_message(*message)
+                sent_up_to = message[0]
+
+            while True:
+                if subscriber.needs_snapshot:
+                    subscriber.needs_snapshot = False
+                    while not subscriber.events.empty():
+                        subscriber.events.get_nowait()
+                    event_id, state = dashboard_events.snapshot()
+                    yield _sse_message(event_id, 'snapshot', json.dumps(state, default=_json_default))
+                    sent_up_to = event_id
+                try:
+                    message = subscriber.events.get(timeout=dashboard_events.heartbeat_interval)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message[0] > sent_up_to:
+                    yield _sse_message(*message)
+                    sent_up_to = message[0]
+        finally:
+            dashboard_events.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/events/stats')
+def dashboard_event_stats():
+    """Get SSE subscriber count and last event id"""
+    return jsonify(dashboard_events.stats())
+
 # =========================
 # SUPPLIERS API
 # =========================
 
 @app.route('/api/suppliers', methods=['GET', 'POST'])
 def suppliers_api():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if request.method == 'GET':
-        cursor.execute("SELECT * FROM suppliers ORDER BY name")
-        suppliers = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(suppliers)
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    elif request.method == 'POST':
-        try:
-            data = request.json
-            cursor.execute("""
-                INSERT INTO suppliers (supplier_id, name, phone, email, address)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (data['supplier_id'], data['name'], data.get('phone'), data.get('email'), data.get('address')))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
+        if request.method == 'GET':
+            cursor.execute("SELECT * FROM suppliers ORDER BY name")
+            suppliers = cursor.fetchall()
             cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+            return jsonify(suppliers)
+
+        elif request.method == 'POST':
+            try:
+                data = request.json
+                cursor.execute("""
+                    INSERT INTO suppliers (supplier_id, name, phone, email, address)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (data['supplier_id'], data['name'], data.get('phone'), data.get('email'), data.get('address')))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
 
 @app.route('/api/suppliers/<int:supplier_id>', methods=['GET', 'PUT', 'DELETE'])
 def supplier_detail(supplier_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if request.method == 'GET':
-        cursor.execute("SELECT * FROM suppliers WHERE id = %s", (supplier_id,))
-        supplier = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if supplier:
-            return jsonify(supplier)
-        return jsonify({'error': 'Supplier not found'}), 404
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    elif request.method == 'PUT':
-        try:
-            data = request.json
-            cursor.execute("""
-                UPDATE suppliers SET name=%s, phone=%s, email=%s, address=%s WHERE id=%s
-            """, (data['name'], data.get('phone'), data.get('email'), data.get('address'), supplier_id))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
+        if request.method == 'GET':
+            cursor.execute("SELECT * FROM suppliers WHERE id = %s", (supplier_id,))
+            supplier = cursor.fetchone()
             cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+            if supplier:
+                return jsonify(supplier)
+            return jsonify({'error': 'Supplier not found'}), 404
 
-    elif request.method == 'DELETE':
-        try:
-            cursor.execute("DELETE FROM suppliers WHERE id=%s", (supplier_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+        elif request.method == 'PUT':
+            try:
+                data = request.json
+                cursor.execute("""
+                    UPDATE suppliers SET name=%s, phone=%s, email=%s, address=%s WHERE id=%s
+                """, (data['name'], data.get('phone'), data.get('email'), data.get('address'), supplier_id))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
+
+        elif request.method == 'DELETE':
+            try:
+                cursor.execute("DELETE FROM suppliers WHERE id=%s", (supplier_id,))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
 
 # =========================
 # CATEGORIES API
@@ -525,251 +2091,1269 @@ def supplier_detail(supplier_id):
 
 @app.route('/api/categories', methods=['GET', 'POST'])
 def categories_api():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if request.method == 'GET':
-        cursor.execute("SELECT * FROM categories ORDER BY name")
-        categories = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(categories)
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    elif request.method == 'POST':
-        try:
-            data = request.json
-            cursor.execute("""
-                INSERT INTO categories (name, description)
-                VALUES (%s, %s)
-            """, (data['name'], data.get('description')))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
+        if request.method == 'GET':
+            cursor.execute("SELECT * FROM categories ORDER BY name")
+            categories = cursor.fetchall()
             cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+            return jsonify(categories)
+
+        elif request.method == 'POST':
+            try:
+                data = request.json
+                cursor.execute("""
+                    INSERT INTO categories (name, description)
+                    VALUES (%s, %s)
+                """, (data['name'], data.get('description')))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
 
 @app.route('/api/categories/<int:category_id>', methods=['GET', 'PUT', 'DELETE'])
 def category_detail(category_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if request.method == 'GET':
-        cursor.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
-        category = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if category:
-            return jsonify(category)
-        return jsonify({'error': 'Category not found'}), 404
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    elif request.method == 'PUT':
-        try:
-            data = request.json
-            cursor.execute("""
-                UPDATE categories SET name=%s, description=%s WHERE id=%s
-            """, (data['name'], data.get('description'), category_id))
-            conn.commit()
+        if request.method == 'GET':
+            cursor.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
+            category = cursor.fetchone()
             cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+            if category:
+                return jsonify(category)
+            return jsonify({'error': 'Category not found'}), 404
 
-    elif request.method == 'DELETE':
-        try:
-            cursor.execute("DELETE FROM categories WHERE id=%s", (category_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+        elif request.method == 'PUT':
+            try:
+                data = request.json
+                cursor.execute("""
+                    UPDATE categories SET name=%s, description=%s WHERE id=%s
+                """, (data['name'], data.get('description'), category_id))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
+
+        elif request.method == 'DELETE':
+            try:
+                cursor.execute("DELETE FROM categories WHERE id=%s", (category_id,))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
 
 # =========================
 # PRODUCTS API
 # =========================
 
-@app.route('/api/products', methods=['GET', 'POST'])
-def products_api():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+# Columns selectable through /api/products?fields=
+PRODUCT_FIELDS = {
+    'id': 'p.id',
+    'product_id': 'p.product_id',
+    'name': 'p.name',
+    'category_id': 'p.category_id',
+    'supplier_id': 'p.supplier_id',
+    'price': 'p.price',
+    'current_stock': 'p.current_stock',
+    'minimum_stock': 'p.minimum_stock',
+    'expiry_date': 'p.expiry_date',
+    'date_added': 'p.date_added',
+    'last_updated': 'p.last_updated',
+    'total_sold': 'p.total_sold',
+    'category_name': 'c.name',
+    'supplier_name': 's.name'
+}
 
-    if request.method == 'GET':
+PRODUCTS_PAGE_SIZE = {
+    'DEFAULT': 100,
+    'MAX': 1000
+}
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(token, length=3):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+    return values
+
+def _parse_flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def _build_products_query(args):
+    """Build the products SELECT from query-string filters, projection and cursor"""
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = list(PRODUCT_FIELDS)
+
+    # Keyset columns are always selected so the next cursor can be built
+    selected = list(dict.fromkeys(fields + ['id', 'date_added', 'name']))
+    columns = ', '.join(f"{PRODUCT_FIELDS[f]} AS {f}" for f in selected)
+
+    joins = []
+    if 'category_name' in selected:
+        joins.append("LEFT JOIN categories c ON p.category_id = c.id")
+    if 'supplier_name' in selected:
+        joins.append("LEFT JOIN suppliers s ON p.supplier_id = s.id")
+
+    where = []
+    params = []
+
+    if _parse_flag(args.get('low_stock', '')):
+        where.append("p.is_low_stock = 1")
+    if _parse_flag(args.get('in_stock', '')):
+        where.append("p.current_stock > 0")
+    if args.get('category_id'):
+        where.append("p.category_id = %s")
+        params.append(int(args['category_id']))
+    if args.get('supplier_id'):
+        where.append("p.supplier_id = %s")
+        params.append(int(args['supplier_id']))
+    if args.get('expiring_before'):
         try:
-            cursor.execute("""
-                SELECT p.*, c.name as category_name, s.name as supplier_name
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                LEFT JOIN suppliers s ON p.supplier_id = s.id
-                ORDER BY p.date_added DESC, p.name
-            """)
+            expiring_before = datetime.strptime(args['expiring_before'], '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('expiring_before must be YYYY-MM-DD')
+        where.append("p.expiry_date IS NOT NULL AND p.expiry_date <= %s")
+        params.append(expiring_before)
+
+    paginated = 'limit' in args or 'cursor' in args
+    limit = None
+    if paginated:
+        limit = min(int(args.get('limit', PRODUCTS_PAGE_SIZE['DEFAULT'])), PRODUCTS_PAGE_SIZE['MAX'])
+        if limit <= 0:
+            raise ValueError('limit must be positive')
+
+        if args.get('cursor'):
+            date_added, name, last_id = _decode_cursor(args['cursor'])
+            # Seek past the last row of the previous page in (date_added DESC, name, id) order
+            where.append("""(p.date_added < %s OR (p.date_added = %s AND
+                (p.name > %s OR (p.name = %s AND p.id > %s))))""")
+            params.extend([date_added, date_added, name, name, int(last_id)])
+
+    query = f"SELECT {columns} FROM products p {' '.join(joins)}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY p.date_added DESC, p.name, p.id"
+    if paginated:
+        # Fetch one extra row to know whether another page exists
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    return query, params, fields, limit
+
+def _list_products():
+    """List products, optionally filtered, projected and keyset-paginated.
+
+    Without `limit` or `cursor` the full (filtered) list is returned as an array.
+    With either, the response is {'products', 'next_cursor', 'has_more'}.
+    """
+    try:
+        query, params, fields, limit = _build_products_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
             products = cursor.fetchall()
             cursor.close()
-            conn.close()
-            return jsonify(products)
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    elif request.method == 'POST':
-        try:
-            data = request.json
-            # Validate required fields
-            required_fields = ['product_id', 'name', 'category_id', 'supplier_id', 'price', 'current_stock', 'minimum_stock', 'date_added']
-            for field in required_fields:
-                if field not in data or data[field] is None or data[field] == '':
+    payload = _products_payload(products, fields, limit)
+    response = jsonify(payload)
+    response.set_etag(payload_etag(payload))
+    return response.make_conditional(request)
+
+def payload_etag(payload):
+    """ETag of a JSON payload's canonical form.
+
+    Not of the response body: jsonify pretty-prints in debug mode, and the
+    ETag must match between that, production and the ASGI mode.
+    """
+    body = app.json.dumps(payload, indent=None, separators=(',', ':'), sort_keys=True)
+    return generate_etag(body.encode('utf-8'))
+
+def _products_payload(products, fields, limit):
+    """Project fetched rows; paginated queries fetched limit + 1 rows"""
+    if limit is None:
+        return [{f: row[f] for f in fields} for row in products]
+
+    has_more = len(products) > limit
+    products = products[:limit]
+    next_cursor = None
+    if has_more:
+        last = products[-1]
+        next_cursor = _encode_cursor([last['date_added'].isoformat(), last['name'], last['id']])
+    return {
+        'products': [{f: row[f] for f in fields} for row in products],
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }
+
+PRODUCT_REQUIRED_FIELDS = ['product_id', 'name', 'category_id', 'supplier_id', 'price', 'current_stock', 'minimum_stock', 'date_added']
+
+PRODUCT_INSERT_SQL = """
+    INSERT INTO products (
+        product_id, name, category_id, supplier_id, price,
+        current_stock, minimum_stock, expiry_date, date_added
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def _missing_product_field(data):
+    """Return the first required product field that is absent or empty"""
+    for field in PRODUCT_REQUIRED_FIELDS:
+        if field not in data or data[field] is None or data[field] == '':
+            return field
+    return None
+
+def _product_insert_values(data):
+    return (
+        data['product_id'],
+        data['name'],
+        int(data['category_id']),
+        int(data['supplier_id']),
+        float(data['price']),
+        int(data['current_stock']),
+        int(data['minimum_stock']),
+        data.get('expiry_date') or None,
+        data['date_added']
+    )
+
+@app.route('/api/products', methods=['GET', 'POST'])
+def products_api():
+    if request.method == 'GET':
+        return _list_products()
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+
+        if request.method == 'POST':
+            try:
+                data = request.json
+                # Validate required fields
+                missing = _missing_product_field(data)
+                if missing:
                     cursor.close()
-                    conn.close()
-                    return jsonify({'error': f'Missing required field: {field}'}), 400
+                    return jsonify({'error': f'Missing required field: {missing}'}), 400
 
-            cursor.execute("""
-                INSERT INTO products (
-                    product_id, name, category_id, supplier_id, price,
-                    current_stock, minimum_stock, expiry_date, date_added
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                data['product_id'],
-                data['name'],
-                int(data['category_id']),
-                int(data['supplier_id']),
-                float(data['price']),
-                int(data['current_stock']),
-                int(data['minimum_stock']),
-                data.get('expiry_date'),
-                data['date_added']
-            ))
+                cursor.execute(PRODUCT_INSERT_SQL, _product_insert_values(data))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+
+                cursor.close()
+                return jsonify({'success': True, 'message': 'Product added successfully'})
+
+            except Exception as e:
+                cursor.close()
+                print(f"❌ Error adding product: {str(e)}")
+                return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+# Rows per multi-row INSERT and per transaction in bulk imports
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+def _iter_import_records(text_stream, import_format):
+    """Yield (line_number, record) pairs; record is an Exception for unparseable lines"""
+    if import_format == 'csv':
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError('Expected a JSON object')
+                continue
+            yield line_number, record
+
+def _import_format(upload):
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt.lower()
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+    filename = (upload.filename or '') if upload else ''
+    if 'ndjson' in content_type or 'jsonlines' in content_type or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+@app.route('/api/products/import', methods=['POST'])
+def import_products():
+    """Bulk-import products from a streamed CSV or NDJSON upload.
+
+    Send the file as the raw request body or as a multipart `file` field.
+    Rows are validated like POST /api/products and written with multi-row
+    INSERTs, committing every IMPORT_BATCH_SIZE rows.
+    """
+    upload = request.files.get('file')
+    import_format = _import_format(upload)
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    stream = upload.stream if upload else request.stream
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    started = time.monotonic()
+    errors = []
+    counts = {'received': 0, 'imported': 0, 'failed': 0}
+
+    def add_error(line_number, message):
+        counts['failed'] += 1
+        if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({'line': line_number, 'error': message})
+
+    def flush(cursor, conn, batch):
+        """Insert one batch; on failure retry row by row to find the bad rows"""
+        try:
+            cursor.executemany(PRODUCT_INSERT_SQL, [values for _, values in batch])
             conn.commit()
+            counts['imported'] += len(batch)
+            return
+        except mysql.connector.Error:
+            conn.rollback()
 
-            cursor.close()
-            conn.close()
-            return jsonify({'success': True, 'message': 'Product added successfully'})
+        for line_number, values in batch:
+            try:
+                cursor.execute(PRODUCT_INSERT_SQL, values)
+                counts['imported'] += 1
+            except mysql.connector.Error as e:
+                add_error(line_number, f'Database error: {e.msg}')
+        conn.commit()
 
-        except Exception as e:
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            batch = []
+
+            for line_number, record in _iter_import_records(text_stream, import_format):
+                counts['received'] += 1
+                if isinstance(record, Exception):
+                    add_error(line_number, f'Invalid record: {record}')
+                    continue
+
+                missing = _missing_product_field(record)
+                if missing:
+                    add_error(line_number, f'Missing required field: {missing}')
+                    continue
+                try:
+                    values = _product_insert_values(record)
+                except (TypeError, ValueError) as e:
+                    add_error(line_number, f'Invalid value: {e}')
+                    continue
+
+                batch.append((line_number, values))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    flush(cursor, conn, batch)
+                    batch = []
+
+            if batch:
+                flush(cursor, conn, batch)
             cursor.close()
-            conn.close()
-            print(f"❌ Error adding product: {str(e)}")
-            return jsonify({'error': f'Database error: {str(e)}'}), 500
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Upload must be UTF-8 encoded'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'rows_imported': counts['imported']}), 500
+    finally:
+        if counts['imported']:
+            invalidate_cache(*STOCK_CACHE_KEYS)
+
+    elapsed = time.monotonic() - started
+    return jsonify({
+        'success': True,
+        'rows_received': counts['received'],
+        'rows_imported': counts['imported'],
+        'rows_failed': counts['failed'],
+        'errors': errors,
+        'errors_truncated': counts['failed'] > len(errors),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(counts['imported'] / elapsed, 1) if elapsed > 0 else None
+    })
 
 @app.route('/api/products/<int:product_id>', methods=['GET', 'PUT', 'DELETE'])
 def product_detail(product_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    if request.method == 'GET':
-        try:
-            cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
-            product = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            if product:
-                return jsonify(product)
-            return jsonify({'error': 'Product not found'}), 404
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+        if request.method == 'GET':
+            try:
+                cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
+                product = cursor.fetchone()
+                cursor.close()
+                if product:
+                    return jsonify(product)
+                return jsonify({'error': 'Product not found'}), 404
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
 
-    elif request.method == 'PUT':
-        try:
-            data = request.json
-            cursor.execute("""
-                UPDATE products SET 
-                    name=%s, category_id=%s, supplier_id=%s, price=%s,
-                    current_stock=%s, minimum_stock=%s, expiry_date=%s,
-                    last_updated=CURRENT_TIMESTAMP
-                WHERE id=%s
-            """, (
-                data['name'],
-                int(data['category_id']),
-                int(data['supplier_id']),
-                float(data['price']),
-                int(data['current_stock']),
-                int(data['minimum_stock']),
-                data.get('expiry_date'),
-                product_id
-            ))
+        elif request.method == 'PUT':
+            try:
+                data = request.json
+                cursor.execute("""
+                    UPDATE products SET 
+                        name=%s, category_id=%s, supplier_id=%s, price=%s,
+                        current_stock=%s, minimum_stock=%s, expiry_date=%s,
+                        last_updated=CURRENT_TIMESTAMP
+                    WHERE id=%s
+                """, (
+                    data['name'],
+                    int(data['category_id']),
+                    int(data['supplier_id']),
+                    float(data['price']),
+                    int(data['current_stock']),
+                    int(data['minimum_stock']),
+                    data.get('expiry_date'),
+                    product_id
+                ))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
+
+        elif request.method == 'DELETE':
+            try:
+                cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
+                conn.commit()
+                invalidate_cache(*STOCK_CACHE_KEYS)
+                cursor.close()
+                return jsonify({'success': True})
+            except Exception as e:
+                cursor.close()
+                return jsonify({'error': str(e)}), 500
+
+# =========================
+# SALES API
+# =========================
+
+# Most sale lines accepted in one POST /api/sales request
+SALES_MAX_REQUEST_LINES = 5000
+
+# Folds not-yet-rolled-up sales_history rows (rolled_up <= 0), or every
+# row (rolled_up <= 1), into per-day, per-product totals. Sales without a
+# product are kept under product_id 0.
+SALES_ROLLUP_UPSERT_SQL = """
+    INSERT INTO sales_daily_rollup (sale_day, product_id, quantity, amount, transactions)
+    SELECT DATE(sale_date), COALESCE(product_id, 0),
+           COALESCE(SUM(quantity_sold), 0), COALESCE(SUM(amount), 0), COUNT(*)
+    FROM sales_history
+    WHERE rolled_up <= %s AND sale_date IS NOT NULL
+    GROUP BY DATE(sale_date), COALESCE(product_id, 0)
+    ON DUPLICATE KEY UPDATE
+        quantity = quantity + VALUES(quantity),
+        amount = amount + VALUES(amount),
+        transactions = transactions + VALUES(transactions)
+"""
+
+# Adds one (sale_day, product_id) delta computed by the writer itself
+SALES_ROLLUP_DELTA_SQL = """
+    INSERT INTO sales_daily_rollup (sale_day, product_id, quantity, amount, transactions)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        quantity = quantity + VALUES(quantity),
+        amount = amount + VALUES(amount),
+        transactions = transactions + VALUES(transactions)
+"""
+
+def add_sales_to_rollup(cursor, rows):
+    """Add (product_pk, quantity, sale_date, amount) sales to sales_daily_rollup.
+
+    Runs in the transaction that inserts the sales (with rolled_up = 1),
+    so the rollup moves exactly when they commit, whatever their ids.
+    """
+    deltas = {}
+    for product_pk, quantity, sale_date, amount in rows:
+        key = (sale_date.date(), product_pk)
+        total = deltas.setdefault(key, [0, 0.0, 0])
+        total[0] += quantity
+        total[1] += amount or 0
+        total[2] += 1
+    # Key order so concurrent writers lock rollup rows consistently
+    cursor.executemany(SALES_ROLLUP_DELTA_SQL, [key + tuple(total) for key, total in sorted(deltas.items())])
+
+def roll_up_sales(cursor, rebuild=False):
+    """Fold sales_history rows written outside SalesIngestor into sales_daily_rollup.
+
+    Those rows keep rolled_up = 0 until folded here, however late they
+    commit. Locking them first keeps the folded and the flagged rows the
+    same set. rebuild=True recomputes the rollup from every row.
+    """
+    if rebuild:
+        cursor.execute("SELECT COUNT(*) FROM sales_history FOR UPDATE")
+        folded = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM sales_daily_rollup")
+        cursor.execute(SALES_ROLLUP_UPSERT_SQL, (1,))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM sales_history WHERE rolled_up = 0 FOR UPDATE")
+        folded = cursor.fetchone()[0]
+        if folded:
+            cursor.execute(SALES_ROLLUP_UPSERT_SQL, (0,))
+    if folded:
+        cursor.execute("UPDATE sales_history SET rolled_up = 1 WHERE rolled_up = 0")
+    return {'folded': folded}
+
+class _PendingSales:
+    """One request's validated sale lines waiting for the group committer"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SalesIngestor:
+    """Single writer that group-commits sale batches from concurrent requests.
+
+    Batches arriving within max_wait of each other (up to max_group_lines
+    lines) share one transaction and one commit. Writing from one thread
+    also keeps concurrent batches from deadlocking on the same product rows.
+    """
+
+    def __init__(self, max_group_lines, max_wait):
+        self.max_group_lines = max_group_lines
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'commits': 0,
+            'lines_accepted': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'failed_groups': 0,
+            'commit_seconds': 0.0,
+            'max_group_batches': 0
+        }
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name='sales-writer', daemon=True)
+            self._thread.start()
+        print("🧾 Sales group-commit writer started")
+
+    def submit(self, lines):
+        """Queue sale lines and block until their transaction commits"""
+        pending = _PendingSales(lines)
+        self.ensure_started()
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error:
+            raise pending.error
+        return pending.result
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        commits = metrics['commits']
+        busy = metrics['commit_seconds']
+        metrics['avg_batches_per_commit'] = round(metrics['requests'] / commits, 2) if commits else None
+        metrics['avg_commit_ms'] = round(busy * 1000 / commits, 2) if commits else None
+        metrics['lines_per_second'] = round(metrics['lines_accepted'] / busy, 1) if busy else None
+        metrics['commit_seconds'] = round(busy, 3)
+        metrics['queued_batches'] = self._queue.qsize()
+        return metrics
+
+    def _run(self):
+        while True:
+            group = [self._queue.get()]
+            lines = len(group[0].lines)
+            deadline = time.monotonic() + self.max_wait
+            while lines < self.max_group_lines:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                group.append(pending)
+                lines += len(pending.lines)
+
+            try:
+                self._commit_group(group)
+            except Exception as e:
+                print(f"❌ Sales group commit failed: {str(e)}")
+                with self._lock:
+                    self._metrics['failed_groups'] += 1
+                if len(group) == 1:
+                    group[0].error = e
+                else:
+                    # Retry each batch on its own so one bad batch cannot fail the others
+                    for pending in group:
+                        try:
+                            self._commit_group([pending])
+                        except Exception as batch_error:
+                            pending.error = batch_error
+            finally:
+                for pending in group:
+                    pending.done.set()
+
+    def _commit_group(self, group):
+        started = time.monotonic()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                results = self._write_group(cursor, group)
+            except mysql.connector.IntegrityError as e:
+                # Another process inserted one of our idempotency keys after
+                # we checked; the retry sees it as a duplicate
+                if e.errno != 1062:
+                    raise
+                conn.rollback()
+                results = self._write_group(cursor, group)
             conn.commit()
             cursor.close()
-            conn.close()
-            return jsonify({'success': True})
+        elapsed = time.monotonic() - started
+
+        invalidate_cache(*STOCK_CACHE_KEYS)
+        for pending, result in zip(group, results):
+            pending.result = result
+
+        with self._lock:
+            self._metrics['requests'] += len(group)
+            self._metrics['commits'] += 1
+            self._metrics['commit_seconds'] += elapsed
+            self._metrics['max_group_batches'] = max(self._metrics['max_group_batches'], len(group))
+            for result in results:
+                self._metrics['lines_accepted'] += result['accepted']
+                self._metrics['duplicates'] += result['duplicates']
+                self._metrics['rejected'] += result['rejected']
+
+    def _write_group(self, cursor, group):
+        all_lines = [line for pending in group for line in pending.lines]
+
+        skus = sorted({line['product_id'] for line in all_lines})
+        placeholders = ', '.join(['%s'] * len(skus))
+        # Locked so concurrent writers cannot both sell the last units
+        cursor.execute(
+            f"SELECT id, product_id, name, price, current_stock FROM products "
+            f"WHERE product_id IN ({placeholders}) FOR UPDATE",
+            skus
+        )
+        products = {row[1]: row for row in cursor.fetchall()}
+        available = {row[0]: row[4] or 0 for row in products.values()}
+
+        keys = sorted({line['idempotency_key'] for line in all_lines if line['idempotency_key']})
+        seen_keys = set()
+        if keys:
+            placeholders = ', '.join(['%s'] * len(keys))
+            cursor.execute(
+                f"SELECT idempotency_key FROM sales_history WHERE idempotency_key IN ({placeholders})",
+                keys
+            )
+            seen_keys = {row[0] for row in cursor.fetchall()}
+
+        rows = []
+        sold = {}
+        results = []
+        for pending in group:
+            result = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'errors': []}
+            for line in pending.lines:
+                key = line['idempotency_key']
+                if key and key in seen_keys:
+                    result['duplicates'] += 1
+                    continue
+                product = products.get(line['product_id'])
+                if product is None:
+                    result['rejected'] += 1
+                    result['errors'].append({'index': line['index'], 'error': 'Unknown product_id'})
+                    continue
+                product_pk, _, name, price, _ = product
+                if line['quantity'] > available[product_pk]:
+                    result['rejected'] += 1
+                    result['errors'].append({
+                        'index': line['index'],
+                        'error': f"Insufficient stock: {available[product_pk]} left"
+                    })
+                    continue
+                available[product_pk] -= line['quantity']
+                if key:
+                    seen_keys.add(key)
+
+                amount = line['amount']
+                if amount is None:
+                    amount = (price or 0) * line['quantity']
+                rows.append((product_pk, name, line['quantity'], line['sale_date'], amount, key, 1))
+                sold[product_pk] = sold.get(product_pk, 0) + line['quantity']
+                result['accepted'] += 1
+            results.append(result)
+
+        if rows:
+            cursor.executemany("""
+                INSERT INTO sales_history
+                (product_id, product_name, quantity_sold, sale_date, amount, idempotency_key, rolled_up)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, rows)
+            add_sales_to_rollup(cursor, [(row[0], row[2], row[3], row[4]) for row in rows])
+            # Update in primary key order so concurrent writers lock rows consistently
+            for product_pk, qty in sorted(sold.items()):
+                cursor.execute("""
+                    UPDATE products
+                    SET current_stock = current_stock - %s, total_sold = total_sold + %s
+                    WHERE id = %s AND current_stock >= %s
+                """, (qty, qty, product_pk, qty))
+                if cursor.rowcount != 1:
+                    # Stock changed under the lock; roll the whole group back
+                    raise RuntimeError(f"Stock for product {product_pk} would go negative")
+        return results
+
+sales_ingestor = SalesIngestor(
+    int(env_config['SALES_GROUP_COMMIT_MAX_LINES']),
+    float(env_config['SALES_GROUP_COMMIT_WAIT_MS']) / 1000
+)
+
+def _parse_quantity(value):
+    """A whole, positive number of units; 2.7 is rejected rather than truncated"""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('quantity must be a whole number')
+    if value <= 0:
+        raise ValueError('quantity must be positive')
+    return value
+
+def _parse_sale_line(index, raw, batch_key):
+    """Validate one sale line into the dict the ingestor writes"""
+    if not isinstance(raw, dict):
+        raise ValueError('Sale line must be an object')
+    if not raw.get('product_id'):
+        raise ValueError('Missing required field: product_id')
+
+    quantity = _parse_quantity(raw.get('quantity', 1))
+
+    amount = raw.get('amount')
+    amount = float(amount) if amount not in (None, '') else None
+
+    sale_date = raw.get('sale_date')
+    sale_date = datetime.fromisoformat(sale_date) if sale_date else datetime.now()
+
+    key = raw.get('idempotency_key')
+    if key is None and batch_key:
+        # Derive stable per-line keys so a retried request is not double-counted
+        key = hashlib.sha256(f'{batch_key}:{index}'.encode('utf-8')).hexdigest()
+    if key is not None:
+        key = str(key)
+        if len(key) > 64:
+            raise ValueError('idempotency_key must be at most 64 characters')
+
+    return {
+        'index': index,
+        'product_id': str(raw['product_id']),
+        'quantity': quantity,
+        'amount': amount,
+        'sale_date': sale_date,
+        'idempotency_key': key
+    }
+
+@app.route('/api/sales', methods=['POST'])
+def record_sales():
+    """Record a batch of sale lines and update stock in one transaction.
+
+    Body: {"sales": [{"product_id", "quantity", "amount"?, "sale_date"?,
+    "idempotency_key"?}]}. An Idempotency-Key header gives every line
+    without its own key a key derived from the header and its position.
+    """
+    data = request.get_json(silent=True)
+    raw_lines = data.get('sales') if isinstance(data, dict) else data
+    if not isinstance(raw_lines, list) or not raw_lines:
+        return jsonify({'error': 'sales must be a non-empty list'}), 400
+    if len(raw_lines) > SALES_MAX_REQUEST_LINES:
+        return jsonify({'error': f'At most {SALES_MAX_REQUEST_LINES} sale lines per request'}), 413
+
+    started = time.monotonic()
+    batch_key = request.headers.get('Idempotency-Key')
+    lines = []
+    errors = []
+    for index, raw in enumerate(raw_lines):
+        try:
+            lines.append(_parse_sale_line(index, raw, batch_key))
+        except (TypeError, ValueError) as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    result = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'errors': []}
+    if lines:
+        try:
+            result = sales_ingestor.submit(lines)
         except Exception as e:
-            cursor.close()
-            conn.close()
             return jsonify({'error': str(e)}), 500
 
-    elif request.method == 'DELETE':
-        try:
-            cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
-            conn.commit()
+    elapsed = time.monotonic() - started
+    errors = sorted(errors + result['errors'], key=lambda error: error['index'])
+    return jsonify({
+        'success': True,
+        'lines_received': len(raw_lines),
+        'lines_accepted': result['accepted'],
+        'duplicates_skipped': result['duplicates'],
+        'lines_rejected': len(errors),
+        'errors': errors,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'lines_per_second': round(result['accepted'] / elapsed, 1) if elapsed > 0 else None
+    })
+
+@app.route('/api/sales/daily')
+def get_sales_daily():
+    """Get daily or monthly sales totals from sales_daily_rollup.
+
+    Query params: start / end (YYYY-MM-DD, default the last 30 days),
+    granularity=day|month, product_id (SKU) and totals=1 to sum across
+    products.
+    """
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else datetime.now().date()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'month'):
+        return jsonify({'error': 'granularity must be day or month'}), 400
+    period = "r.sale_day" if granularity == 'day' else "DATE_FORMAT(r.sale_day, '%Y-%m')"
+
+    totals = _parse_flag(request.args.get('totals', ''))
+    select = [f"{period} AS period"]
+    group = ["period"]
+    if not totals:
+        select += ["r.product_id", "p.product_id AS sku", "p.name AS product_name"]
+        group += ["r.product_id", "p.product_id", "p.name"]
+
+    where = ["r.sale_day BETWEEN %s AND %s"]
+    params = [start, end]
+    if request.args.get('product_id'):
+        where.append("p.product_id = %s")
+        params.append(request.args['product_id'])
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT {', '.join(select)},
+                       CAST(SUM(r.quantity) AS SIGNED) AS quantity,
+                       SUM(r.amount) AS amount,
+                       CAST(SUM(r.transactions) AS SIGNED) AS transactions
+                FROM sales_daily_rollup r
+                LEFT JOIN products p ON r.product_id = p.id
+                WHERE {' AND '.join(where)}
+                GROUP BY {', '.join(group)}
+                ORDER BY period
+            """, params)
+            rows = cursor.fetchall()
             cursor.close()
-            conn.close()
-            return jsonify({'success': True})
-        except Exception as e:
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'granularity': granularity,
+            'rows': rows
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sales/rollup/refresh', methods=['POST'])
+def refresh_sales_rollup():
+    """Fold sales written outside the API into sales_daily_rollup (rebuild=1 recomputes it)"""
+    try:
+        rebuild = _parse_flag(request.args.get('rebuild', ''))
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            folded = roll_up_sales(cursor, rebuild=rebuild)
+            conn.commit()
             cursor.close()
-            conn.close()
-            return jsonify({'error': str(e)}), 500
+        return jsonify({'success': True, 'rebuilt': rebuild, **folded})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sales/metrics')
+def get_sales_metrics():
+    """Get group-commit throughput counters for sales ingestion"""
+    return jsonify(sales_ingestor.stats())
 
 # =========================
 # AUTOMATION ROUTES (Email & Export)
 # =========================
 
+LOW_STOCK_FROM = """
+    FROM products p
+    JOIN suppliers s ON p.supplier_id = s.id
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.is_low_stock = 1
+    AND s.email IS NOT NULL AND s.email != ''
+"""
+
+LOW_STOCK_REQUIRED_QTY = "GREATEST(COALESCE(p.minimum_stock, 0) * 2, 20)"
+
+def _low_stock_query(supplier_id=None):
+    """Low-stock products grouped per supplier by MySQL, one row per supplier"""
+    sql = f"""
+        SELECT
+            s.id AS supplier_id, s.name AS supplier_name, s.email AS supplier_email,
+            JSON_ARRAYAGG(JSON_OBJECT(
+                'id', p.id, 'product_id', p.product_id, 'product_name', p.name,
+                'current_stock', p.current_stock, 'minimum_stock', p.minimum_stock,
+                'supplier_id', s.id, 'supplier_name', s.name, 'supplier_email', s.email,
+                'category_name', c.name,
+                'required_quantity', {LOW_STOCK_REQUIRED_QTY}
+            )) AS products
+        {LOW_STOCK_FROM}
+        {"AND p.supplier_id = %s" if supplier_id is not None else ""}
+        GROUP BY s.id, s.name, s.email
+        ORDER BY MIN(p.current_stock) ASC, s.id
+    """
+    return sql, (supplier_id,) if supplier_id is not None else ()
+
+LOW_STOCK_SUMMARY_SQL = f"""
+    SELECT
+        s.id AS supplier_id, s.name AS supplier_name, s.email AS supplier_email,
+        COUNT(*) AS product_count,
+        CAST(SUM({LOW_STOCK_REQUIRED_QTY}) AS SIGNED) AS total_units,
+        MIN(p.current_stock) AS lowest_stock
+    {LOW_STOCK_FROM}
+    GROUP BY s.id, s.name, s.email
+    ORDER BY lowest_stock ASC, s.id
+"""
+
+def _low_stock_suppliers(rows):
+    suppliers = []
+    for row in rows:
+        products = json.loads(row.pop('products'))
+        # JSON_ARRAYAGG has no ORDER BY, so put the emptiest shelves first here
+        products.sort(key=lambda p: p['current_stock'])
+        row['custom_message'] = ''
+        row['products'] = products
+        suppliers.append(row)
+    return suppliers
+
+def _load_low_stock(supplier_id=None):
+    sql, params = _low_stock_query(supplier_id)
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return _low_stock_suppliers(rows)
+
+def _load_low_stock_summary():
+    """Per-supplier counts without product lists, for lazy loading"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(LOW_STOCK_SUMMARY_SQL)
+        rows = cursor.fetchall()
+        cursor.close()
+
+    for row in rows:
+        row['custom_message'] = ''
+    return rows
+
 @app.route('/api/low-stock')
 def get_low_stock():
-    """Get low stock products with supplier details"""
+    """Get low stock products grouped by supplier (?summary=1 omits product lists)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                p.id, p.product_id, p.name as product_name, p.current_stock, p.minimum_stock,
-                s.id as supplier_id, s.name as supplier_name, s.email as supplier_email,
-                c.name as category_name
-            FROM products p
-            LEFT JOIN suppliers s ON p.supplier_id = s.id
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.current_stock <= p.minimum_stock 
-            AND s.email IS NOT NULL AND s.email != ''
-            ORDER BY p.current_stock ASC
-        """)
-        
-        products = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        # Group by supplier
-        suppliers = {}
-        for product in products:
-            supplier_id = product['supplier_id']
-            if supplier_id not in suppliers:
-                suppliers[supplier_id] = {
-                    'supplier_id': supplier_id,
-                    'supplier_name': product['supplier_name'],
-                    'supplier_email': product['supplier_email'],
-                    'custom_message': '',
-                    'products': []
-                }
-            
-            required_qty = max(product['minimum_stock'] * 2, 20)
-            product['required_quantity'] = required_qty
-            suppliers[supplier_id]['products'].append(product)
-        
-        return jsonify(list(suppliers.values()))
-        
+        if _parse_flag(request.args.get('summary', '')):
+            return jsonify(cached_read('low_stock_summary', _load_low_stock_summary))
+        return jsonify(cached_read('low_stock', _load_low_stock))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/low-stock/<int:supplier_id>')
+def get_supplier_low_stock(supplier_id):
+    """Get one supplier's low stock products"""
+    try:
+        suppliers = _load_low_stock(supplier_id)
+        if not suppliers:
+            return jsonify({'error': 'No low stock products for this supplier'}), 404
+        return jsonify(suppliers[0])
+    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+class EmailDispatcher:
+    """Worker pool that drains email_outbox over reused SMTP connections"""
+
+    def __init__(self, workers, batch_size, max_attempts, retry_delay, poll_interval):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        # Rows stuck in 'sending' this long (e.g. after a crash) are claimed again
+        self.claim_timeout = 600
+
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # Emails the SMTP server accepted but whose 'sent' status could not be
+        # written yet; their claims are still held, so nobody resends them
+        self._unrecorded = []
+
+    def ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"📧 Email dispatcher started with {self.workers} workers")
+
+    @staticmethod
+    def idempotency_key(supplier_data):
+        """Same supplier, products and message on the same day is the same order"""
+        products = sorted(
+            (str(p.get('product_id')), int(p.get('required_quantity', 20)))
+            for p in supplier_data['products']
+        )
+        raw = json.dumps([
+            datetime.now().strftime('%Y-%m-%d'),
+            supplier_data['supplier_email'].strip().lower(),
+            products,
+            supplier_data.get('custom_message', '')
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def enqueue(self, suppliers):
+        """Queue one email per supplier under a new job id"""
+        job_id = str(uuid.uuid4())
+        queued = 0
+        duplicates = 0
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for supplier_data in suppliers:
+                # A failed earlier attempt is requeued under this job; anything else is a duplicate.
+                # status is assigned last because MySQL applies these assignments left to right.
+                cursor.execute("""
+                    INSERT INTO email_outbox
+                        (job_id, idempotency_key, supplier_id, supplier_name, supplier_email, payload)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        job_id = IF(status = 'failed', VALUES(job_id), job_id),
+                        attempts = IF(status = 'failed', 0, attempts),
+                        next_attempt_at = IF(status = 'failed', CURRENT_TIMESTAMP, next_attempt_at),
+                        status = IF(status = 'failed', 'pending', status)
+                """, (
+                    job_id,
+                    self.idempotency_key(supplier_data),
+                    supplier_data.get('supplier_id'),
+                    supplier_data['supplier_name'],
+                    supplier_data['supplier_email'],
+                    json.dumps({
+                        'products': supplier_data['products'],
+                        'custom_message': supplier_data.get('custom_message', '')
+                    }, default=str)
+                ))
+                if cursor.rowcount:
+                    queued += 1
+                else:
+                    duplicates += 1
+            conn.commit()
+            cursor.close()
+
+        self.ensure_started()
+        self._wakeup.set()
+        return {'job_id': job_id, 'queued': queued, 'duplicates': duplicates}
+
+    def job_progress(self, job_id):
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT status, COUNT(*) AS count
+                FROM email_outbox WHERE job_id = %s
+                GROUP BY status
+            """, (job_id,))
+            counts = {row['status']: row['count'] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT supplier_name, supplier_email, attempts, last_error
+                FROM email_outbox
+                WHERE job_id = %s AND status = 'failed'
+            """, (job_id,))
+            failures = cursor.fetchall()
+            cursor.close()
+
+        if not counts:
+            return None
+
+        total = sum(counts.values())
+        finished = counts.get('sent', 0) + counts.get('failed', 0)
+        return {
+            'job_id': job_id,
+            'total': total,
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'done': finished == total,
+            'failures': failures
+        }
+
+    def _run(self):
+        with app.app_context():
+            while True:
+                try:
+                    self._record_unrecorded()
+                    claimed = self._process_batch()
+                except Exception as e:
+                    print(f"❌ Email worker error: {str(e)}")
+                    claimed = 0
+                if not claimed:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+
+    def _claim_batch(self):
+        token = str(uuid.uuid4())
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'sending', claim_token = %s, claimed_at = CURRENT_TIMESTAMP
+                WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                   OR (status = 'sending' AND claimed_at < CURRENT_TIMESTAMP - INTERVAL %s SECOND)
+                ORDER BY id
+                LIMIT %s
+            """, (token, self.claim_timeout, self.batch_size))
+            conn.commit()
+            cursor.execute("""
+                SELECT id, supplier_name, supplier_email, payload, attempts
+                FROM email_outbox WHERE claim_token = %s AND status = 'sending'
+            """, (token,))
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def _process_batch(self):
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+
+        sent = []
+        failed = []
+        try:
+            # One SMTP session for the whole batch
+            with mail.connect() as smtp:
+                for row in rows:
+                    payload = json.loads(row['payload'])
+                    supplier_data = {
+                        'supplier_name': row['supplier_name'],
+                        'supplier_email': row['supplier_email'],
+                        'products': payload['products'],
+                        'custom_message': payload['custom_message']
+                    }
+                    try:
+                        smtp.send(build_supplier_email(supplier_data))
+                    except Exception as e:
+                        print(f"Email error: {str(e)}")
+                        failed.append((row, str(e)))
+                        continue
+                    sent.append(row)
+                    self._record_sent(row, supplier_data)
+        except Exception as e:
+            # Connection-level failure: everything not yet sent gets retried
+            print(f"SMTP connection error: {str(e)}")
+            done = {row['id'] for row in sent} | {row['id'] for row, _ in failed}
+            failed.extend((row, str(e)) for row in rows if row['id'] not in done)
+
+        self._record_failures(failed)
+        return len(rows)
+
+    def _record_sent(self, row, supplier_data):
+        """Mark one email sent as soon as SMTP accepts it, so a later crash cannot resend it"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE email_outbox
+                    SET status = 'sent', sent_date = CURRENT_TIMESTAMP, attempts = attempts + 1, last_error = NULL
+                    WHERE id = %s
+                """, (row['id'],))
+                cursor.execute("""
+                    INSERT INTO order_history 
+                    (supplier_name, supplier_email, products_details, total_products, custom_message)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (
+                    supplier_data['supplier_name'],
+                    supplier_data['supplier_email'],
+                    json.dumps(supplier_data['products']),
+                    len(supplier_data['products']),
+                    supplier_data.get('custom_message', '')
+                ))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            # Retried before the next claim, well within claim_timeout
+            print(f"❌ Could not record sent email {row['id']}: {str(e)}")
+            with self._lock:
+                self._unrecorded.append((row, supplier_data))
+
+    def _record_unrecorded(self):
+        with self._lock:
+            pending, self._unrecorded = self._unrecorded, []
+        for row, supplier_data in pending:
+            self._record_sent(row, supplier_data)
+
+    def _record_failures(self, failed):
+        """Release failed claims for a later retry, or give up after max_attempts"""
+        if not failed:
+            return
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE email_outbox
+                SET attempts = attempts + 1,
+                    last_error = %s,
+                    next_attempt_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND,
+                    status = IF(attempts >= %s, 'failed', 'pending')
+                WHERE id = %s
+            """, [
+                (error[:1000], self.retry_delay * (row['attempts'] + 1), self.max_attempts, row['id'])
+                for row, error in failed
+            ])
+            conn.commit()
+            cursor.close()
+
+email_dispatcher = EmailDispatcher(
+    int(env_config['EMAIL_WORKERS']),
+    int(env_config['EMAIL_BATCH_SIZE']),
+    int(env_config['EMAIL_MAX_ATTEMPTS']),
+    int(env_config['EMAIL_RETRY_DELAY']),
+    float(env_config['EMAIL_POLL_INTERVAL'])
+)
+
 @app.route('/api/send-emails', methods=['POST'])
 def send_emails():
-    """Send simple emails to suppliers"""
+    """Queue reorder emails to suppliers and return a job id immediately"""
     try:
         data = request.json
         selected_suppliers = data.get('suppliers', [])
@@ -777,152 +3361,128 @@ def send_emails():
         if not selected_suppliers:
             return jsonify({'success': False, 'message': 'No suppliers selected'})
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        emails_sent = 0
-        emails_failed = 0
-        
-        for supplier_data in selected_suppliers:
-            try:
-                if send_supplier_email(supplier_data):
-                    cursor.execute("""
-                        INSERT INTO order_history 
-                        (supplier_name, supplier_email, products_details, total_products, custom_message)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (
-                        supplier_data['supplier_name'],
-                        supplier_data['supplier_email'],
-                        json.dumps(supplier_data['products']),
-                        len(supplier_data['products']),
-                        supplier_data.get('custom_message', '')
-                    ))
-                    emails_sent += 1
-                else:
-                    emails_failed += 1
-                    
-            except Exception as e:
-                emails_failed += 1
-                print(f"Error: {str(e)}")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        job = email_dispatcher.enqueue(selected_suppliers)
         
         return jsonify({
             'success': True,
-            'emails_sent': emails_sent,
-            'emails_failed': emails_failed,
-            'message': f'Sent {emails_sent} emails, {emails_failed} failed'
-        })
+            'job_id': job['job_id'],
+            'emails_queued': job['queued'],
+            'duplicates_skipped': job['duplicates'],
+            'message': f"Queued {job['queued']} emails, skipped {job['duplicates']} already sent or in progress"
+        }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def send_supplier_email(supplier_data):
-    """Send simple email to supplier"""
+@app.route('/api/send-emails/<job_id>')
+def send_emails_progress(job_id):
+    """Get delivery progress for an email job"""
     try:
-        # Build products table
-        products_html = ""
-        total_items = 0
-        for product in supplier_data['products']:
-            qty = product.get('required_quantity', 20)
-            total_items += qty
-            products_html += f"""
-            <tr>
-                <td style="padding: 8px; border: 1px solid #ddd;">{product['product_id']}</td>
-                <td style="padding: 8px; border: 1px solid #ddd;">{product['product_name']}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; color: red; font-weight: bold;">{product['current_stock']}</td>
-                <td style="padding: 8px; border: 1px solid #ddd;">{product['minimum_stock']}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; font-weight: bold; color: blue;">{qty}</td>
-            </tr>
-            """
-        
-        # Custom message
-        custom_message_html = ""
-        if supplier_data.get('custom_message', '').strip():
-            custom_message_html = f"""
-            <div style="background: #e7f3ff; padding: 15px; margin: 20px 0; border-left: 4px solid #2196f3;">
-                <h3 style="margin: 0 0 10px 0; color: #1976d2;">📝 Special Instructions:</h3>
-                <p style="margin: 0;">{supplier_data['custom_message']}</p>
+        email_dispatcher.ensure_started()
+        progress = email_dispatcher.job_progress(job_id)
+        if progress is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(progress)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def build_supplier_email(supplier_data):
+    """Build the reorder email for a supplier"""
+    # Build products table
+    products_html = ""
+    total_items = 0
+    for product in supplier_data['products']:
+        qty = product.get('required_quantity', 20)
+        total_items += qty
+        products_html += f"""
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;">{product['product_id']}</td>
+            <td style="padding: 8px; border: 1px solid #ddd;">{product['product_name']}</td>
+            <td style="padding: 8px; border: 1px solid #ddd; color: red; font-weight: bold;">{product['current_stock']}</td>
+            <td style="padding: 8px; border: 1px solid #ddd;">{product['minimum_stock']}</td>
+            <td style="padding: 8px; border: 1px solid #ddd; font-weight: bold; color: blue;">{qty}</td>
+        </tr>
+        """
+    
+    # Custom message
+    custom_message_html = ""
+    if supplier_data.get('custom_message', '').strip():
+        custom_message_html = f"""
+        <div style="background: #e7f3ff; padding: 15px; margin: 20px 0; border-left: 4px solid #2196f3;">
+            <h3 style="margin: 0 0 10px 0; color: #1976d2;">📝 Special Instructions:</h3>
+            <p style="margin: 0;">{supplier_data['custom_message']}</p>
+        </div>
+        """
+    
+    email_content = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif;">
+        <div style="max-width: 800px; margin: 0 auto; background: white;">
+            <div style="background: #4CAF50; color: white; padding: 20px; text-align: center;">
+                <h1>Stock Reorder Request</h1>
+                <p>{COMPANY_INFO['COMPANY_NAME']}</p>
             </div>
-            """
-        
-        email_content = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif;">
-            <div style="max-width: 800px; margin: 0 auto; background: white;">
-                <div style="background: #4CAF50; color: white; padding: 20px; text-align: center;">
-                    <h1>Stock Reorder Request</h1>
-                    <p>{COMPANY_INFO['COMPANY_NAME']}</p>
-                </div>
-                <div style="padding: 20px;">
-                    <h2>Dear {supplier_data['supplier_name']},</h2>
-                    <p>We need to reorder the following products:</p>
-                    
-                    <ul>
-                        <li><strong>{len(supplier_data['products'])} products</strong> need restocking</li>
-                        <li><strong>{total_items} total units</strong> requested</li>
-                        <li><strong>Order date:</strong> {datetime.now().strftime('%B %d, %Y')}</li>
-                    </ul>
-                    
-                    {custom_message_html}
-                    
-                    <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
-                        <tr style="background: #f2f2f2;">
-                            <th style="padding: 10px; border: 1px solid #ddd;">Product ID</th>
-                            <th style="padding: 10px; border: 1px solid #ddd;">Product Name</th>
-                            <th style="padding: 10px; border: 1px solid #ddd;">Current Stock</th>
-                            <th style="padding: 10px; border: 1px solid #ddd;">Minimum Stock</th>
-                            <th style="padding: 10px; border: 1px solid #ddd;">Required Quantity</th>
-                        </tr>
-                        {products_html}
-                    </table>
-                    
-                    <p>Please confirm receipt and provide delivery timeline.</p>
-                    <p><strong>Contact:</strong> {COMPANY_INFO['ADMIN_EMAIL']}</p>
-                </div>
-                <div style="background: #333; color: white; padding: 20px; text-align: center;">
-                    <p>Thank you for your business!</p>
-                    <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                </div>
+            <div style="padding: 20px;">
+                <h2>Dear {supplier_data['supplier_name']},</h2>
+                <p>We need to reorder the following products:</p>
+                
+                <ul>
+                    <li><strong>{len(supplier_data['products'])} products</strong> need restocking</li>
+                    <li><strong>{total_items} total units</strong> requested</li>
+                    <li><strong>Order date:</strong> {datetime.now().strftime('%B %d, %Y')}</li>
+                </ul>
+                
+                {custom_message_html}
+                
+                <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
+                    <tr style="background: #f2f2f2;">
+                        <th style="padding: 10px; border: 1px solid #ddd;">Product ID</th>
+                        <th style="padding: 10px; border: 1px solid #ddd;">Product Name</th>
+                        <th style="padding: 10px; border: 1px solid #ddd;">Current Stock</th>
+                        <th style="padding: 10px; border: 1px solid #ddd;">Minimum Stock</th>
+                        <th style="padding: 10px; border: 1px solid #ddd;">Required Quantity</th>
+                    </tr>
+                    {products_html}
+                </table>
+                
+                <p>Please confirm receipt and provide delivery timeline.</p>
+                <p><strong>Contact:</strong> {COMPANY_INFO['ADMIN_EMAIL']}</p>
             </div>
-        </body>
-        </html>
-        """
-        
-        msg = Message(
-            subject=f"Stock Reorder Request - {len(supplier_data['products'])} Items",
-            recipients=[supplier_data['supplier_email']],
-            html=email_content,
-            sender=app.config['MAIL_DEFAULT_SENDER']
-        )
-        
-        mail.send(msg)
-        return True
-        
-    except Exception as e:
-        print(f"Email error: {str(e)}")
-        return False
+            <div style="background: #333; color: white; padding: 20px; text-align: center;">
+                <p>Thank you for your business!</p>
+                <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    return Message(
+        subject=f"Stock Reorder Request - {len(supplier_data['products'])} Items",
+        recipients=[supplier_data['supplier_email']],
+        html=email_content,
+        sender=app.config['MAIL_DEFAULT_SENDER']
+    )
+
+ORDER_HISTORY_RECENT_SQL = """
+    SELECT * FROM order_history 
+    ORDER BY order_date DESC 
+    LIMIT 50
+"""
 
 @app.route('/api/order-history')
 def get_order_history():
     """Get order history"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""
-            SELECT * FROM order_history 
-            ORDER BY order_date DESC 
-            LIMIT 50
-        """)
+            cursor.execute(ORDER_HISTORY_RECENT_SQL)
         
-        history = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            history = cursor.fetchall()
+            cursor.close()
         
-        return jsonify(history)
+            return jsonify(history)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -931,116 +3491,432 @@ def get_order_history():
 # CSV EXPORT FEATURES
 # =========================
 
+def _table_row_estimates(cursor):
+    """InnoDB row estimates from information_schema; no table scans"""
+    placeholders = ', '.join(['%s'] * len(AVAILABLE_TABLES))
+    cursor.execute(f"""
+        SELECT TABLE_NAME, TABLE_ROWS
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+    """, AVAILABLE_TABLES)
+    return {name: int(rows or 0) for name, rows in cursor.fetchall()}
+
 @app.route('/api/tables')
 def get_tables():
-    """Get list of available tables"""
+    """Get list of available tables with row counts.
+
+    By default counts come from the background exact-count cache, falling
+    back to information_schema estimates (row_count_exact=false) while a
+    recount runs. ?count=exact runs COUNT(*) on every table now.
+    """
+    exact = request.args.get('count') == 'exact'
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        table_info = []
-        for table in AVAILABLE_TABLES:
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                table_info.append({
-                    'name': table,
-                    'display_name': table.replace('_', ' ').title(),
-                    'row_count': count
-                })
-            except Exception as e:
-                table_info.append({
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            estimates = {} if exact else _table_row_estimates(cursor)
+
+            table_info = []
+            stale = False
+            for table in AVAILABLE_TABLES:
+                info = {
                     'name': table,
-                    'display_name': table.replace('_', ' ').title(),
-                    'row_count': 0,
-                    'error': str(e)
-                })
-        
-        cursor.close()
-        conn.close()
+                    'display_name': table.replace('_', ' ').title()
+                }
+                try:
+                    if exact:
+                        cached = (table_row_counts.count_now(cursor, table), datetime.now())
+                    else:
+                        cached = table_row_counts.get(table)
+                    if cached:
+                        info.update(row_count=cached[0], row_count_exact=True,
+                                    counted_at=cached[1].isoformat())
+                    else:
+                        stale = True
+                        info.update(row_count=estimates.get(table, 0), row_count_exact=False)
+                except Exception as e:
+                    info.update(row_count=0, row_count_exact=False, error=str(e))
+                table_info.append(info)
+
+            cursor.close()
+
+        if stale:
+            table_row_counts.refresh_async()
         return jsonify({'tables': table_info})
-        
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Rows per /api/table-data page
+TABLE_DATA_PAGE_SIZE = {'DEFAULT': 100, 'MAX': 1000}
+
+# Column metadata changes only with migrations, so it is cached for an hour
+table_metadata_cache = TTLCache(3600)
+
+TABLE_FILTER_OPERATORS = {
+    'eq': '=', 'ne': '!=', 'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>=', 'like': 'LIKE'
+}
+
+def _load_table_metadata(table):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+        """, (table,))
+        columns = cursor.fetchall()
+        # Only the leading column of an index can serve an ORDER BY on its own
+        cursor.execute("""
+            SELECT DISTINCT COLUMN_NAME
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND SEQ_IN_INDEX = 1
+        """, (table,))
+        indexed = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+
+    primary_key = next((name for name, _, _, key in columns if key == 'PRI'), 'id')
+    return {
+        'columns': [{'name': name, 'type': data_type, 'nullable': nullable == 'YES'}
+                    for name, data_type, nullable, _ in columns],
+        'primary_key': primary_key,
+        'sortable': [name for name, _, _, _ in columns if name in indexed or name == primary_key]
+    }
+
+def get_table_metadata(table):
+    """Column names/types, primary key and index-backed sort columns of a table"""
+    return table_metadata_cache.get_or_load(table, lambda: _load_table_metadata(table))
+
+def _keyset_condition(sort, primary_key, descending, last_value, last_key):
+    """WHERE clause seeking past (last_value, last_key) in (sort, primary_key) order.
+
+    MySQL sorts NULLs first ascending and last descending.
+    """
+    op = '<' if descending else '>'
+    if sort == primary_key:
+        return f"{primary_key} {op} %s", [last_key]
+    if last_value is None:
+        if descending:
+            return f"({sort} IS NULL AND {primary_key} < %s)", [last_key]
+        return f"(({sort} IS NULL AND {primary_key} > %s) OR {sort} IS NOT NULL)", [last_key]
+    condition = f"({sort} {op} %s OR ({sort} = %s AND {primary_key} {op} %s)"
+    condition += f" OR {sort} IS NULL)" if descending else ")"
+    return condition, [last_value, last_value, last_key]
+
+def _build_table_data_query(table, args):
+    """Build the SELECT for one /api/table-data page"""
+    meta = get_table_metadata(table)
+    names = [c['name'] for c in meta['columns']]
+    primary_key = meta['primary_key']
+
+    if args.get('columns'):
+        columns = [c.strip() for c in args['columns'].split(',') if c.strip()]
+        unknown = [c for c in columns if c not in names]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    else:
+        columns = names
+
+    sort = args.get('sort', primary_key)
+    if sort not in meta['sortable']:
+        raise ValueError(f"sort must be one of: {', '.join(meta['sortable'])}")
+    order = args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    descending = order == 'desc'
+
+    limit = min(int(args.get('limit', TABLE_DATA_PAGE_SIZE['DEFAULT'])), TABLE_DATA_PAGE_SIZE['MAX'])
+    if limit <= 0:
+        raise ValueError('limit must be positive')
+
+    where = []
+    params = []
+    # filter=<column>:<op>:<value>, repeatable; ops as in TABLE_FILTER_OPERATORS
+    for spec in args.getlist('filter'):
+        parts = spec.split(':', 2)
+        if len(parts) == 2:
+            parts.insert(1, 'eq')
+        if len(parts) != 3 or parts[0] not in names or parts[1] not in TABLE_FILTER_OPERATORS:
+            raise ValueError(f'Invalid filter: {spec}')
+        column, op, value = parts
+        if op == 'like':
+            value = f'%{value}%'
+        where.append(f"{column} {TABLE_FILTER_OPERATORS[op]} %s")
+        params.append(value)
+
+    if args.get('cursor'):
+        last_value, last_key = _decode_cursor(args['cursor'], length=2)
+        condition, condition_params = _keyset_condition(sort, primary_key, descending, last_value, last_key)
+        where.append(condition)
+        params.extend(condition_params)
+
+    # Keyset columns are always selected so the next cursor can be built
+    selected = list(dict.fromkeys(columns + [sort, primary_key]))
+    direction = 'DESC' if descending else 'ASC'
+    query = f"SELECT {', '.join(selected)} FROM {table}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY {sort} {direction}"
+    if sort != primary_key:
+        query += f", {primary_key} {direction}"
+    # Fetch one extra row to know whether another page exists
+    query += " LIMIT %s"
+    params.append(limit + 1)
+
+    return query, params, columns, sort, primary_key, limit
+
 @app.route('/api/table-data')
 def get_table_data():
-    """Get data from specific table"""
+    """Browse a table one keyset page at a time.
+
+    Query params: table, columns (comma list), sort (primary key or an
+    indexed column), order=asc|desc, filter=<column>:<op>:<value>
+    (repeatable), limit and cursor (next_cursor of the previous page).
+    """
     table = request.args.get('table')
     
     if table not in AVAILABLE_TABLES:
         return jsonify({'error': 'Invalid table name'}), 400
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute(f"SELECT * FROM {table} LIMIT 100")
-        rows = cursor.fetchall()
-        
-        # Get column names
-        if rows:
-            columns = list(rows[0].keys())
-        else:
-            cursor.execute(f"DESCRIBE {table}")
-            columns = [col for col in cursor.fetchall()]
-        
-        cursor.close()
-        conn.close()
-        
+        try:
+            query, params, columns, sort, primary_key, limit = _build_table_data_query(table, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = _encode_cursor([last[sort], last[primary_key]])
+
         return jsonify({
+            'table': table,
             'columns': columns,
-            'rows': rows
+            'rows': [{c: row[c] for c in columns} for row in rows],
+            'sort': sort,
+            'order': request.args.get('order', 'asc').lower(),
+            'sortable_columns': get_table_metadata(table)['sortable'],
+            'next_cursor': next_cursor,
+            'has_more': has_more
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Rows fetched per round trip when streaming exports
+EXPORT_CHUNK_SIZE = 5000
+
+def _format_csv_value(item):
+    if isinstance(item, datetime):
+        return item.strftime('%Y-%m-%d %H:%M:%S')
+    return str(item) if item is not None else ''
+
+def _close_export_cursor(conn, cursor):
+    """Close an unbuffered export cursor, including one abandoned mid-stream"""
+    if conn.unread_result:
+        # The client disconnected: cursor.close() would raise on the pending
+        # rows, and draining them could take as long as the export. Leave
+        # them; the pool drops connections with unread results on release.
+        return
+    cursor.close()
+
+def _stream_table_csv(table, compress=False):
+    """Yield a table as CSV, reading it through an unbuffered cursor in chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # wbits=31 makes zlib emit a gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return compressor.compress(data) if compressor else data
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(f"SELECT * FROM {table}")
+            writer.writerow([desc[0] for desc in cursor.description])
+
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    writer.writerow([_format_csv_value(item) for item in row])
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        finally:
+            _close_export_cursor(conn, cursor)
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+# Rows per Parquet row group / Arrow record batch in columnar exports
+EXPORT_ROW_GROUP_SIZE = 65536
+
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'mimetype': 'text/csv'},
+    'parquet': {'extension': 'parquet', 'mimetype': 'application/vnd.apache.parquet'},
+    'arrow': {'extension': 'arrow', 'mimetype': 'application/vnd.apache.arrow.file'}
+}
+
+EXPORT_COMPRESSIONS = ['zstd', 'lz4', 'snappy', 'none']
+
+def _arrow_type(type_code):
+    """Map a MySQL column type code to the Arrow type used in exports"""
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.INT24,
+                     FieldType.LONGLONG, FieldType.YEAR):
+        return pa.int64()
+    if type_code == FieldType.FLOAT:
+        return pa.float32()
+    if type_code in (FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL):
+        return pa.float64()
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp('us')
+    if type_code == FieldType.TIME:
+        return pa.duration('us')
+    return pa.string()
+
+def _arrow_value(item):
+    if isinstance(item, Decimal):
+        return float(item)
+    if isinstance(item, (bytes, bytearray)):
+        return item.decode('utf-8', errors='replace')
+    return item
+
+class _ExportSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a streaming response"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+def _stream_table_columnar(table, export_format, compression):
+    """Yield a table as Parquet or Arrow IPC, one row group per chunk read"""
+    sink = _ExportSink()
+    codec = None if compression == 'none' else compression
+    writer = None
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(f"SELECT * FROM {table}")
+            schema = pa.schema([(desc[0], _arrow_type(desc[1])) for desc in cursor.description])
+
+            if export_format == 'parquet':
+                writer = pq.ParquetWriter(sink, schema, compression=codec or 'none')
+            else:
+                options = pa.ipc.IpcWriteOptions(compression='lz4_frame' if codec == 'lz4' else codec)
+                writer = pa.ipc.new_file(sink, schema, options=options)
+
+            while True:
+                rows = cursor.fetchmany(EXPORT_ROW_GROUP_SIZE)
+                if not rows:
+                    break
+                columns = zip(*rows)
+                batch = pa.Table.from_arrays(
+                    [pa.array([_arrow_value(item) for item in values], type=field.type)
+                     for values, field in zip(columns, schema)],
+                    schema=schema
+                )
+                writer.write_table(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            _close_export_cursor(conn, cursor)
+
+    # Footer with the row group / record batch index
+    writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
 @app.route('/api/download')
 def download_table():
-    """Download table data as CSV"""
+    """Stream table data as CSV, Parquet or Arrow IPC.
+
+    format=csv (default) accepts gzip=1 for a .csv.gz download.
+    format=parquet / format=arrow keep column types and accept
+    compression=zstd|lz4|snappy|none (default zstd; snappy is Parquet only).
+    Uncompressed Arrow files can be memory-mapped without copying.
+    """
     table = request.args.get('table')
     
     if table not in AVAILABLE_TABLES:
         return jsonify({'error': 'Invalid table name'}), 400
     
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format. Choose from: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    filename = f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[export_format]['extension']}"
+    mimetype = EXPORT_FORMATS[export_format]['mimetype']
+    
+    if export_format == 'csv':
+        compress = _parse_flag(request.args.get('gzip', ''))
+        if compress:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        stream = _stream_table_csv(table, compress)
+    else:
+        if pa is None:
+            return jsonify({'error': 'Columnar export requires pyarrow (pip install pyarrow)'}), 501
+        compression = request.args.get('compression', 'zstd').lower()
+        if compression not in EXPORT_COMPRESSIONS:
+            return jsonify({'error': f"Invalid compression. Choose from: {', '.join(EXPORT_COMPRESSIONS)}"}), 400
+        if export_format == 'arrow' and compression == 'snappy':
+            return jsonify({'error': 'Arrow IPC supports zstd, lz4 or none compression'}), 400
+        stream = _stream_table_columnar(table, export_format, compression)
+    
+    # Pull the first chunk eagerly so query errors still produce a JSON 500
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(f"SELECT * FROM {table}")
-        rows = cursor.fetchall()
-        headers = [desc[0] for desc in cursor.description]
-        
-        cursor.close()
-        conn.close()
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(headers)
-        
-        for row in rows:
-            formatted_row = []
-            for item in row:
-                if isinstance(item, datetime):
-                    formatted_row.append(item.strftime('%Y-%m-%d %H:%M:%S'))
-                else:
-                    formatted_row.append(str(item) if item is not None else '')
-            writer.writerow(formatted_row)
-        
-        output.seek(0)
-        filename = f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        first_chunk = next(stream, b'')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    def body():
+        yield first_chunk
+        yield from stream
+    
+    return Response(
+        stream_with_context(body()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 # =========================
 # UTILITY ROUTES
@@ -1050,6 +3926,88 @@ def download_table():
 def health():
     return jsonify({'status': 'running', 'service': 'Combined Inventory Management System'})
 
+@app.route('/api/db-pool')
+def get_db_pool_stats():
+    """Get connection pool occupancy and checkout metrics, plus replica routing"""
+    return jsonify(dict(db_pool.stats(), routing=replica_router.stats()))
+
+@app.route('/api/schema')
+def get_schema_status():
+    """Get applied migrations and index usage of the hot queries"""
+    try:
+        plans = check_query_plans()
+        return jsonify({
+            'migrations': schema_version(),
+            'latest_version': MIGRATIONS[-1][0],
+            'query_plans': plans,
+            'all_indexed': all(p['uses_index'] for p in plans)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Monotonic totals in each stats() dict; everything else is a gauge
+CACHE_COUNTERS = ('hits', 'misses', 'invalidations')
+STATS_COUNTERS = {
+    'db_pool': ('checkouts', 'exhaustion_events', 'timeouts', 'health_check_failures',
+                'connections_opened', 'connections_discarded'),
+    'db_routing': ('replica_reads', 'primary_reads', 'lag_fallbacks', 'down_fallbacks',
+                   'replica_failures'),
+    'api_cache': CACHE_COUNTERS,
+    'table_metadata_cache': CACHE_COUNTERS,
+    'sales': ('requests', 'commits', 'lines_accepted', 'duplicates', 'rejected',
+              'failed_groups', 'commit_seconds'),
+}
+
+def _stats_lines(prefix, stats):
+    """Export the numeric fields of a stats() dict as counters (_total) or gauges"""
+    counters = STATS_COUNTERS.get(prefix, ())
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            name = f'inventory_{prefix}_{key}_total'
+            lines += [f'# TYPE {name} counter', f'{name} {value}']
+        else:
+            name = f'inventory_{prefix}_{key}'
+            lines += [f'# TYPE {name} gauge', f'{name} {value}']
+    return lines
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, pool, cache and background-worker metrics in Prometheus text format"""
+    lines = request_metrics.prometheus_lines()
+    lines += _stats_lines('db_pool', db_pool.stats())
+    lines += _stats_lines('db_routing', replica_router.stats())
+    lines += _stats_lines('api_cache', api_cache.stats())
+    lines += _stats_lines('table_metadata_cache', table_metadata_cache.stats())
+    lines += _stats_lines('sales', sales_ingestor.stats())
+    lines += _stats_lines('dashboard_events', dashboard_events.stats())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/summary')
+def get_metrics_summary():
+    """Get approximate per-endpoint latency percentiles, slowest p99 first"""
+    return jsonify(request_metrics.summary())
+
+@app.route('/api/debug/sql-profile', methods=['GET', 'POST', 'DELETE'])
+def sql_profile():
+    """SQL profiler report; POST {"enabled", "slow_query_ms"} to configure, DELETE to reset"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if 'enabled' in data:
+            sql_profiler.enabled = bool(data['enabled'])
+        if 'slow_query_ms' in data:
+            sql_profiler.slow_ms = float(data['slow_query_ms'])
+    elif request.method == 'DELETE':
+        sql_profiler.reset()
+    return jsonify(sql_profiler.report())
+
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    """Get API response cache hit/miss counters"""
+    return jsonify(api_cache.stats())
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -1061,6 +4019,10 @@ def internal_error(error):
 
 if __name__ == '__main__':
     init_db()
+    # Drain emails left in the outbox by a restart; with the debug reloader
+    # only the child process that serves requests runs workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        email_dispatcher.ensure_started()
 
     if not os.path.exists('./images'):
         os.makedirs('./images')
@@ -1072,9 +4034,11 @@ if __name__ == '__main__':
     print("🔧 Automation: http://localhost:5000/automation.html")
     print("📝 Add Products: http://localhost:5000/addproducts.html")
     print("📊 AI Analytics: http://localhost:5000/aianalytics.html")
-    print("📧 Email Service: Flask-Mail Enabled")
-    print("📊 Export Feature: CSV downloads")
+    print("📧 Email Service: Flask-Mail with background outbox workers")
+    print("📊 Export Feature: Streaming CSV / Parquet / Arrow downloads")
     print("💾 Database: MySQL (inventory_ai)")
+    print(f"🔌 Connection Pool: {POOL_CONFIG['SIZE']} connections")
+    print("📡 Live Dashboard: Server-Sent Events on /api/events")
     print("🤖 AI Engine: Active with Date Tracking")
     print("=" * 60)
 
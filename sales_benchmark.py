@@ -0,0 +1,92 @@
+"""Concurrency benchmark for POST /api/sales.
+
+Start main.py against a local MySQL database with some products, then run:
+
+    python sales_benchmark.py --workers 16 --requests 400 --lines 50
+
+Every worker posts batches of sale lines for random existing products and
+the script reports request latency percentiles, end-to-end lines per second
+and the server's group-commit metrics. Each run uses fresh idempotency keys,
+so it always adds real sales (and decrements stock) in the target database.
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def fetch_skus(base_url, limit):
+    response = requests.get(
+        f"{base_url}/api/products",
+        params={'limit': limit, 'fields': 'product_id'},
+        timeout=30
+    )
+    response.raise_for_status()
+    return [p['product_id'] for p in response.json()['products']]
+
+
+def post_batch(session, base_url, skus, lines):
+    sales = [{
+        'product_id': random.choice(skus),
+        'quantity': random.randint(1, 3),
+        'idempotency_key': uuid.uuid4().hex
+    } for _ in range(lines)]
+
+    started = time.perf_counter()
+    response = session.post(f"{base_url}/api/sales", json={'sales': sales}, timeout=60)
+    latency = time.perf_counter() - started
+    response.raise_for_status()
+    return latency, response.json()['lines_accepted']
+
+
+def run(base_url, workers, total_requests, lines, sku_limit):
+    skus = fetch_skus(base_url, sku_limit)
+    if not skus:
+        raise SystemExit("No products found - add some products before benchmarking")
+
+    before = requests.get(f"{base_url}/api/sales/metrics", timeout=30).json()
+    sessions = [requests.Session() for _ in range(workers)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(post_batch, sessions[i % workers], base_url, skus, lines)
+            for i in range(total_requests)
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+    after = requests.get(f"{base_url}/api/sales/metrics", timeout=30).json()
+
+    latencies = sorted(latency for latency, _ in results)
+    accepted = sum(count for _, count in results)
+    commits = after['commits'] - before['commits']
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print("🧾 Sales ingestion benchmark")
+    print("=" * 60)
+    print(f"Workers: {workers}  Requests: {total_requests}  Lines/request: {lines}  Products: {len(skus)}")
+    print(f"Lines accepted: {accepted} in {elapsed:.2f}s -> {accepted / elapsed:,.0f} lines/s")
+    print(f"Requests/s: {total_requests / elapsed:,.1f}")
+    print(f"Latency ms: mean {statistics.mean(latencies) * 1000:.1f}  "
+          f"p50 {percentile(0.50):.1f}  p95 {percentile(0.95):.1f}  p99 {percentile(0.99):.1f}")
+    if commits:
+        print(f"Commits: {commits} ({total_requests / commits:.1f} requests per commit)")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=50)
+    parser.add_argument('--products', type=int, default=500, help='Max products to spread sales over')
+    args = parser.parse_args()
+
+    run(args.url.rstrip('/'), args.workers, args.requests, args.lines, args.products)
@@ -0,0 +1,133 @@
+"""Side-by-side load test of the sync (Flask) and ASGI serving modes.
+
+Start both against the same MySQL database, e.g.
+
+    python main.py                              # sync, port 5000
+    uvicorn asgi:app --port 8000                # ASGI, port 8000
+
+then run:
+
+    python serving_benchmark.py --streams 1000 --concurrency 200 --duration 30
+
+For each server the script first opens --streams idle dashboard connections
+on /api/events (like open dashboard tabs), then, while they stay open, drives
+--concurrency clients against the dashboard/POS read endpoints for
+--duration seconds and reports throughput, latency percentiles and errors.
+Only GET endpoints are used, so it is safe against real data.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+ENDPOINTS = [
+    '/api/stats',
+    '/api/products?limit=50&fields=id,product_id,name,current_stock,price',
+    '/api/products?low_stock=1&limit=50',
+    '/api/low-stock?summary=1',
+]
+
+
+async def hold_stream(client, url, opened, stop):
+    """Keep one SSE connection open until stop is set; count it once the first bytes arrive"""
+    try:
+        async with client.stream('GET', f"{url}/api/events") as response:
+            if response.status_code != 200:
+                return
+            async for _ in response.aiter_raw():
+                opened.append(1)
+                break
+            await stop.wait()
+    except httpx.HTTPError:
+        pass
+
+
+async def worker(client, url, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url + random.choice(ENDPOINTS))
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_target(name, url, streams, concurrency, duration, stream_timeout):
+    limits = httpx.Limits(max_connections=streams + concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(30.0, connect=stream_timeout)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        opened, stop = [], asyncio.Event()
+        holders = [asyncio.create_task(hold_stream(client, url, opened, stop)) for _ in range(streams)]
+        # Give the server stream_timeout seconds to accept every stream
+        wait_until = time.perf_counter() + stream_timeout
+        while len(opened) < streams and time.perf_counter() < wait_until:
+            await asyncio.sleep(0.1)
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, url, started + duration, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for holder in holders:
+            holder.cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return float('nan')
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        'name': name,
+        'streams': len(opened),
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'mean': statistics.mean(latencies) * 1000 if latencies else float('nan'),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'errors': len(errors)
+    }
+
+
+async def run(args):
+    results = []
+    for name, url in (('sync', args.sync_url), ('asgi', args.asgi_url)):
+        if not url:
+            continue
+        print(f"⏱️  {name}: {args.streams} streams + {args.concurrency} clients for {args.duration}s on {url}")
+        results.append(await run_target(name, url.rstrip('/'), args.streams, args.concurrency,
+                                        args.duration, args.stream_timeout))
+
+    print("🌐 Serving mode benchmark")
+    print("=" * 78)
+    print(f"{'mode':<6}{'streams':>9}{'requests':>10}{'req/s':>10}{'mean ms':>10}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for r in results:
+        print(f"{r['name']:<6}{r['streams']:>9}{r['requests']:>10}{r['rps']:>10.1f}{r['mean']:>10.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['errors']:>8}")
+    print("=" * 78)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync-url', default='http://localhost:5000', help="Flask app; '' to skip")
+    parser.add_argument('--asgi-url', default='http://localhost:8000', help="ASGI app; '' to skip")
+    parser.add_argument('--streams', type=int, default=500, help='Idle /api/events connections held open')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--stream-timeout', type=float, default=10, help='Seconds to wait for streams to open')
+    asyncio.run(run(parser.parse_args()))
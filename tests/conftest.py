@@ -0,0 +1,120 @@
+"""Shared fixtures: a scriptable stand-in for mysql.connector, so tests run without MySQL."""
+import os
+import sys
+
+import mysql.connector
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'dataanalysis'))
+
+
+class FakeCursor:
+    def __init__(self, db, conn, dictionary=False, buffered=None, **kwargs):
+        self.db = db
+        self.conn = conn
+        self.dictionary = dictionary
+        self.unbuffered = buffered is False
+        self.description = None
+        self.rowcount = 0
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, sql, params=None, **kwargs):
+        self.db.statements.append((sql, params))
+        result = self.db.handler(sql, params)
+        if isinstance(result, int):
+            # Affected row count of an INSERT / UPDATE / DELETE
+            result, affected = None, result
+        else:
+            affected = None
+        columns, rows = result if result is not None else ([], [])
+        # A column is a name, or (name, FieldType code) where the type matters
+        columns = [c if isinstance(c, tuple) else (c, None) for c in columns]
+        self.description = [(name, type_code, None, None, None, None, None) for name, type_code in columns] or None
+        names = [name for name, _ in columns]
+        self._rows = [dict(zip(names, r)) if self.dictionary else tuple(r) for r in rows]
+        self.rowcount = len(rows) if affected is None else affected
+        self.lastrowid = self.db.lastrowid
+
+    def executemany(self, sql, seq):
+        for params in seq:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        if self.unbuffered and self._rows:
+            raise mysql.connector.errors.InternalError("Unread result found")
+        self._rows = []
+
+    @property
+    def pending(self):
+        return self.unbuffered and bool(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.cursors = []
+        self.closed = False
+        self.commits = 0
+        db.connections.append(self)
+
+    def cursor(self, **kwargs):
+        cursor = FakeCursor(self.db, self, **kwargs)
+        self.cursors.append(cursor)
+        return cursor
+
+    @property
+    def unread_result(self):
+        return any(cursor.pending for cursor in self.cursors)
+
+    def commit(self):
+        self.commits += 1
+        self.db.statements.append(('COMMIT', None))
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def shutdown(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    """Answers every statement through handler(sql, params) -> (columns, rows), a row count or None"""
+
+    def __init__(self):
+        self.handler = lambda sql, params: None
+        self.statements = []
+        self.connections = []
+        self.lastrowid = None
+
+    def executed(self, fragment):
+        return [params for sql, params in self.statements if fragment in sql]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    import main
+
+    db = FakeDatabase()
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: FakeConnection(db))
+    monkeypatch.setattr(main, 'db_pool', main.ConnectionPool(2, 1, 60, **main.DB_CONFIG))
+    return db
@@ -0,0 +1,164 @@
+import os
+import zlib
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+import pytest
+
+from final import analytics_db
+from final import hybrid_analytics_engine as engine
+
+PRODUCTS = pd.DataFrame({
+    'product_id': [1, 2],
+    'current_stock': [40, 5],
+    'minimum_stock': [10, 10],
+    'unit_price': [25.0, 14.0],
+    'expiry_date': pd.to_datetime(['2027-12-31', '2027-06-30']),
+    'category': ['Grocery & Food', 'Grocery & Food'],
+    'supplier_name': ['Tata Consumer', 'Nestle'],
+})
+
+
+class SalesDatabase:
+    """sales_history / products as the connector's queries see them"""
+
+    def __init__(self):
+        self.sales = pd.DataFrame(columns=['sale_id', 'product_id', 'product_name', 'quantity_sold',
+                                           'amount', 'sale_date'])
+        self.products_version = (pd.Timestamp('2026-01-01'), 2)
+
+    def commit(self, sale_id, product_id=1, quantity=2, amount=50.0, days_ago=3):
+        row = {'sale_id': sale_id, 'product_id': product_id, 'product_name': f'product {product_id}',
+               'quantity_sold': quantity, 'amount': amount,
+               'sale_date': pd.Timestamp.today().normalize() - pd.Timedelta(days=days_ago)}
+        self.sales = pd.concat([self.sales, pd.DataFrame([row])], ignore_index=True)
+
+    def edit(self, sale_id, **values):
+        for column, value in values.items():
+            self.sales.loc[self.sales['sale_id'] == sale_id, column] = value
+
+    def _rows(self):
+        sales = self.sales.astype({'sale_id': 'int64', 'product_id': 'int64', 'quantity_sold': 'int64',
+                                   'amount': 'float64', 'sale_date': 'datetime64[us]'})
+        # What analytics_db.SALE_ROW_CRC computes in MySQL
+        sales['row_crc'] = [zlib.crc32('|'.join(map(str, row)).encode()) for row in sales.itertuples(index=False)]
+        return sales
+
+    def read_sql(self, query, conn, source=None, params=None, chunksize=None):
+        sales = self._rows()
+        if query == analytics_db.SALES_DELTA_QUERY:
+            return sales[(sales['sale_id'] > params[0]) & (sales['sale_date'] >= params[1])].sort_values('sale_id')
+        if query == analytics_db.SALES_MONTH_QUERY:
+            return sales[(sales['sale_id'] <= params[0]) & (sales['sale_date'] >= params[1])
+                         & (sales['sale_date'] < params[2])].sort_values('sale_id')
+        if query == analytics_db.PRODUCT_ATTRIBUTES_QUERY:
+            return PRODUCTS.copy()
+        raise AssertionError(f'unexpected query from {source}')
+
+    def handler(self, sql, params):
+        if sql == analytics_db.PRODUCTS_VERSION_QUERY:
+            return ['last_updated', 'products'], [self.products_version]
+        if sql in (analytics_db.SALES_MONTHS_QUERY, analytics_db.SALES_MONTHS_CHECKSUM_QUERY):
+            sales = self._rows()
+            sales = sales[(sales['sale_id'] <= params[0]) & (sales['sale_date'] >= params[1])]
+            months = sales.groupby(engine.month_keys(sales['sale_date']))
+            if sql == analytics_db.SALES_MONTHS_QUERY:
+                return ['ym', 'sales', 'max_sale_id'], [
+                    (ym, len(month), month['sale_id'].max()) for ym, month in months
+                ]
+            return ['ym', 'sales', 'max_sale_id', 'checksum'], [
+                (ym, len(month), month['sale_id'].max(), np.bitwise_xor.reduce(month['row_crc'].to_numpy()))
+                for ym, month in months
+            ]
+
+
+@pytest.fixture
+def database(fake_db, monkeypatch):
+    database = SalesDatabase()
+    fake_db.handler = database.handler
+    monkeypatch.setattr(engine, 'read_sql_profiled', database.read_sql)
+    return database
+
+
+def load(connector):
+    return connector._load_raw_incremental(mysql.connector.connect())
+
+
+def test_delta_picks_up_sales_committed_below_the_watermark(database):
+    connector = engine.TraditionalDataConnector()
+    connector.cache = None
+    for sale_id in (1, 2, 4):
+        database.commit(sale_id)
+
+    assert len(load(connector)) == 3
+    assert connector.last_load['watermark'] == 4
+
+    # Id 3 was assigned before 4 but committed after the last load
+    database.commit(3)
+    database.commit(5)
+    data = load(connector)
+    assert sorted(data['sale_id']) == [1, 2, 3, 4, 5]
+    assert connector.last_load['new_sales'] == 2
+    assert connector.last_load['late_sales'] == 1
+
+    load(connector)
+    assert connector.last_load['new_sales'] == 0
+
+
+def cached_connector(directory):
+    connector = engine.TraditionalDataConnector()
+    connector.cache = engine.SalesPartitionCache(str(directory))
+    return connector
+
+
+def test_cold_start_adopts_the_cache_without_rewriting_it(database, fake_db, tmp_path):
+    for sale_id in (1, 2, 3):
+        database.commit(sale_id, days_ago=sale_id * 40)
+    first = load(cached_connector(tmp_path))
+
+    restarted = cached_connector(tmp_path)
+    data = load(restarted)
+
+    assert restarted.last_load['from_cache'] is True
+    assert restarted.last_load['months_rewritten'] == 0
+    # The default check never hashes rows
+    assert fake_db.executed(analytics_db.SALES_MONTHS_QUERY)
+    assert not fake_db.executed('CRC32')
+    assert sorted(data['sale_id']) == sorted(first['sale_id'])
+    assert 'row_crc' not in data.columns
+    assert data['amount'].dtype == 'float64'
+    # Every file went through a unique temp name that was renamed into place
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
+
+
+def test_checksum_verify_rebuilds_months_whose_sales_were_edited(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'ANALYTICS_CACHE_VERIFY', 'checksum')
+    database.commit(1, amount=50.0, days_ago=3)
+    database.commit(2, amount=20.0, days_ago=3)
+    database.commit(3, amount=10.0, days_ago=70)
+    load(cached_connector(tmp_path))
+
+    # Same count and highest id; only the edited row's checksum moves
+    database.edit(2, amount=35.0, quantity_sold=3)
+    restarted = cached_connector(tmp_path)
+    data = load(restarted).set_index('sale_id')
+
+    assert restarted.last_load['months_rewritten'] == 1
+    assert data.loc[2, 'amount'] == 35.0 * 83
+    assert data.loc[2, 'quantity_sold'] == 3
+    assert data.loc[3, 'amount'] == 10.0 * 83
+
+
+def test_cold_start_rebuilds_months_with_sales_below_the_reread_window(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_db, 'SALES_DELTA_REREAD_IDS', 1)
+    for sale_id in (1, 2, 4):
+        database.commit(sale_id)
+    connector = cached_connector(tmp_path)
+    load(connector)
+    database.commit(3)
+    database.commit(5)
+    # Id 3 is two below the watermark, outside a one-id re-read window
+    assert 3 not in set(load(connector)['sale_id'])
+
+    assert sorted(load(cached_connector(tmp_path))['sale_id']) == [1, 2, 3, 4, 5]
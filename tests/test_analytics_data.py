@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from final import hybrid_analytics_engine as engine
+
+
+def test_compact_frame_keeps_money_in_float64_by_default():
+    df = pd.DataFrame({'sale_id': [1, 2], 'amount': [1999.99, 25.10], 'product_name': ['Dove Soap'] * 2})
+
+    compacted = engine.compact_frame(df.copy())
+    assert compacted['amount'].dtype == 'float64'
+    assert compacted['sale_id'].dtype == 'int32'
+    assert isinstance(compacted['product_name'].dtype, pd.CategoricalDtype)
+
+    assert engine.compact_frame(df.copy(), floats=True)['amount'].dtype == 'float32'
+
+
+def process(low_memory, **kwargs):
+    connector = engine.TraditionalDataConnector(low_memory=low_memory)
+    return connector._process_data(engine.generate_sales_data(**kwargs))
+
+
+def test_low_memory_mode_uses_compact_dtypes_with_matching_values():
+    normal = process(False, rows=5000, products=40, seed=7)
+    compact = process(True, rows=5000, products=40, seed=7)
+
+    assert compact['month'].dtype == 'int8'
+    assert compact['quarter'].dtype == 'int8'
+    assert compact['customer_id'].dtype == 'int16'
+    assert compact['current_stock'].dtype == 'int32'
+    for col in ('amount', 'cost', 'profit', 'profit_margin', 'unit_price', 'stock_ratio'):
+        assert compact[col].dtype == 'float32', col
+        np.testing.assert_allclose(compact[col].to_numpy('float64'), normal[col].to_numpy(), rtol=1e-6)
+    for col in ('sale_id', 'month', 'quarter', 'customer_id', 'current_stock', 'days_to_expiry'):
+        np.testing.assert_array_equal(compact[col].to_numpy('int64'), normal[col].to_numpy('int64'))
+    assert list(compact['weekday'].astype(str)) == list(normal['weekday'].astype(str))
+    assert engine.memory_report(compact)['total_mb'] < engine.memory_report(normal)['total_mb']
+
+
+def test_generator_is_deterministic_per_seed():
+    first = engine.generate_sales_data(rows=2000, products=30, seed=11)
+
+    pd.testing.assert_frame_equal(first, engine.generate_sales_data(rows=2000, products=30, seed=11))
+    assert not first['amount'].equals(engine.generate_sales_data(rows=2000, products=30, seed=12)['amount'])
+    assert len(first) == 2000
+    assert first['product_id'].between(1, 30).all()
+    assert first['sale_date'].min() >= pd.Timestamp.today().normalize() - pd.Timedelta(days=365)
+
+
+def test_generator_follows_the_seasonal_factors():
+    sales = engine.generate_sales_data(rows=200000, products=20, days=365, seed=3)
+    quantity = sales.groupby(sales['sale_date'].dt.month)['quantity_sold'].mean()
+
+    diwali = quantity.loc[[10, 11]].mean()
+    monsoon = quantity.loc[[6, 7, 8]].mean()
+    assert diwali / monsoon > 1.5
+    # Month means rank like their factors
+    factors = pd.Series(engine.SEASONAL_FACTORS, index=range(1, 13))
+    assert quantity.corr(factors, method='spearman') > 0.9
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import main
+
+PRODUCTS = [{'id': 1, 'name': 'Tata Salt', 'price': Decimal('25.00'), 'date_added': date(2026, 1, 5)}]
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager, so the lifespan (MySQL pools) never runs
+    return TestClient(asgi.app)
+
+
+def test_native_routes_send_cors_headers(client):
+    response = client.get('/api/asgi-stats', headers={'Origin': 'https://pos.example.com'})
+    assert response.headers['access-control-allow-origin'] == '*'
+
+    preflight = client.options('/api/products', headers={
+        'Origin': 'https://pos.example.com', 'Access-Control-Request-Method': 'GET'})
+    assert preflight.status_code == 200
+    assert preflight.headers['access-control-allow-origin'] == '*'
+
+
+def test_products_etag_matches_between_flask_debug_and_asgi(client, fake_db, monkeypatch):
+    fake_db.handler = lambda sql, params: (list(PRODUCTS[0]), [tuple(PRODUCTS[0].values())]) \
+        if 'FROM products' in sql else None
+
+    async def fetchall(sql, params=(), readonly=True):
+        return [dict(row) for row in PRODUCTS]
+    monkeypatch.setattr(asgi.db, 'fetchall', fetchall)
+
+    # app.run(debug=True) pretty-prints the body; the ASGI server does not
+    monkeypatch.setattr(main.app, 'debug', True)
+    flask_response = main.app.test_client().get('/api/products?fields=id,name,price')
+    monkeypatch.setattr(main.app, 'debug', False)
+    asgi_response = client.get('/api/products?fields=id,name,price')
+
+    assert flask_response.get_data() != asgi_response.content
+    assert flask_response.headers['ETag'] == asgi_response.headers['etag']
+    revalidated = client.get('/api/products?fields=id,name,price',
+                             headers={'If-None-Match': flask_response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_sticky_reads_skip_the_shared_cache(client, monkeypatch):
+    monkeypatch.setattr(main, 'api_cache', main.TTLCache(60))
+    main.api_cache.get_or_load('low_stock_summary', lambda: [{'supplier': 'stale'}])
+    reads = []
+
+    async def fetchall(sql, params=(), readonly=True):
+        reads.append(readonly)
+        return [{'supplier': 'fresh'}]
+    monkeypatch.setattr(asgi.db, 'fetchall', fetchall)
+
+    assert client.get('/api/low-stock?summary=1').json() == [{'supplier': 'stale'}]
+    client.cookies.set(main.PRIMARY_STICKY_COOKIE, str(time.time() + 5))
+    assert client.get('/api/low-stock?summary=1').json() == [{'supplier': 'fresh', 'custom_message': ''}]
+    assert reads == [False]
+
+
+def test_replica_choice_does_not_block_the_event_loop(monkeypatch):
+    class Pool:
+        def stats(self):
+            return {}
+
+    router = main.ReplicaRouter([Pool()], max_lag=5, check_interval=60)
+    router._measure_lag = lambda pool: pytest.fail('blocking lag check on the event loop')
+    monkeypatch.setattr(main, 'replica_router', router)
+    database = asgi.AsyncDatabase(1)
+    database.replicas = ['replica pool']
+    probes = []
+
+    async def replica_lag(index):
+        probes.append(index)
+        return 1.0
+
+    async def fetchall(pool, sql, params):
+        return [{'pool': pool}]
+    monkeypatch.setattr(database, '_replica_lag', replica_lag)
+    monkeypatch.setattr(database, '_fetchall', fetchall)
+
+    async def reads():
+        return [await database.fetchall('SELECT 1') for _ in range(3)]
+
+    assert asyncio.run(reads()) == [[{'pool': 'replica pool'}]] * 3
+    # One probe per check interval, not one per read
+    assert probes == [0]
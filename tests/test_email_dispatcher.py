@@ -0,0 +1,82 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+
+import main
+
+PRODUCT = {'product_id': 'SKU-1', 'product_name': 'Tata Salt', 'current_stock': 2,
+           'minimum_stock': 10, 'required_quantity': 20}
+
+
+class FakeSMTP:
+    def __init__(self, db, fail_for=()):
+        self.db = db
+        self.fail_for = set(fail_for)
+
+    def send(self, message):
+        recipient = message.recipients[0]
+        if recipient in self.fail_for:
+            raise OSError('mailbox unavailable')
+        self.db.statements.append(('SEND', recipient))
+
+
+@pytest.fixture
+def dispatcher(fake_db, monkeypatch):
+    dispatcher = main.EmailDispatcher(1, 10, 3, 60, 5)
+    smtp = FakeSMTP(fake_db)
+
+    @contextmanager
+    def connect():
+        yield smtp
+
+    monkeypatch.setattr(main.mail, 'connect', connect)
+    with main.app.app_context():
+        yield dispatcher, smtp
+
+
+def outbox_rows(*emails):
+    return ['id', 'supplier_name', 'supplier_email', 'payload', 'attempts'], [
+        (i, f'Supplier {i}', email, json.dumps({'products': [PRODUCT], 'custom_message': ''}), 0)
+        for i, email in enumerate(emails, start=1)
+    ]
+
+
+def test_each_send_is_recorded_before_the_next(fake_db, dispatcher):
+    dispatcher, smtp = dispatcher
+    smtp.fail_for = {'b@example.com'}
+    fake_db.handler = lambda sql, params: outbox_rows('a@example.com', 'b@example.com') \
+        if 'FROM email_outbox WHERE claim_token' in sql else None
+
+    assert dispatcher._process_batch() == 2
+
+    events = [(sql, params) for sql, params in fake_db.statements
+              if sql == 'SEND' or "status = 'sent'" in sql or 'last_error = %s' in sql]
+    assert events[0] == ('SEND', 'a@example.com')
+    assert "status = 'sent'" in events[1][0] and events[1][1] == (1,)
+    # Only the failed email goes back to pending for a retry
+    assert events[2][1][3] == 2
+    assert len(events) == 3
+
+
+def test_unrecorded_send_is_retried_without_resending(fake_db, dispatcher):
+    dispatcher, _ = dispatcher
+    database_up = [False]
+
+    def handler(sql, params):
+        if "status = 'sent'" in sql and not database_up[0]:
+            raise main.mysql.connector.errors.OperationalError('Lost connection')
+        if 'FROM email_outbox WHERE claim_token' in sql:
+            return outbox_rows('a@example.com')
+
+    fake_db.handler = handler
+    dispatcher._process_batch()
+    assert fake_db.executed("status = 'sent'") == [(1,)]
+    assert len(dispatcher._unrecorded) == 1
+
+    database_up[0] = True
+    dispatcher._record_unrecorded()
+
+    assert fake_db.executed("status = 'sent'") == [(1,), (1,)]
+    assert dispatcher._unrecorded == []
+    assert [p for s, p in fake_db.statements if s == 'SEND'] == ['a@example.com']
@@ -0,0 +1,92 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from mysql.connector.constants import FieldType
+
+import main
+
+
+def rows_handler(count):
+    def handler(sql, params):
+        if sql.startswith('SELECT * FROM'):
+            return ['id', 'name'], [(i, f'product {i}') for i in range(count)]
+    return handler
+
+
+def test_csv_export_streams_every_row(fake_db, monkeypatch):
+    monkeypatch.setattr(main, 'EXPORT_CHUNK_SIZE', 2)
+    fake_db.handler = rows_handler(5)
+
+    body = b''.join(main._stream_table_csv('products')).decode()
+
+    assert body.splitlines() == ['id,name'] + [f'{i},product {i}' for i in range(5)]
+    assert main.db_pool.stats()['idle'] == 1
+
+
+def test_abandoned_csv_export_discards_connection(fake_db, monkeypatch):
+    monkeypatch.setattr(main, 'EXPORT_CHUNK_SIZE', 2)
+    fake_db.handler = rows_handler(10)
+
+    stream = main._stream_table_csv('products')
+    next(stream)
+    # Client disconnect: the response closes the generator mid-table
+    stream.close()
+
+    stats = main.db_pool.stats()
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 0
+    assert stats['connections_discarded'] == 1
+    assert fake_db.connections[0].closed
+
+
+def typed_rows_handler(count):
+    columns = [('id', FieldType.LONG), ('name', FieldType.VAR_STRING), ('price', FieldType.NEWDECIMAL),
+               ('expiry_date', FieldType.DATE), ('last_updated', FieldType.TIMESTAMP)]
+
+    def handler(sql, params):
+        if sql.startswith('SELECT * FROM'):
+            return columns, [(i, f'product {i}', Decimal(f'{i}.50'), date(2026, 1, 1 + i % 28),
+                              datetime(2026, 1, 5, 10, i % 60)) for i in range(count)]
+    return handler
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_columnar_export_keeps_types_across_row_groups(fake_db, monkeypatch, export_format):
+    monkeypatch.setattr(main, 'EXPORT_ROW_GROUP_SIZE', 2)
+    fake_db.handler = typed_rows_handler(5)
+
+    body = b''.join(main._stream_table_columnar('products', export_format, 'zstd'))
+
+    if export_format == 'parquet':
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+    else:
+        reader = pa.ipc.open_file(pa.BufferReader(body))
+        assert reader.num_record_batches == 3
+        table = reader.read_all()
+    assert table.schema.types == [pa.int64(), pa.string(), pa.float64(), pa.date32(), pa.timestamp('us')]
+    assert table.column('id').to_pylist() == list(range(5))
+    assert table.column('price').to_pylist()[4] == 4.5
+    assert table.column('expiry_date').to_pylist()[0] == date(2026, 1, 1)
+    assert main.db_pool.stats()['idle'] == 1
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_abandoned_columnar_export_discards_connection(fake_db, monkeypatch, export_format):
+    monkeypatch.setattr(main, 'EXPORT_ROW_GROUP_SIZE', 2)
+    fake_db.handler = typed_rows_handler(10)
+
+    stream = main._stream_table_columnar('products', export_format, 'none')
+    next(stream)
+    stream.close()
+
+    stats = main.db_pool.stats()
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 0
+    assert stats['connections_discarded'] == 1
+    assert fake_db.connections[0].closed
@@ -0,0 +1,15 @@
+import main
+
+
+def test_totals_are_counters_and_levels_are_gauges():
+    body = main.app.test_client().get('/metrics').get_data(as_text=True)
+
+    assert '# TYPE inventory_db_pool_checkouts_total counter' in body
+    assert '# TYPE inventory_api_cache_hits_total counter' in body
+    assert '# TYPE inventory_sales_commit_seconds_total counter' in body
+    assert '# TYPE inventory_db_pool_in_use gauge' in body
+    assert '# TYPE inventory_api_cache_entries gauge' in body
+    assert 'inventory_db_pool_checkouts ' not in body
+    # Every counter series carries the _total suffix
+    counters = [line.split()[2] for line in body.splitlines() if line.endswith(' counter')]
+    assert counters and all(name.endswith('_total') for name in counters)
@@ -0,0 +1,30 @@
+import re
+
+import main
+
+
+def live_indexes():
+    """Index names the migrations leave behind, in order of creation and drops"""
+    indexes = set()
+    for _, _, statements in main.MIGRATIONS:
+        for statement in statements:
+            created = re.search(r'CREATE (?:UNIQUE )?INDEX (\w+)', statement)
+            dropped = re.search(r'DROP INDEX (\w+)', statement)
+            if created:
+                indexes.add(created.group(1))
+            if dropped:
+                indexes.discard(dropped.group(1))
+    return indexes
+
+
+def test_plan_checks_expect_indexes_the_migrations_leave():
+    expected = {check['index'] for check in main.QUERY_PLAN_CHECKS} - {'PRIMARY'}
+    assert expected <= live_indexes()
+
+
+def test_products_listing_index_matches_the_listing_sort():
+    statement = next(s for _, _, statements in main.MIGRATIONS for s in statements
+                     if 'idx_products_listing_date_desc' in s and 'CREATE' in s)
+    assert '(date_added DESC, name, id)' in statement
+    assert 'ORDER BY p.date_added DESC, p.name, p.id' in main._build_products_query({})[0]
+    assert 'idx_products_listing' not in live_indexes()
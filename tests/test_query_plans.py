@@ -0,0 +1,29 @@
+import main
+from dataanalysis.final import analytics_db
+
+
+def test_plan_checks_explain_the_statements_the_code_runs(fake_db):
+    checks = iter(main.QUERY_PLAN_CHECKS)
+
+    def handler(sql, params):
+        if 'AS newest FROM sales_history' in sql:
+            return ['newest'], [(42,)]
+        if sql.startswith('EXPLAIN'):
+            check = next(checks)
+            return ['table', 'type', 'key', 'possible_keys', 'rows'], [
+                (check['table'], 'range', check['index'], check['index'], 10)
+            ]
+    fake_db.handler = handler
+
+    results = main.check_query_plans()
+
+    explained = {sql[len('EXPLAIN '):]: params for sql, params in fake_db.statements if sql.startswith('EXPLAIN')}
+    assert explained[main.STATS_SQL] == main._stats_params()
+    assert explained[analytics_db.SALES_DELTA_QUERY][0] == analytics_db.sales_delta_floor(42)
+    assert analytics_db.SALES_ROLLUP_QUERY in explained
+    assert main.ACTIVE_RECOMMENDATIONS_SQL in explained
+    assert main.ORDER_HISTORY_RECENT_SQL in explained
+    assert main._low_stock_query()[0] in explained
+    assert main._build_products_query({'limit': '50'})[0] in explained
+    assert main.PRODUCTS_WATERMARK_SQL in explained
+    assert all(result['uses_index'] for result in results)
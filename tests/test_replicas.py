@@ -0,0 +1,92 @@
+import time
+
+import mysql.connector
+
+import main
+from dataanalysis.final import analytics_db
+
+
+class Pool:
+    def __init__(self, name):
+        self.name = name
+
+    def stats(self):
+        return {}
+
+
+def router(lags, down=()):
+    pools = [Pool(f'replica-{i}') for i in range(len(lags))]
+    router = main.ReplicaRouter(pools, max_lag=5, check_interval=60)
+    router._measure_lag = lambda pool: lags[pools.index(pool)]
+    for index in down:
+        router.mark_failed(pools[index], OSError('connection refused'))
+    return router
+
+
+def test_fallbacks_are_counted_by_cause():
+    assert router([1.0]).choose().name == 'replica-0'
+
+    lagging = router([30.0, None])
+    assert lagging.choose() is None
+    assert lagging.stats()['lag_fallbacks'] == 1
+    assert lagging.stats()['down_fallbacks'] == 0
+
+    down = router([1.0, 1.0], down=[0, 1])
+    assert down.choose() is None
+    assert down.stats()['lag_fallbacks'] == 0
+    assert down.stats()['down_fallbacks'] == 1
+
+
+def test_replica_lag_reads_either_status_statement(fake_db):
+    def handler(sql, params):
+        if sql == 'SHOW REPLICA STATUS':
+            raise mysql.connector.Error('You have an error in your SQL syntax')
+        if sql == 'SHOW SLAVE STATUS':
+            return ['Seconds_Behind_Master'], [(12,)]
+    fake_db.handler = handler
+
+    assert analytics_db.replica_lag(mysql.connector.connect()) == 12.0
+    assert analytics_db.replica_usable(12.0, 5) is False
+    assert analytics_db.replica_usable(None, None) is True
+
+
+def test_writer_reads_past_the_cache_inside_its_sticky_window(monkeypatch):
+    monkeypatch.setattr(main, 'api_cache', main.TTLCache(60))
+    main.api_cache.get_or_load('stats', lambda: {'total_products': 1})
+    monkeypatch.setattr(main, '_load_stats', lambda: {'total_products': 2})
+    client = main.app.test_client()
+
+    assert client.get('/api/stats').get_json() == {'total_products': 1}
+    client.set_cookie(main.PRIMARY_STICKY_COOKIE, str(time.time() + 5))
+    assert client.get('/api/stats').get_json() == {'total_products': 2}
+    # The primary read is not cached for clients outside the window
+    assert main.api_cache.lookup('stats')[1] == {'total_products': 1}
+
+
+def test_analytics_connector_uses_replica_credentials(fake_db, monkeypatch):
+    from final import hybrid_analytics_engine as engine
+    connects = []
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: connects.append(kwargs))
+    monkeypatch.setattr(engine, 'DB_REPLICA_HOSTS', ['replica.local:3307'])
+    monkeypatch.setattr(engine, 'DB_REPLICA_USER', 'analytics')
+    monkeypatch.setattr(engine, 'DB_REPLICA_PASSWORD', 'secret')
+    monkeypatch.setattr(engine, 'DB_REPLICA_MAX_LAG', None)
+
+    engine.TraditionalDataConnector()._connect()
+
+    assert connects == [{'user': 'analytics', 'password': 'secret', 'host': 'replica.local',
+                         'database': 'inventory_ai', 'port': 3307}]
+
+
+def test_env_file_settings_win_over_process_environment(tmp_path, monkeypatch):
+    env_file = tmp_path / '.env'
+    env_file.write_text('# replicas\nDB_REPLICA_HOSTS=replica.local:3307\nDB_REPLICA_MAX_LAG=5\n')
+    monkeypatch.setattr(analytics_db, 'env_config', analytics_db.load_env_config(str(env_file)))
+    monkeypatch.setenv('DB_REPLICA_HOSTS', 'ignored.local')
+    monkeypatch.setenv('DB_REPLICA_USER', 'analytics')
+
+    assert analytics_db.env_setting('DB_REPLICA_HOSTS') == 'replica.local:3307'
+    assert analytics_db.env_setting('DB_REPLICA_MAX_LAG') == '5'
+    assert analytics_db.env_setting('DB_REPLICA_USER', 'root') == 'analytics'
+    assert analytics_db.env_setting('DB_REPLICA_PASSWORD', 'root') == 'root'
+    assert analytics_db.load_env_config(str(tmp_path / 'missing.env')) == {}
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize('value, expected', [(3, 3), ('4', 4), (2.0, 2)])
+def test_whole_quantities_are_accepted(value, expected):
+    assert main._parse_sale_line(0, {'product_id': 'SKU-1', 'quantity': value}, None)['quantity'] == expected
+
+
+@pytest.mark.parametrize('value', [2.7, '2.7', 0, -1, True, 'two', None])
+def test_fractional_or_non_positive_quantities_are_rejected(value):
+    with pytest.raises(ValueError):
+        main._parse_sale_line(0, {'product_id': 'SKU-1', 'quantity': value}, None)
+
+
+def sale(index, quantity, product_id='SKU-1'):
+    return {'index': index, 'product_id': product_id, 'quantity': quantity, 'amount': None,
+            'sale_date': datetime(2026, 1, 5, 10), 'idempotency_key': None}
+
+
+def test_lines_beyond_available_stock_are_rejected(fake_db):
+    def handler(sql, params):
+        if 'FROM products' in sql and 'FOR UPDATE' in sql:
+            return ['id', 'product_id', 'name', 'price', 'current_stock'], [(7, 'SKU-1', 'Tata Salt', 25.0, 5)]
+        if sql.lstrip().startswith('UPDATE products'):
+            return 1
+
+    fake_db.handler = handler
+    group = [main._PendingSales([sale(0, 3), sale(1, 3), sale(2, 2)])]
+    cursor = main.mysql.connector.connect().cursor()
+
+    [result] = main.sales_ingestor._write_group(cursor, group)
+
+    assert result['accepted'] == 2
+    assert result['errors'] == [{'index': 1, 'error': 'Insufficient stock: 2 left'}]
+    assert [params[2] for params in fake_db.executed('INSERT INTO sales_history')] == [3, 2]
+    assert fake_db.executed('UPDATE products') == [(5, 5, 7, 5)]
+
+
+def test_stock_update_that_would_go_negative_aborts_the_group(fake_db):
+    def handler(sql, params):
+        if 'FROM products' in sql and 'FOR UPDATE' in sql:
+            return ['id', 'product_id', 'name', 'price', 'current_stock'], [(7, 'SKU-1', 'Tata Salt', 25.0, 5)]
+        if sql.lstrip().startswith('UPDATE products'):
+            return 0
+
+    fake_db.handler = handler
+    cursor = main.mysql.connector.connect().cursor()
+
+    with pytest.raises(RuntimeError):
+        main.sales_ingestor._write_group(cursor, [main._PendingSales([sale(0, 1)])])
+
+
+class SalesTables:
+    """sales_history and sales_daily_rollup as far as the rollup statements need"""
+
+    def __init__(self):
+        self.history = {}
+        self.rollup = {}
+
+    def commit_sale(self, sale_id, product_pk, quantity, amount, sale_date, rolled_up=0):
+        self.history[sale_id] = {'product_pk': product_pk, 'quantity': quantity, 'amount': amount,
+                                 'day': sale_date.date(), 'rolled_up': rolled_up}
+
+    def add(self, day, product_pk, quantity, amount, transactions):
+        total = self.rollup.setdefault((day, product_pk), [0, 0.0, 0])
+        total[0] += quantity
+        total[1] += amount
+        total[2] += transactions
+
+    def handler(self, sql, params):
+        if 'COUNT(*) FROM sales_history WHERE rolled_up = 0' in sql:
+            return ['count'], [(sum(1 for row in self.history.values() if not row['rolled_up']),)]
+        if 'COUNT(*) FROM sales_history FOR UPDATE' in sql:
+            return ['count'], [(len(self.history),)]
+        if sql == 'DELETE FROM sales_daily_rollup':
+            self.rollup = {}
+        if sql == main.SALES_ROLLUP_UPSERT_SQL:
+            for row in self.history.values():
+                if row['rolled_up'] <= params[0]:
+                    self.add(row['day'], row['product_pk'], row['quantity'], row['amount'], 1)
+        elif sql == main.SALES_ROLLUP_DELTA_SQL:
+            self.add(*params)
+        elif sql.startswith('UPDATE sales_history SET rolled_up = 1'):
+            for row in self.history.values():
+                row['rolled_up'] = 1
+        elif 'FROM products' in sql and 'FOR UPDATE' in sql:
+            return ['id', 'product_id', 'name', 'price', 'current_stock'], [(7, 'SKU-1', 'Tata Salt', 25.0, 100)]
+        elif 'INSERT INTO sales_history' in sql:
+            product_pk, _, quantity, sale_date, amount, _, rolled_up = params
+            self.commit_sale(max(self.history, default=0) + 1, product_pk, quantity, amount, sale_date, rolled_up)
+        elif sql.lstrip().startswith('UPDATE products'):
+            return 1
+
+
+def test_rollup_folds_sales_that_commit_out_of_id_order(fake_db):
+    tables = SalesTables()
+    fake_db.handler = tables.handler
+    cursor = main.mysql.connector.connect().cursor()
+    day = datetime(2026, 1, 5, 10)
+
+    # id 2 commits first; id 1 was still in flight during the first catch-up
+    tables.commit_sale(2, 7, 4, 100.0, day)
+    assert main.roll_up_sales(cursor) == {'folded': 1}
+    tables.commit_sale(1, 7, 1, 25.0, day)
+    assert main.roll_up_sales(cursor) == {'folded': 1}
+    assert main.roll_up_sales(cursor) == {'folded': 0}
+
+    assert tables.rollup == {(day.date(), 7): [5, 125.0, 2]}
+
+
+def test_ingested_sales_reach_the_rollup_once(fake_db):
+    tables = SalesTables()
+    fake_db.handler = tables.handler
+    cursor = main.mysql.connector.connect().cursor()
+    day = datetime(2026, 1, 5, 10)
+
+    main.sales_ingestor._write_group(cursor, [main._PendingSales([sale(0, 2), sale(1, 3)])])
+    tables.commit_sale(10, 7, 1, 25.0, day)
+    main.roll_up_sales(cursor)
+
+    assert tables.rollup == {(day.date(), 7): [6, 150.0, 3]}
+    assert main.roll_up_sales(cursor, rebuild=True) == {'folded': 3}
+    assert tables.rollup == {(day.date(), 7): [6, 150.0, 3]}
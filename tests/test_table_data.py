@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import main
+
+# SQLite, like MySQL, sorts NULLs first ascending and last descending
+ROWS = [(1, None), (2, '2026-03-01'), (3, None), (4, '2026-01-15'), (5, '2026-03-01'),
+        (6, None), (7, '2026-02-10')]
+
+META = {
+    'columns': [{'name': 'id', 'type': 'int', 'nullable': False},
+                {'name': 'expiry_date', 'type': 'date', 'nullable': True}],
+    'primary_key': 'id',
+    'sortable': ['id', 'expiry_date'],
+}
+
+
+@pytest.fixture
+def products(monkeypatch):
+    monkeypatch.setattr(main, 'get_table_metadata', lambda table: META)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, expiry_date TEXT)")
+    conn.executemany("INSERT INTO products VALUES (?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+
+def page_through(conn, order, limit):
+    seen = []
+    args = {'sort': 'expiry_date', 'order': order, 'limit': str(limit)}
+    while True:
+        query, params, _, sort, primary_key, limit = main._build_table_data_query('products', MultiDict(args))
+        rows = conn.execute(query.replace('%s', '?'), params).fetchall()
+        seen.extend(rows[:limit])
+        if len(rows) <= limit:
+            return seen
+        last = dict(zip(['id', 'expiry_date'], rows[limit - 1]))
+        # Round-trip the cursor exactly as the endpoint hands it out
+        args['cursor'] = main._encode_cursor([last[sort], last[primary_key]])
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_keyset_pages_cover_null_sort_keys_once(products, order, limit):
+    expected = products.execute(
+        f"SELECT id, expiry_date FROM products ORDER BY expiry_date {order}, id {order}"
+    ).fetchall()
+
+    assert page_through(products, order, limit) == expected
+
+
+def test_null_sort_keys_come_first_ascending_and_last_descending(products):
+    assert [row[0] for row in page_through(products, 'asc', 2)] == [1, 3, 6, 4, 7, 2, 5]
+    assert [row[0] for row in page_through(products, 'desc', 2)] == [5, 2, 7, 4, 6, 3, 1]